@@ -0,0 +1,36 @@
+"""Add evidence blobs
+
+Revision ID: 0c6a93e5d1f4
+Revises: b41f6c0e8d27
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c6a93e5d1f4'
+down_revision: Union[str, None] = 'b41f6c0e8d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('evidence_blobs',
+    sa.Column('content_key', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('content_key')
+    )
+    op.create_index(op.f('ix_evidence_file_path'), 'evidence', ['file_path'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_evidence_file_path'), table_name='evidence')
+    op.drop_table('evidence_blobs')
@@ -0,0 +1,85 @@
+"""Seed roles and permissions
+
+Revision ID: 3f8b1d2c9a57
+Revises: 0c6a93e5d1f4
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8b1d2c9a57'
+down_revision: Union[str, None] = '0c6a93e5d1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The permissions the API checks and the default grants, as of this revision
+# (app.services.rbac.PERMISSIONS / ROLE_PERMISSIONS)
+PERMISSIONS = {
+    "cameras:manage": "Create, update and delete sites, zones and cameras",
+    "cameras:report": "Report camera heartbeats",
+    "checklists:manage": "Create, update and delete checklists and their steps",
+    "evidence:view": "Download evidence from other users' executions",
+    "executions:run": "Start, record and complete checklist executions",
+    "reports:generate": "Request report generation",
+    "users:manage": "Create, update and deactivate users",
+}
+ROLES = {
+    "Administrator": ("Full system access", list(PERMISSIONS)),
+    "Operator": (
+        "Camera control and operations",
+        ["cameras:manage", "cameras:report", "evidence:view", "executions:run", "reports:generate"]
+    ),
+    "Viewer": ("View-only access", ["evidence:view"]),
+}
+
+
+def upgrade() -> None:
+    # Existing roles, permissions and grants are kept as they are
+    bind = op.get_bind()
+    for name, description in PERMISSIONS.items():
+        bind.execute(
+            sa.text(
+                "INSERT INTO permissions (permission_name, description) VALUES (:name, :description) "
+                "ON CONFLICT (permission_name) DO NOTHING"
+            ),
+            {"name": name, "description": description}
+        )
+    for name, (description, permissions) in ROLES.items():
+        bind.execute(
+            sa.text(
+                "INSERT INTO roles (role_name, description) VALUES (:name, :description) "
+                "ON CONFLICT (role_name) DO NOTHING"
+            ),
+            {"name": name, "description": description}
+        )
+        bind.execute(
+            sa.text(
+                "INSERT INTO role_permission (role_id, permission_id) "
+                "SELECT roles.role_id, permissions.permission_id FROM roles, permissions "
+                "WHERE roles.role_name = :name AND permissions.permission_name = ANY(:permissions) "
+                "ON CONFLICT DO NOTHING"
+            ),
+            {"name": name, "permissions": permissions}
+        )
+
+
+def downgrade() -> None:
+    # Roles stay: users may hold them. Only the permissions and their grants go.
+    bind = op.get_bind()
+    bind.execute(
+        sa.text(
+            "DELETE FROM role_permission USING permissions "
+            "WHERE role_permission.permission_id = permissions.permission_id "
+            "AND permissions.permission_name = ANY(:permissions)"
+        ),
+        {"permissions": list(PERMISSIONS)}
+    )
+    bind.execute(
+        sa.text("DELETE FROM permissions WHERE permission_name = ANY(:permissions)"),
+        {"permissions": list(PERMISSIONS)}
+    )
@@ -0,0 +1,60 @@
+"""Add foreign key, composite and BRIN indexes for hot query paths
+
+Revision ID: 74ef1bbbb476
+Revises: 51db8c611f52
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74ef1bbbb476'
+down_revision: Union[str, None] = '51db8c611f52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, access method)
+# Composite indexes lead with the foreign key, so they also serve plain FK lookups and cascades.
+INDEXES = [
+    # Foreign keys
+    ('ix_zones_site_id', 'zones', ['site_id'], None),
+    ('ix_camera_mappings_camera_id', 'camera_mappings', ['camera_id'], None),
+    ('ix_camera_mappings_step_id', 'camera_mappings', ['step_id'], None),
+    ('ix_checklists_template_id', 'checklists', ['template_id'], None),
+    ('ix_executions_user_id', 'executions', ['user_id'], None),
+    ('ix_step_executions_step_id', 'step_executions', ['step_id'], None),
+    ('ix_evidence_exec_step_id', 'evidence', ['exec_step_id'], None),
+    ('ix_alerts_exec_step_id', 'alerts', ['exec_step_id'], None),
+    ('ix_exceptions_exec_step_id', 'exceptions', ['exec_step_id'], None),
+    ('ix_user_role_role_id', 'user_role', ['role_id'], None),
+    # Access patterns
+    ('ix_cameras_zone_id_status', 'cameras', ['zone_id', 'status'], None),
+    ('ix_checklist_steps_checklist_id_step_number', 'checklist_steps', ['checklist_id', 'step_number'], None),
+    ('ix_executions_checklist_id_start_time', 'executions', ['checklist_id', 'start_time'], None),
+    ('ix_step_executions_execution_id_step_id', 'step_executions', ['execution_id', 'step_id'], None),
+    ('ix_alerts_status_severity', 'alerts', ['status', 'severity'], None),
+    # Append-only tables are physically ordered by time, so BRIN stays tiny
+    ('ix_executions_start_time_brin', 'executions', ['start_time'], 'brin'),
+    ('ix_step_executions_created_at_brin', 'step_executions', ['created_at'], 'brin'),
+    ('ix_evidence_timestamp_brin', 'evidence', ['timestamp'], 'brin'),
+    ('ix_alerts_created_at_brin', 'alerts', ['created_at'], 'brin'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not lock writes but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in INDEXES:
+            kwargs = {'postgresql_using': using} if using else {}
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, **kwargs)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, using in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
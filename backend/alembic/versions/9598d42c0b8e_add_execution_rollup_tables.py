@@ -0,0 +1,111 @@
+"""Add execution rollup tables
+
+Revision ID: 9598d42c0b8e
+Revises: 74ef1bbbb476
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9598d42c0b8e'
+down_revision: Union[str, None] = '74ef1bbbb476'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('execution_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('checklist_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('in_progress', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('aborted', sa.Integer(), nullable=False),
+    sa.Column('duration_total', sa.Float(), nullable=False),
+    sa.Column('duration_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['checklist_id'], ['checklists.checklist_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'checklist_id')
+    )
+    op.create_table('step_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('checklist_id', sa.Integer(), nullable=False),
+    sa.Column('steps', sa.Integer(), nullable=False),
+    sa.Column('passed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('warning', sa.Integer(), nullable=False),
+    sa.Column('execution_time_total', sa.Float(), nullable=False),
+    sa.Column('execution_time_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['checklist_id'], ['checklists.checklist_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'checklist_id')
+    )
+    op.create_table('site_rollups',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('site_id', sa.Integer(), nullable=False),
+    sa.Column('executions', sa.Integer(), nullable=False),
+    sa.Column('steps', sa.Integer(), nullable=False),
+    sa.Column('passed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['site_id'], ['sites.site_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'site_id')
+    )
+
+    # Backfill from existing history (same as rebuild_rollups()), so reports
+    # are correct as soon as the upgrade finishes
+    op.execute("""
+        INSERT INTO execution_rollups
+            (day, checklist_id, total, completed, in_progress, failed, aborted, duration_total, duration_count)
+        SELECT CAST(timezone('UTC', e.start_time) AS DATE), e.checklist_id,
+               count(*),
+               count(*) FILTER (WHERE e.status = 'Completed'),
+               count(*) FILTER (WHERE e.status = 'In Progress'),
+               count(*) FILTER (WHERE e.status = 'Failed'),
+               count(*) FILTER (WHERE e.status = 'Aborted'),
+               coalesce(sum(extract(epoch FROM e.end_time - e.start_time)), 0),
+               count(e.end_time)
+        FROM executions e
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO step_rollups
+            (day, checklist_id, steps, passed, failed, warning, execution_time_total, execution_time_count)
+        SELECT CAST(timezone('UTC', e.start_time) AS DATE), e.checklist_id,
+               count(*),
+               count(*) FILTER (WHERE se.verification_result = 'Pass'),
+               count(*) FILTER (WHERE se.verification_result = 'Fail'),
+               count(*) FILTER (WHERE se.verification_result = 'Warning'),
+               coalesce(sum(se.execution_time), 0),
+               count(se.execution_time)
+        FROM step_executions se
+        JOIN executions e ON e.execution_id = se.execution_id
+        GROUP BY 1, 2
+    """)
+    op.execute("""
+        INSERT INTO site_rollups (day, site_id, executions, steps, passed, failed)
+        SELECT CAST(timezone('UTC', e.start_time) AS DATE), z.site_id,
+               count(DISTINCT e.execution_id),
+               count(DISTINCT se.exec_step_id),
+               count(DISTINCT se.exec_step_id) FILTER (WHERE se.verification_result = 'Pass'),
+               count(DISTINCT se.exec_step_id) FILTER (WHERE se.verification_result = 'Fail')
+        FROM executions e
+        JOIN checklist_steps cs ON cs.checklist_id = e.checklist_id
+        JOIN camera_mappings cm ON cm.step_id = cs.step_id
+        JOIN cameras c ON c.camera_id = cm.camera_id
+        JOIN zones z ON z.zone_id = c.zone_id
+        LEFT JOIN step_executions se ON se.execution_id = e.execution_id AND se.step_id = cs.step_id
+        GROUP BY 1, 2
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('site_rollups')
+    op.drop_table('step_rollups')
+    op.drop_table('execution_rollups')
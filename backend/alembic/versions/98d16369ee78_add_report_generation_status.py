@@ -0,0 +1,34 @@
+"""Add report generation status columns
+
+Revision ID: 98d16369ee78
+Revises: 9598d42c0b8e
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '98d16369ee78'
+down_revision: Union[str, None] = '9598d42c0b8e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows predate generation; mark them Completed so they stay downloadable
+    op.add_column('reports', sa.Column('status', sa.String(length=20), server_default='Completed', nullable=False))
+    op.alter_column('reports', 'status', server_default=None)
+    op.add_column('reports', sa.Column('parameters_hash', sa.String(length=64), nullable=True))
+    op.add_column('reports', sa.Column('error_message', sa.Text(), nullable=True))
+    op.create_index(op.f('ix_reports_parameters_hash'), 'reports', ['parameters_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reports_parameters_hash'), table_name='reports')
+    op.drop_column('reports', 'error_message')
+    op.drop_column('reports', 'parameters_hash')
+    op.drop_column('reports', 'status')
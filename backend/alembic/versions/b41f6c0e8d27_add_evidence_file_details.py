@@ -0,0 +1,32 @@
+"""Add evidence file details
+
+Revision ID: b41f6c0e8d27
+Revises: e7d4a2f91c60
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41f6c0e8d27'
+down_revision: Union[str, None] = 'e7d4a2f91c60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('evidence', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.add_column('evidence', sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+    op.add_column('evidence', sa.Column('content_type', sa.String(length=100), nullable=True))
+    op.create_index(op.f('ix_evidence_sha256'), 'evidence', ['sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_evidence_sha256'), table_name='evidence')
+    op.drop_column('evidence', 'content_type')
+    op.drop_column('evidence', 'size_bytes')
+    op.drop_column('evidence', 'sha256')
@@ -0,0 +1,26 @@
+"""Add execution total_execution_time
+
+Revision ID: c3a1f0d7b2e4
+Revises: 98d16369ee78
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a1f0d7b2e4'
+down_revision: Union[str, None] = '98d16369ee78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('executions', sa.Column('total_execution_time', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('executions', 'total_execution_time')
@@ -0,0 +1,46 @@
+"""Add camera heartbeats
+
+Revision ID: e7d4a2f91c60
+Revises: 5e2b9c71d8a3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7d4a2f91c60'
+down_revision: Union[str, None] = '5e2b9c71d8a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cameras', sa.Column('last_heartbeat', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('cameras', sa.Column('reported_fps', sa.Float(), nullable=True))
+    op.add_column('cameras', sa.Column('is_recording', sa.Boolean(), nullable=True))
+    op.create_table('camera_status_history',
+    sa.Column('history_id', sa.BigInteger(), nullable=False),
+    sa.Column('camera_id', sa.Integer(), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('fps', sa.Float(), nullable=True),
+    sa.Column('recording', sa.Boolean(), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['camera_id'], ['cameras.camera_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('history_id')
+    )
+    op.create_index('ix_camera_status_history_camera_id_recorded_at', 'camera_status_history', ['camera_id', 'recorded_at'], unique=False)
+    op.create_index('ix_camera_status_history_recorded_at_brin', 'camera_status_history', ['recorded_at'], unique=False, postgresql_using='brin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_camera_status_history_recorded_at_brin', table_name='camera_status_history')
+    op.drop_index('ix_camera_status_history_camera_id_recorded_at', table_name='camera_status_history')
+    op.drop_table('camera_status_history')
+    op.drop_column('cameras', 'is_recording')
+    op.drop_column('cameras', 'reported_fps')
+    op.drop_column('cameras', 'last_heartbeat')
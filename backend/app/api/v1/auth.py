@@ -1,37 +1,45 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.core.database import get_db
 from app.core.config import settings
-from app.core.security import verify_password, get_password_hash, create_access_token
-from app.models.user import User
+from app.core.security import (
+    create_access_token,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async
+)
+from app.models.user import Role, User, user_role
 from app.schemas.auth import Token, UserLogin, UserRegister
 from app.schemas.user import User as UserSchema
-from .dependencies import get_current_active_user
+from app.services.rbac import get_rbac
+from .dependencies import get_current_active_user, invalidate_user
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if username already exists
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User.user_id).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
     # Check if email already exists
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await db.scalar(select(User.user_id).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -40,23 +48,29 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         last_name=user_data.last_name,
         status="Active"
     )
+    # Without a role a self-registered user could not use any protected route
+    if settings.REGISTRATION_ROLE:
+        role = await db.scalar(select(Role).where(Role.role_name == settings.REGISTRATION_ROLE))
+        if role is not None:
+            db_user.roles = [role]
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
-    return db_user
+    return await db.get(
+        User, db_user.user_id, options=[selectinload(User.roles)], populate_existing=True
+    )
 
 
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login and get access token"""
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -69,9 +83,25 @@ async def login(
             detail="User account is not active"
         )
     
+    # Upgrade hashes made with an older cost while the plain password is at hand
+    if password_needs_rehash(user.password_hash):
+        user.password_hash = await get_password_hash_async(form_data.password)
+        await db.commit()
+        await invalidate_user(user.user_id)
+    
+    # Embed roles and effective permissions so requests authorize without joins
+    role_ids = list(await db.scalars(select(user_role.c.role_id).where(user_role.c.user_id == user.user_id)))
+    rbac = await get_rbac(db)
+    
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username, "user_id": user.user_id},
+        data={
+            "sub": user.username,
+            "user_id": user.user_id,
+            "roles": role_ids,
+            "perms": sorted(rbac.permissions_for(role_ids)),
+            "rbac": rbac.version
+        },
         expires_delta=access_token_expires
     )
     
@@ -79,7 +109,16 @@ async def login(
 
 
 @router.get("/me", response_model=UserSchema)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
     """Get current user information"""
-    return current_user
+    # current_user may be the partial cached copy; roles are only needed here
+    return await db.get(
+        User,
+        current_user.user_id,
+        options=[selectinload(User.roles)],
+        populate_existing=True
+    )
 
@@ -1,11 +1,22 @@
+import csv
+import io
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from app.core.database import get_db
 from app.models.camera import Camera, Site, Zone
 from app.schemas.camera import (
     Camera as CameraSchema,
+    CameraBulkError,
+    CameraBulkResult,
     CameraCreate,
+    CameraTree,
+    Heartbeat,
+    HeartbeatBatchResult,
     CameraUpdate,
     Site as SiteSchema,
     SiteCreate,
@@ -14,262 +25,478 @@ from app.schemas.camera import (
     ZoneCreate,
     ZoneUpdate
 )
-from .dependencies import get_current_active_user
+from app.services.heartbeats import HeartbeatBufferFull, accept_heartbeats
+from app.services.hierarchy import bump_hierarchy_version, get_hierarchy, hierarchy_version_query
+from app.services.rollups import rebuild_site_rollups
+from .conditional import check_not_modified
+from .dependencies import get_current_active_user, require_permission
+from .pagination import Limit, Skip, paginate
+from .serialization import list_adapter, serialized_response
 
 router = APIRouter()
 
+# Writes require cameras:manage; reads only need an authenticated user
+MANAGE_CAMERAS = [Depends(require_permission("cameras:manage"))]
+REPORT_CAMERAS = [Depends(require_permission("cameras:report"))]
+
+# Nested response schemas (Zone -> Site, Camera -> Zone -> Site) must be
+# loaded up front, since an async session cannot lazy load during serialization.
+# Both are many-to-one, so they are joined into the main query.
+ZONE_OPTIONS = (joinedload(Zone.site),)
+CAMERA_OPTIONS = (joinedload(Camera.zone).joinedload(Zone.site),)
+
+SITE_LIST = list_adapter(SiteSchema)
+ZONE_LIST = list_adapter(ZoneSchema)
+CAMERA_LIST = list_adapter(CameraSchema)
+
+# Bulk import limits: rows per INSERT batch, and rows per request
+BULK_BATCH_SIZE = 1000
+MAX_BULK_CAMERAS = 50000
+
+
+async def _load_zone(db: AsyncSession, zone_id: int) -> Optional[Zone]:
+    """Load a zone with the relationships its response schema needs"""
+    return await db.get(Zone, zone_id, options=ZONE_OPTIONS, populate_existing=True)
+
+
+async def _load_camera(db: AsyncSession, camera_id: int) -> Optional[Camera]:
+    """Load a camera with the relationships its response schema needs"""
+    return await db.get(Camera, camera_id, options=CAMERA_OPTIONS, populate_existing=True)
+
+
+async def _zone_sites(db: AsyncSession, zone_ids: List[int]) -> List[int]:
+    """Sites the given zones belong to"""
+    return list(await db.scalars(select(Zone.site_id).where(Zone.zone_id.in_(zone_ids))))
+
+
+def _camera_validator(*criteria):
+    """Change markers of the cameras matching criteria and the zones/sites nested in them"""
+    return (
+        select(
+            func.count(Camera.camera_id),
+            func.max(Camera.updated_at),
+            func.max(Zone.updated_at),
+            func.max(Site.updated_at)
+        )
+        .select_from(Camera)
+        .join(Zone, Zone.zone_id == Camera.zone_id)
+        .join(Site, Site.site_id == Zone.site_id)
+        .where(*criteria)
+    )
+
 
 # Sites endpoints
 @router.get("/sites", response_model=List[SiteSchema])
 async def read_sites(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get list of sites"""
-    sites = db.query(Site).offset(skip).limit(limit).all()
-    return sites
+    sites = await paginate(db, select(Site), Site.site_id, response, skip, limit, cursor)
+    return serialized_response(SITE_LIST, sites, response)
 
 
 @router.get("/sites/{site_id}", response_model=SiteSchema)
 async def read_site(
     site_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get site by ID"""
-    site = db.query(Site).filter(Site.site_id == site_id).first()
+    site = await db.get(Site, site_id)
     if site is None:
         raise HTTPException(status_code=404, detail="Site not found")
     return site
 
 
-@router.post("/sites", response_model=SiteSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/sites", response_model=SiteSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CAMERAS)
 async def create_site(
     site: SiteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Create a new site"""
-    db_site = Site(**site.dict())
+    db_site = Site(**site.model_dump())
     db.add(db_site)
-    db.commit()
-    db.refresh(db_site)
+    await bump_hierarchy_version(db)
+    await db.commit()
+    await db.refresh(db_site)
     return db_site
 
 
-@router.put("/sites/{site_id}", response_model=SiteSchema)
+@router.put("/sites/{site_id}", response_model=SiteSchema, dependencies=MANAGE_CAMERAS)
 async def update_site(
     site_id: int,
     site_update: SiteUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update site"""
-    db_site = db.query(Site).filter(Site.site_id == site_id).first()
+    db_site = await db.get(Site, site_id)
     if db_site is None:
         raise HTTPException(status_code=404, detail="Site not found")
     
-    update_data = site_update.dict(exclude_unset=True)
+    update_data = site_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_site, field, value)
     
-    db.commit()
-    db.refresh(db_site)
+    await bump_hierarchy_version(db)
+    await db.commit()
+    await db.refresh(db_site)
     return db_site
 
 
-@router.delete("/sites/{site_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/sites/{site_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_CAMERAS)
 async def delete_site(
     site_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Delete site"""
-    db_site = db.query(Site).filter(Site.site_id == site_id).first()
+    db_site = await db.get(Site, site_id)
     if db_site is None:
         raise HTTPException(status_code=404, detail="Site not found")
     
-    db.delete(db_site)
-    db.commit()
+    await db.delete(db_site)
+    await bump_hierarchy_version(db)
+    await db.commit()
     return None
 
 
 # Zones endpoints
 @router.get("/zones", response_model=List[ZoneSchema])
 async def read_zones(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
     site_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get list of zones"""
-    query = db.query(Zone)
+    query = select(Zone).options(*ZONE_OPTIONS)
     if site_id:
-        query = query.filter(Zone.site_id == site_id)
-    zones = query.offset(skip).limit(limit).all()
-    return zones
+        query = query.where(Zone.site_id == site_id)
+    zones = await paginate(db, query, Zone.zone_id, response, skip, limit, cursor)
+    return serialized_response(ZONE_LIST, zones, response)
 
 
 @router.get("/zones/{zone_id}", response_model=ZoneSchema)
 async def read_zone(
     zone_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get zone by ID"""
-    zone = db.query(Zone).filter(Zone.zone_id == zone_id).first()
+    zone = await _load_zone(db, zone_id)
     if zone is None:
         raise HTTPException(status_code=404, detail="Zone not found")
     return zone
 
 
-@router.post("/zones", response_model=ZoneSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/zones", response_model=ZoneSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CAMERAS)
 async def create_zone(
     zone: ZoneCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Create a new zone"""
     # Verify site exists
-    site = db.query(Site).filter(Site.site_id == zone.site_id).first()
+    site = await db.get(Site, zone.site_id)
     if not site:
         raise HTTPException(status_code=404, detail="Site not found")
     
-    db_zone = Zone(**zone.dict())
+    db_zone = Zone(**zone.model_dump())
     db.add(db_zone)
-    db.commit()
-    db.refresh(db_zone)
-    return db_zone
+    await bump_hierarchy_version(db)
+    await db.commit()
+    return await _load_zone(db, db_zone.zone_id)
 
 
-@router.put("/zones/{zone_id}", response_model=ZoneSchema)
+@router.put("/zones/{zone_id}", response_model=ZoneSchema, dependencies=MANAGE_CAMERAS)
 async def update_zone(
     zone_id: int,
     zone_update: ZoneUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update zone"""
-    db_zone = db.query(Zone).filter(Zone.zone_id == zone_id).first()
+    db_zone = await db.get(Zone, zone_id)
     if db_zone is None:
         raise HTTPException(status_code=404, detail="Zone not found")
     
     # Verify site exists if site_id is being updated
     if zone_update.site_id and zone_update.site_id != db_zone.site_id:
-        site = db.query(Site).filter(Site.site_id == zone_update.site_id).first()
+        site = await db.get(Site, zone_update.site_id)
         if not site:
             raise HTTPException(status_code=404, detail="Site not found")
     
-    update_data = zone_update.dict(exclude_unset=True)
+    previous_site_id = db_zone.site_id
+    update_data = zone_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_zone, field, value)
     
-    db.commit()
-    db.refresh(db_zone)
-    return db_zone
+    # Its cameras' steps now count towards another site
+    if db_zone.site_id != previous_site_id:
+        await rebuild_site_rollups(db, [previous_site_id, db_zone.site_id])
+    await bump_hierarchy_version(db)
+    await db.commit()
+    return await _load_zone(db, zone_id)
 
 
-@router.delete("/zones/{zone_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/zones/{zone_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_CAMERAS)
 async def delete_zone(
     zone_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Delete zone"""
-    db_zone = db.query(Zone).filter(Zone.zone_id == zone_id).first()
+    db_zone = await db.get(Zone, zone_id)
     if db_zone is None:
         raise HTTPException(status_code=404, detail="Zone not found")
     
-    db.delete(db_zone)
-    db.commit()
+    site_id = db_zone.site_id
+    await db.delete(db_zone)
+    await rebuild_site_rollups(db, [site_id])
+    await bump_hierarchy_version(db)
+    await db.commit()
     return None
 
 
 # Cameras endpoints
 @router.get("", response_model=List[CameraSchema])
 async def read_cameras(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
     zone_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get list of cameras"""
-    query = db.query(Camera)
-    if zone_id:
-        query = query.filter(Camera.zone_id == zone_id)
-    cameras = query.offset(skip).limit(limit).all()
-    return cameras
+    criteria = [Camera.zone_id == zone_id] if zone_id else []
+    not_modified = await check_not_modified(db, request, response, _camera_validator(*criteria))
+    if not_modified:
+        return not_modified
+    
+    query = select(Camera).options(*CAMERA_OPTIONS).where(*criteria)
+    cameras = await paginate(db, query, Camera.camera_id, response, skip, limit, cursor)
+    return serialized_response(CAMERA_LIST, cameras, response)
+
+
+@router.post("/heartbeats", response_model=HeartbeatBatchResult, status_code=status.HTTP_202_ACCEPTED, dependencies=REPORT_CAMERAS)
+async def ingest_heartbeats(
+    heartbeats: List[Heartbeat],
+    current_user = Depends(get_current_active_user)
+):
+    """Accept a batch of camera heartbeats; they are written in periodic bulk flushes"""
+    try:
+        accepted = accept_heartbeats(heartbeats)
+    except HeartbeatBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Heartbeat buffer is full, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    return HeartbeatBatchResult(accepted=accepted)
+
+
+@router.get("/tree", response_model=CameraTree)
+async def read_camera_tree(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get the whole site -> zone -> camera hierarchy, served from the in-memory cache"""
+    not_modified = await check_not_modified(db, request, response, hierarchy_version_query())
+    if not_modified:
+        return not_modified
+    return await get_hierarchy(db)
 
 
 @router.get("/{camera_id}", response_model=CameraSchema)
 async def read_camera(
     camera_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get camera by ID"""
-    camera = db.query(Camera).filter(Camera.camera_id == camera_id).first()
+    # Grouped by id, so a missing camera yields no row and no ETag
+    not_modified = await check_not_modified(
+        db, request, response, _camera_validator(Camera.camera_id == camera_id).group_by(Camera.camera_id)
+    )
+    if not_modified:
+        return not_modified
+    
+    camera = await _load_camera(db, camera_id)
     if camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     return camera
 
 
-@router.post("", response_model=CameraSchema, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=CameraSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CAMERAS)
 async def create_camera(
     camera: CameraCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Create a new camera"""
     # Verify zone exists
-    zone = db.query(Zone).filter(Zone.zone_id == camera.zone_id).first()
+    zone = await db.get(Zone, camera.zone_id)
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
     
-    db_camera = Camera(**camera.dict())
+    db_camera = Camera(**camera.model_dump())
     db.add(db_camera)
-    db.commit()
-    db.refresh(db_camera)
-    return db_camera
-
-
-@router.put("/{camera_id}", response_model=CameraSchema)
+    await bump_hierarchy_version(db)
+    await db.commit()
+    return await _load_camera(db, db_camera.camera_id)
+
+
+def _csv_rows(data: bytes) -> List[dict]:
+    """Parse CSV with a header row; empty cells are treated as missing"""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        row = {key.strip(): value for key, value in row.items() if key is not None and value not in (None, "")}
+        if "configuration" in row:
+            try:
+                row["configuration"] = json.loads(row["configuration"])
+            except ValueError:
+                pass  # Reported by validation as a row error
+        rows.append(row)
+    return rows
+
+
+async def _bulk_rows(request: Request) -> list:
+    """Read the import rows from a JSON array, a text/csv body or a multipart CSV upload"""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Expected a CSV file in the 'file' field")
+        return _csv_rows(await upload.read())
+    if content_type.startswith("text/csv"):
+        return _csv_rows(await request.body())
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or CSV")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or CSV")
+    return rows
+
+
+@router.post("/bulk", response_model=CameraBulkResult, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CAMERAS)
+async def create_cameras_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """
+    Import many cameras at once from a JSON array or CSV.
+
+    Valid rows are inserted in batches in a single transaction; invalid rows
+    are skipped and reported with their position.
+    """
+    rows = await _bulk_rows(request)
+    if len(rows) > MAX_BULK_CAMERAS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_CAMERAS} cameras per import"
+        )
+
+    errors: List[CameraBulkError] = []
+    cameras = []
+    for position, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append(CameraBulkError(row=position, errors=["Expected an object"]))
+            continue
+        try:
+            cameras.append((position, CameraCreate(**row)))
+        except ValidationError as e:
+            errors.append(CameraBulkError(
+                row=position,
+                errors=[f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]
+            ))
+
+    # Verify all zones exist with one query
+    zone_ids = {camera.zone_id for _, camera in cameras}
+    known_zones = set(await db.scalars(select(Zone.zone_id).where(Zone.zone_id.in_(zone_ids)))) if zone_ids else set()
+    values = []
+    for position, camera in cameras:
+        if camera.zone_id in known_zones:
+            values.append(camera.model_dump())
+        else:
+            errors.append(CameraBulkError(row=position, errors=[f"zone_id: Zone {camera.zone_id} not found"]))
+
+    camera_ids: List[int] = []
+    for start in range(0, len(values), BULK_BATCH_SIZE):
+        result = await db.scalars(insert(Camera).returning(Camera.camera_id), values[start:start + BULK_BATCH_SIZE])
+        camera_ids.extend(result.all())
+    await bump_hierarchy_version(db)
+    await db.commit()
+
+    errors.sort(key=lambda error: error.row)
+    return CameraBulkResult(created=len(camera_ids), camera_ids=camera_ids, errors=errors)
+
+
+@router.put("/{camera_id}", response_model=CameraSchema, dependencies=MANAGE_CAMERAS)
 async def update_camera(
     camera_id: int,
     camera_update: CameraUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update camera"""
-    db_camera = db.query(Camera).filter(Camera.camera_id == camera_id).first()
+    db_camera = await db.get(Camera, camera_id)
     if db_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    update_data = camera_update.dict(exclude_unset=True)
+    previous_zone_id = db_camera.zone_id
+    update_data = camera_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_camera, field, value)
     
-    db.commit()
-    db.refresh(db_camera)
-    return db_camera
+    # Its mapped steps may now count towards another site
+    if db_camera.zone_id != previous_zone_id:
+        await rebuild_site_rollups(db, await _zone_sites(db, [previous_zone_id, db_camera.zone_id]))
+    await bump_hierarchy_version(db)
+    await db.commit()
+    return await _load_camera(db, camera_id)
 
 
-@router.delete("/{camera_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{camera_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_CAMERAS)
 async def delete_camera(
     camera_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Delete camera"""
-    db_camera = db.query(Camera).filter(Camera.camera_id == camera_id).first()
+    db_camera = await db.get(Camera, camera_id)
     if db_camera is None:
         raise HTTPException(status_code=404, detail="Camera not found")
     
-    db.delete(db_camera)
-    db.commit()
+    sites = await _zone_sites(db, [db_camera.zone_id])
+    await db.delete(db_camera)
+    await rebuild_site_rollups(db, sites)
+    await bump_hierarchy_version(db)
+    await db.commit()
     return None
 
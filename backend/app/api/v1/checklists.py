@@ -1,8 +1,11 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.core.database import get_db
 from app.models.checklist import Checklist, ChecklistTemplate, ChecklistStep
+from app.models.execution import Evidence, Execution, StepExecution
 from app.schemas.checklist import (
     Checklist as ChecklistSchema,
     ChecklistCreate,
@@ -14,162 +17,237 @@ from app.schemas.checklist import (
     ChecklistStepCreate,
     ChecklistStepUpdate
 )
-from .dependencies import get_current_active_user
+from app.services.cache_versions import EXECUTIONS_VERSION, bump_version
+from app.services.evidence import release_references
+from app.services.rollups import rebuild_checklist_rollups, rebuild_site_rollups, sites_for_checklist, sites_for_steps
+from .conditional import check_not_modified
+from .dependencies import get_current_active_user, require_permission
+from .pagination import Limit, Skip, paginate
+from .serialization import list_adapter, serialized_response
 
 router = APIRouter()
 
+# Writes require checklists:manage; reads only need an authenticated user
+MANAGE_CHECKLISTS = [Depends(require_permission("checklists:manage"))]
+
+# ChecklistSchema nests steps, which an async session cannot lazy load
+CHECKLIST_OPTIONS = (selectinload(Checklist.steps),)
+
+TEMPLATE_LIST = list_adapter(ChecklistTemplateSchema)
+CHECKLIST_LIST = list_adapter(ChecklistSchema)
+
+
+async def _load_checklist(db: AsyncSession, checklist_id: int) -> Optional[Checklist]:
+    """Load a checklist with the relationships its response schema needs"""
+    return await db.get(Checklist, checklist_id, options=CHECKLIST_OPTIONS, populate_existing=True)
+
+
+def _checklist_validator(*criteria):
+    """Change markers of the checklists matching criteria and their steps"""
+    return (
+        select(
+            func.count(distinct(Checklist.checklist_id)),
+            func.max(Checklist.updated_at),
+            func.count(ChecklistStep.step_id),
+            func.max(ChecklistStep.updated_at)
+        )
+        .select_from(Checklist)
+        .outerjoin(ChecklistStep, ChecklistStep.checklist_id == Checklist.checklist_id)
+        .where(*criteria)
+    )
+
+
+async def _get_step(db: AsyncSession, checklist_id: int, step_id: int) -> Optional[ChecklistStep]:
+    """Get a step, scoped to its checklist"""
+    return await db.scalar(
+        select(ChecklistStep).where(
+            ChecklistStep.checklist_id == checklist_id,
+            ChecklistStep.step_id == step_id
+        )
+    )
+
 
 # Checklist Templates
 @router.get("/templates", response_model=List[ChecklistTemplateSchema])
 async def read_templates(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get list of checklist templates"""
-    templates = db.query(ChecklistTemplate).offset(skip).limit(limit).all()
-    return templates
+    templates = await paginate(
+        db, select(ChecklistTemplate), ChecklistTemplate.template_id, response, skip, limit, cursor
+    )
+    return serialized_response(TEMPLATE_LIST, templates, response)
 
 
 @router.get("/templates/{template_id}", response_model=ChecklistTemplateSchema)
 async def read_template(
     template_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get checklist template by ID"""
-    template = db.query(ChecklistTemplate).filter(ChecklistTemplate.template_id == template_id).first()
+    template = await db.get(ChecklistTemplate, template_id)
     if template is None:
         raise HTTPException(status_code=404, detail="Template not found")
     return template
 
 
-@router.post("/templates", response_model=ChecklistTemplateSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/templates", response_model=ChecklistTemplateSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CHECKLISTS)
 async def create_template(
     template: ChecklistTemplateCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Create a new checklist template"""
-    db_template = ChecklistTemplate(**template.dict(), created_by=current_user.user_id)
+    db_template = ChecklistTemplate(**template.model_dump(), created_by=current_user.user_id)
     db.add(db_template)
-    db.commit()
-    db.refresh(db_template)
+    await db.commit()
+    await db.refresh(db_template)
     return db_template
 
 
-@router.put("/templates/{template_id}", response_model=ChecklistTemplateSchema)
+@router.put("/templates/{template_id}", response_model=ChecklistTemplateSchema, dependencies=MANAGE_CHECKLISTS)
 async def update_template(
     template_id: int,
     template_update: ChecklistTemplateUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update checklist template"""
-    db_template = db.query(ChecklistTemplate).filter(ChecklistTemplate.template_id == template_id).first()
+    db_template = await db.get(ChecklistTemplate, template_id)
     if db_template is None:
         raise HTTPException(status_code=404, detail="Template not found")
     
-    update_data = template_update.dict(exclude_unset=True)
+    update_data = template_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_template, field, value)
     
-    db.commit()
-    db.refresh(db_template)
+    await db.commit()
+    await db.refresh(db_template)
     return db_template
 
 
-@router.delete("/templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/templates/{template_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_CHECKLISTS)
 async def delete_template(
     template_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Delete checklist template"""
-    db_template = db.query(ChecklistTemplate).filter(ChecklistTemplate.template_id == template_id).first()
+    db_template = await db.get(ChecklistTemplate, template_id)
     if db_template is None:
         raise HTTPException(status_code=404, detail="Template not found")
     
-    db.delete(db_template)
-    db.commit()
+    await db.delete(db_template)
+    await db.commit()
     return None
 
 
 # Checklists
 @router.get("", response_model=List[ChecklistSchema])
 async def read_checklists(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get list of checklists"""
-    checklists = db.query(Checklist).offset(skip).limit(limit).all()
-    return checklists
+    not_modified = await check_not_modified(db, request, response, _checklist_validator())
+    if not_modified:
+        return not_modified
+    
+    query = select(Checklist).options(*CHECKLIST_OPTIONS)
+    checklists = await paginate(db, query, Checklist.checklist_id, response, skip, limit, cursor)
+    return serialized_response(CHECKLIST_LIST, checklists, response)
 
 
 @router.get("/{checklist_id}", response_model=ChecklistSchema)
 async def read_checklist(
     checklist_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get checklist by ID"""
-    checklist = db.query(Checklist).filter(Checklist.checklist_id == checklist_id).first()
+    # Grouped by id, so a missing checklist yields no row and no ETag
+    not_modified = await check_not_modified(
+        db, request, response, _checklist_validator(Checklist.checklist_id == checklist_id).group_by(Checklist.checklist_id)
+    )
+    if not_modified:
+        return not_modified
+    
+    checklist = await _load_checklist(db, checklist_id)
     if checklist is None:
         raise HTTPException(status_code=404, detail="Checklist not found")
     return checklist
 
 
-@router.post("", response_model=ChecklistSchema, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=ChecklistSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CHECKLISTS)
 async def create_checklist(
     checklist: ChecklistCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Create a new checklist"""
-    db_checklist = Checklist(**checklist.dict(), created_by=current_user.user_id)
+    db_checklist = Checklist(**checklist.model_dump(), created_by=current_user.user_id)
     db.add(db_checklist)
-    db.commit()
-    db.refresh(db_checklist)
-    return db_checklist
+    await db.commit()
+    return await _load_checklist(db, db_checklist.checklist_id)
 
 
-@router.put("/{checklist_id}", response_model=ChecklistSchema)
+@router.put("/{checklist_id}", response_model=ChecklistSchema, dependencies=MANAGE_CHECKLISTS)
 async def update_checklist(
     checklist_id: int,
     checklist_update: ChecklistUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update checklist"""
-    db_checklist = db.query(Checklist).filter(Checklist.checklist_id == checklist_id).first()
+    db_checklist = await db.get(Checklist, checklist_id)
     if db_checklist is None:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    update_data = checklist_update.dict(exclude_unset=True)
+    update_data = checklist_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_checklist, field, value)
     
-    db.commit()
-    db.refresh(db_checklist)
-    return db_checklist
+    await db.commit()
+    return await _load_checklist(db, checklist_id)
 
 
-@router.delete("/{checklist_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{checklist_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_CHECKLISTS)
 async def delete_checklist(
     checklist_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Delete checklist"""
-    db_checklist = db.query(Checklist).filter(Checklist.checklist_id == checklist_id).first()
+    db_checklist = await db.get(Checklist, checklist_id)
     if db_checklist is None:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    db.delete(db_checklist)
-    db.commit()
+    sites = await sites_for_checklist(db, checklist_id)
+    await release_references(db, await db.scalars(
+        select(Evidence.file_path)
+        .join(StepExecution, StepExecution.exec_step_id == Evidence.exec_step_id)
+        .join(Execution, Execution.execution_id == StepExecution.execution_id)
+        .where(Execution.checklist_id == checklist_id)
+    ))
+    await db.delete(db_checklist)
+    # Executions, step executions and evidence are deleted with it; its
+    # execution and step rollups cascade, the sites it covered are recounted
+    await rebuild_site_rollups(db, sites)
+    await bump_version(db, EXECUTIONS_VERSION)
+    await db.commit()
     return None
 
 
@@ -177,94 +255,98 @@ async def delete_checklist(
 @router.get("/{checklist_id}/steps", response_model=List[ChecklistStepSchema])
 async def read_checklist_steps(
     checklist_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get steps for a checklist"""
-    steps = db.query(ChecklistStep).filter(
-        ChecklistStep.checklist_id == checklist_id
-    ).order_by(ChecklistStep.step_number).all()
-    return steps
+    result = await db.scalars(
+        select(ChecklistStep).where(
+            ChecklistStep.checklist_id == checklist_id
+        ).order_by(ChecklistStep.step_number)
+    )
+    return result.all()
 
 
 @router.get("/{checklist_id}/steps/{step_id}", response_model=ChecklistStepSchema)
 async def read_checklist_step(
     checklist_id: int,
     step_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get checklist step by ID"""
-    step = db.query(ChecklistStep).filter(
-        ChecklistStep.checklist_id == checklist_id,
-        ChecklistStep.step_id == step_id
-    ).first()
+    step = await _get_step(db, checklist_id, step_id)
     if step is None:
         raise HTTPException(status_code=404, detail="Step not found")
     return step
 
 
-@router.post("/{checklist_id}/steps", response_model=ChecklistStepSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/{checklist_id}/steps", response_model=ChecklistStepSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_CHECKLISTS)
 async def create_checklist_step(
     checklist_id: int,
     step: ChecklistStepCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Create a new step for a checklist"""
     # Verify checklist exists
-    checklist = db.query(Checklist).filter(Checklist.checklist_id == checklist_id).first()
+    checklist = await db.get(Checklist, checklist_id)
     if not checklist:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
-    db_step = ChecklistStep(**step.dict(), checklist_id=checklist_id)
+    db_step = ChecklistStep(**step.model_dump(), checklist_id=checklist_id)
     db.add(db_step)
-    db.commit()
-    db.refresh(db_step)
+    await db.commit()
+    await db.refresh(db_step)
     return db_step
 
 
-@router.put("/{checklist_id}/steps/{step_id}", response_model=ChecklistStepSchema)
+@router.put("/{checklist_id}/steps/{step_id}", response_model=ChecklistStepSchema, dependencies=MANAGE_CHECKLISTS)
 async def update_checklist_step(
     checklist_id: int,
     step_id: int,
     step_update: ChecklistStepUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update checklist step"""
-    db_step = db.query(ChecklistStep).filter(
-        ChecklistStep.checklist_id == checklist_id,
-        ChecklistStep.step_id == step_id
-    ).first()
+    db_step = await _get_step(db, checklist_id, step_id)
     if db_step is None:
         raise HTTPException(status_code=404, detail="Step not found")
     
-    update_data = step_update.dict(exclude_unset=True)
+    update_data = step_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_step, field, value)
     
-    db.commit()
-    db.refresh(db_step)
+    await db.commit()
+    await db.refresh(db_step)
     return db_step
 
 
-@router.delete("/{checklist_id}/steps/{step_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{checklist_id}/steps/{step_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_CHECKLISTS)
 async def delete_checklist_step(
     checklist_id: int,
     step_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Delete checklist step"""
-    db_step = db.query(ChecklistStep).filter(
-        ChecklistStep.checklist_id == checklist_id,
-        ChecklistStep.step_id == step_id
-    ).first()
+    db_step = await _get_step(db, checklist_id, step_id)
     if db_step is None:
         raise HTTPException(status_code=404, detail="Step not found")
     
-    db.delete(db_step)
-    db.commit()
+    sites = (await sites_for_steps(db, [step_id])).get(step_id, set())
+    await release_references(db, await db.scalars(
+        select(Evidence.file_path)
+        .join(StepExecution, StepExecution.exec_step_id == Evidence.exec_step_id)
+        .where(StepExecution.step_id == step_id)
+    ))
+    await db.delete(db_step)
+    # Step executions and evidence are deleted with it, so recount the
+    # rollups they fed
+    await rebuild_checklist_rollups(db, checklist_id)
+    await rebuild_site_rollups(db, sites)
+    await bump_version(db, EXECUTIONS_VERSION)
+    await db.commit()
     return None
 
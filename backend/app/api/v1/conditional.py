@@ -0,0 +1,61 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+async def check_not_modified(
+    db: AsyncSession,
+    request: Request,
+    response: Response,
+    validator: Select
+) -> Optional[Response]:
+    """
+    Set a weak ETag and Last-Modified on response from a cheap validator query.
+
+    validator returns one row of change markers for the resource, such as
+    row counts and max(updated_at) of everything the response includes.
+    Returns a 304 response to send instead of the body when the client's
+    cached copy (If-None-Match / If-Modified-Since) is still current.
+    """
+    row = (await db.execute(validator)).first()
+    if row is None:
+        return None
+
+    # The query string is part of the key: filters and pages yield different bodies
+    digest = hashlib.sha1(repr((request.url.query, tuple(row))).encode("utf-8")).hexdigest()[:20]
+    headers = {"ETag": f'W/"{digest}"', "Cache-Control": "private, no-cache"}
+    last_modified = max((value for value in row if isinstance(value, datetime)), default=None)
+    if last_modified is not None:
+        last_modified = last_modified.astimezone(timezone.utc).replace(microsecond=0)
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is not None and last_modified <= since:
+            return Response(status_code=304, headers=headers)
+    return None
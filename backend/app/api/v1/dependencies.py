@@ -1,34 +1,90 @@
+from typing import FrozenSet, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.cache import CacheBackend, TTLCache
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import decode_access_token
-from app.models.user import User
+from app.models.user import User, user_role
+from app.services.rbac import get_rbac
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
+# Resolved users by id, so authenticated requests skip the users query.
+# Per worker by default; set_user_cache() swaps in a shared backend.
+user_cache: CacheBackend = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+# What authentication and the routes read from current_user. Kept JSON-safe
+# for shared backends, and never includes the password hash.
+USER_CACHE_FIELDS = ("user_id", "username", "status")
+
+
+def set_user_cache(backend: CacheBackend):
+    """Use another cache backend, e.g. one shared between workers"""
+    global user_cache
+    user_cache = backend
+
+
+def _user_key(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+async def invalidate_user(user_id: int):
+    """Drop a cached user; call after changing a user's status or details"""
+    await user_cache.delete(_user_key(user_id))
+
+
+async def _cached_user(user_id: int) -> Optional[User]:
+    values = await user_cache.get(_user_key(user_id))
+    if values is None:
+        return None
+    # Detached and partial: routes needing more than USER_CACHE_FIELDS load the user
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """Decode the bearer token once per request"""
     payload = decode_access_token(token)
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    return payload
+
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current authenticated user"""
+    credentials_exception = _credentials_exception()
     
     username: str = payload.get("sub")
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user_id: Optional[int] = payload.get("user_id")
+    user = await _cached_user(user_id) if user_id is not None else None
     if user is None:
+        if user_id is not None:
+            user = await db.scalar(select(User).where(User.user_id == user_id))
+        else:
+            user = await db.scalar(select(User).where(User.username == username))
+        if user is not None:
+            await user_cache.set(_user_key(user.user_id), {key: getattr(user, key) for key in USER_CACHE_FIELDS})
+    
+    if user is None or user.username != username:
         raise credentials_exception
     
     if user.status != "Active":
@@ -46,3 +102,31 @@ async def get_current_active_user(
     """Get current active user"""
     return current_user
 
+
+async def get_current_permissions(
+    payload: dict = Depends(get_token_payload),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> FrozenSet[str]:
+    """Effective permissions of the current user"""
+    rbac = await get_rbac(db)
+    # Common case: the token's permissions were computed from the current map
+    if payload.get("rbac") == rbac.version and "perms" in payload:
+        return frozenset(payload["perms"])
+    
+    # Roles or grants changed since the token was issued, or it predates
+    # embedded permissions: its role ids may be stale too
+    role_ids = await db.scalars(select(user_role.c.role_id).where(user_role.c.user_id == current_user.user_id))
+    return rbac.permissions_for(role_ids)
+
+
+def require_permission(permission: str):
+    """Dependency that rejects users lacking the given permission"""
+    async def check_permission(permissions: FrozenSet[str] = Depends(get_current_permissions)):
+        if permission not in permissions:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Missing permission: {permission}"
+            )
+    return check_permission
+
@@ -0,0 +1,155 @@
+import asyncio
+import os
+from email.utils import formatdate
+from typing import Optional, Tuple
+from urllib.parse import quote
+from fastapi import Request, Response
+from starlette.types import Receive, Scope, Send
+from .conditional import _matches
+
+# Read size when the server cannot send the file itself
+CHUNK_SIZE = 256 * 1024
+
+# Content-addressed files never change, so clients may keep them indefinitely
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=" Range header into inclusive (start, end).
+
+    Returns None when the header should be ignored (other units, several
+    ranges, malformed) and the whole file served; raises ValueError when
+    the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and start > end:
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+def _range_allowed(if_range: Optional[str], etag: str, last_modified: str) -> bool:
+    """Whether an If-Range precondition lets the Range header apply"""
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"'):
+        # Strong comparison only
+        return if_range == etag
+    return if_range == last_modified
+
+
+def content_disposition(filename: str, disposition: str = "inline") -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition}; filename*=utf-8''{quoted}"
+    return f'{disposition}; filename="{filename}"'
+
+
+class RangeFileResponse(Response):
+    """
+    Serve a file, or the part of it asked for by Range / If-Range.
+
+    When the server offers the http.response.zerocopy ASGI extension the
+    file descriptor is handed over and the kernel sends the bytes
+    (sendfile); otherwise the requested span is read in CHUNK_SIZE pieces,
+    so memory stays flat however large the file is.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        path: str,
+        stat_result: os.stat_result,
+        etag: str,
+        media_type: str,
+        filename: Optional[str] = None,
+        cache_control: str = IMMUTABLE_CACHE_CONTROL
+    ):
+        self.path = path
+        self.send_header_only = request.method == "HEAD"
+        self.media_type = media_type
+        self.background = None
+        self.body = b""
+
+        size = stat_result.st_size
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": cache_control,
+        }
+        if filename is not None:
+            headers["Content-Disposition"] = content_disposition(filename)
+
+        self.status_code = 200
+        self.start, self.end = 0, size - 1
+        if_none_match = request.headers.get("if-none-match")
+        range_header = request.headers.get("range")
+        if if_none_match is not None and _matches(if_none_match, etag):
+            self.status_code = 304
+        elif range_header and _range_allowed(request.headers.get("if-range"), etag, last_modified):
+            try:
+                byte_range = parse_byte_range(range_header, size)
+            except ValueError:
+                self.status_code = 416
+                headers["Content-Range"] = f"bytes */{size}"
+            else:
+                if byte_range is not None:
+                    self.status_code = 206
+                    self.start, self.end = byte_range
+                    headers["Content-Range"] = f"bytes {self.start}-{self.end}/{size}"
+
+        if self.status_code in (304, 416):
+            self.start, self.end = 0, -1
+            self.media_type = None
+            headers.pop("Content-Disposition", None)
+        self.init_headers(headers)
+        if self.status_code != 304:
+            self.headers["content-length"] = str(self.end - self.start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if self.send_header_only or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        file = await asyncio.to_thread(open, self.path, "rb", 0)
+        try:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+            offset = self.start
+            while count > 0:
+                chunk = await asyncio.to_thread(os.pread, file.fileno(), min(CHUNK_SIZE, count), offset)
+                if not chunk:
+                    raise RuntimeError(f"{self.path} is shorter than expected")
+                offset += len(chunk)
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+        finally:
+            await asyncio.to_thread(file.close)
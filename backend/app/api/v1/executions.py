@@ -1,59 +1,165 @@
-from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+import json
+import mimetypes
+import os
+from typing import FrozenSet, List, NamedTuple, Optional
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy import case, exists, func, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.core.database import get_db
-from app.models.execution import Execution, StepExecution
-from app.models.checklist import Checklist
+from app.models.execution import Evidence, Execution, StepExecution
+from app.models.checklist import Checklist, ChecklistStep
 from app.schemas.execution import (
+    Evidence as EvidenceSchema,
     Execution as ExecutionSchema,
     ExecutionCreate,
     StepExecution as StepExecutionSchema,
-    StepExecutionCreate
+    StepExecutionCreate,
+    StepExecutionResult
 )
-from .dependencies import get_current_active_user
+from app.services.cache_versions import EXECUTIONS_VERSION, bump_version, version_query
+from app.services.evidence import UploadRejected, add_reference, discard_upload, receive_upload, release_reference
+from app.services.evidence_store import get_evidence_store, is_content_key
+from app.services.exports import (
+    MEDIA_TYPES,
+    ExportFormat,
+    executions_query,
+    step_executions_query,
+    stream_export
+)
+from app.services.rollups import StepState, execution_changed, execution_state, step_state, steps_changed
+from app.services.thumbnails import ThumbnailVariant, enqueue_thumbnails
+from .conditional import check_not_modified
+from .dependencies import get_current_active_user, get_current_permissions, require_permission
+from .downloads import RangeFileResponse, content_disposition
+from .pagination import Limit, Skip, SortOrder, paginate
+from .serialization import list_adapter, serialized_response
 
 router = APIRouter()
 
+# Writes require executions:run; reads only need an authenticated user
+RUN_EXECUTIONS = [Depends(require_permission("executions:run"))]
+
+# ExecutionSchema nests step_executions, which an async session cannot lazy load
+EXECUTION_OPTIONS = (selectinload(Execution.step_executions),)
+
+EXECUTION_LIST = list_adapter(ExecutionSchema)
+STEP_EXECUTION_LIST = list_adapter(StepExecutionSchema)
+
+# evidence_type inferred from the uploaded file's content type when not given
+EVIDENCE_TYPES = {"image": "Image", "video": "Video", "text": "Log"}
+
+
+async def _load_execution(db: AsyncSession, execution_id: int) -> Optional[Execution]:
+    """Load an execution with the relationships its response schema needs"""
+    return await db.get(Execution, execution_id, options=EXECUTION_OPTIONS, populate_existing=True)
+
+
+def _execution_validator(execution_id: int):
+    """Change markers of an execution and its step executions"""
+    return (
+        select(
+            Execution.updated_at,
+            func.count(StepExecution.exec_step_id),
+            func.max(StepExecution.updated_at)
+        )
+        .select_from(Execution)
+        .outerjoin(StepExecution, StepExecution.execution_id == Execution.execution_id)
+        .where(Execution.execution_id == execution_id)
+        # No row (and so no ETag) for an id that does not exist
+        .group_by(Execution.execution_id)
+    )
+
 
 @router.get("", response_model=List[ExecutionSchema])
 async def read_executions(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
+    checklist_id: Optional[int] = None,
+    order: SortOrder = "asc",
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get list of executions, oldest first unless order=desc"""
+    criteria = [Execution.checklist_id == checklist_id] if checklist_id else []
+    # A primary key lookup instead of aggregating over all executions and steps
+    not_modified = await check_not_modified(db, request, response, version_query(EXECUTIONS_VERSION))
+    if not_modified:
+        return not_modified
+    
+    query = select(Execution).options(*EXECUTION_OPTIONS).where(*criteria)
+    executions = await paginate(db, query, Execution.execution_id, response, skip, limit, cursor, order)
+    return serialized_response(EXECUTION_LIST, executions, response)
+
+
+def _export_response(query, format: ExportFormat, name: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_export(query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    )
+
+
+@router.get("/export")
+async def export_executions(
+    format: ExportFormat = "ndjson",
     checklist_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     current_user = Depends(get_current_active_user)
 ):
-    """Get list of executions"""
-    query = db.query(Execution)
-    if checklist_id:
-        query = query.filter(Execution.checklist_id == checklist_id)
-    executions = query.offset(skip).limit(limit).all()
-    return executions
+    """Stream executions started in [start_date, end_date) as NDJSON or CSV"""
+    return _export_response(executions_query(checklist_id, start_date, end_date), format, "executions")
+
+
+@router.get("/export/steps")
+async def export_step_executions(
+    format: ExportFormat = "ndjson",
+    checklist_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user = Depends(get_current_active_user)
+):
+    """Stream step executions of executions started in [start_date, end_date) as NDJSON or CSV"""
+    return _export_response(step_executions_query(checklist_id, start_date, end_date), format, "step_executions")
 
 
 @router.get("/{execution_id}", response_model=ExecutionSchema)
 async def read_execution(
     execution_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get execution by ID"""
-    execution = db.query(Execution).filter(Execution.execution_id == execution_id).first()
+    not_modified = await check_not_modified(
+        db, request, response, _execution_validator(execution_id)
+    )
+    if not_modified:
+        return not_modified
+    
+    execution = await _load_execution(db, execution_id)
     if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     return execution
 
 
-@router.post("", response_model=ExecutionSchema, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=ExecutionSchema, status_code=status.HTTP_201_CREATED, dependencies=RUN_EXECUTIONS)
 async def create_execution(
     execution: ExecutionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Start a new execution"""
     # Verify checklist exists
-    checklist = db.query(Checklist).filter(Checklist.checklist_id == execution.checklist_id).first()
+    checklist = await db.get(Checklist, execution.checklist_id)
     if not checklist:
         raise HTTPException(status_code=404, detail="Checklist not found")
     
@@ -65,85 +171,367 @@ async def create_execution(
         notes=execution.notes
     )
     db.add(db_execution)
-    db.commit()
-    db.refresh(db_execution)
-    return db_execution
+    await db.flush()
+
+    # One Pending step execution per checklist step, in a single INSERT ... SELECT
+    step_ids = await db.scalars(
+        insert(StepExecution)
+        .from_select(
+            ["execution_id", "step_id", "status"],
+            select(literal(db_execution.execution_id), ChecklistStep.step_id, literal("Pending"))
+            .where(ChecklistStep.checklist_id == execution.checklist_id)
+            .order_by(ChecklistStep.step_number)
+        )
+        .returning(StepExecution.step_id)
+    )
+    await execution_changed(db, db_execution, None)
+    await steps_changed(db, db_execution, [(None, StepState(step_id, None, None)) for step_id in step_ids])
+    await bump_version(db, EXECUTIONS_VERSION)
+    await db.commit()
+    return await _load_execution(db, db_execution.execution_id)
 
 
-@router.put("/{execution_id}/complete", response_model=ExecutionSchema)
+@router.put("/{execution_id}/complete", response_model=ExecutionSchema, dependencies=RUN_EXECUTIONS)
 async def complete_execution(
     execution_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Mark execution as completed"""
-    db_execution = db.query(Execution).filter(Execution.execution_id == execution_id).first()
+    """Mark execution as finished, deriving its status and total time from its steps"""
+    db_execution = await db.get(Execution, execution_id)
     if db_execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    db_execution.status = "Completed"
-    db_execution.end_time = datetime.utcnow()
-    db.commit()
-    db.refresh(db_execution)
-    return db_execution
+    before = execution_state(db_execution)
+    of_execution = StepExecution.execution_id == Execution.execution_id
+    failed = exists().where(
+        of_execution,
+        or_(StepExecution.status == "Failed", StepExecution.verification_result == "Fail")
+    )
+    unfinished = exists().where(of_execution, StepExecution.status.in_(("Pending", "In Progress")))
+    # A failure settles the outcome; otherwise every step must have finished.
+    # Checked in the UPDATE itself, so a concurrent step write cannot slip in.
+    completed = await db.scalar(
+        update(Execution)
+        .where(Execution.execution_id == execution_id, or_(failed, ~unfinished))
+        .values(
+            status=case((failed, "Failed"), else_="Completed"),
+            end_time=datetime.utcnow(),
+            total_execution_time=select(func.sum(StepExecution.execution_time)).where(of_execution).scalar_subquery()
+        )
+        .returning(Execution.execution_id)
+        .execution_options(synchronize_session=False)
+    )
+    if completed is None:
+        raise HTTPException(status_code=409, detail="Execution has steps that are not finished")
+    # The instance in the identity map still holds the old values; the rollups need the new ones
+    await db.refresh(db_execution, ["status", "end_time", "total_execution_time"])
+    await execution_changed(db, db_execution, before)
+    await bump_version(db, EXECUTIONS_VERSION)
+    await db.commit()
+    return await _load_execution(db, execution_id)
 
 
 # Step Executions
 @router.get("/{execution_id}/steps", response_model=List[StepExecutionSchema])
 async def read_step_executions(
     execution_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get step executions for an execution"""
-    step_executions = db.query(StepExecution).filter(
-        StepExecution.execution_id == execution_id
-    ).all()
-    return step_executions
+    result = await db.scalars(
+        select(StepExecution).where(
+            StepExecution.execution_id == execution_id
+        )
+    )
+    return serialized_response(STEP_EXECUTION_LIST, result.all(), response)
 
 
-@router.post("/{execution_id}/steps", response_model=StepExecutionSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/{execution_id}/steps", response_model=StepExecutionSchema, status_code=status.HTTP_201_CREATED, dependencies=RUN_EXECUTIONS)
 async def create_step_execution(
     execution_id: int,
     step_execution: StepExecutionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
-    """Create a step execution"""
+    """Record a step result, filling in the step's pre-created execution row if it has one"""
     # Verify execution exists
-    execution = db.query(Execution).filter(Execution.execution_id == execution_id).first()
+    execution = await db.get(Execution, execution_id)
     if not execution:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    db_step_execution = StepExecution(
-        **step_execution.dict(),
-        execution_id=execution_id
+    db_step_execution = await db.scalar(
+        select(StepExecution)
+        .where(StepExecution.execution_id == execution_id, StepExecution.step_id == step_execution.step_id)
+        .order_by(StepExecution.exec_step_id.desc())
+        .limit(1)
     )
-    db.add(db_step_execution)
-    db.commit()
-    db.refresh(db_step_execution)
+    if db_step_execution is None:
+        db_step_execution = StepExecution(
+            **step_execution.model_dump(),
+            execution_id=execution_id
+        )
+        db.add(db_step_execution)
+        before = None
+    else:
+        before = step_state(db_step_execution)
+        for field, value in step_execution.model_dump().items():
+            setattr(db_step_execution, field, value)
+    await steps_changed(db, execution, [(before, step_state(db_step_execution))])
+    await bump_version(db, EXECUTIONS_VERSION)
+    await db.commit()
+    await db.refresh(db_step_execution)
     return db_step_execution
 
 
-@router.put("/steps/{step_execution_id}", response_model=StepExecutionSchema)
+@router.put("/{execution_id}/steps", response_model=List[StepExecutionSchema], dependencies=RUN_EXECUTIONS)
+async def submit_step_executions(
+    execution_id: int,
+    results: List[StepExecutionResult],
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Record the results of many steps at once, creating or updating their step executions"""
+    execution = await db.get(Execution, execution_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+    step_ids = [result.step_id for result in results]
+    if len(set(step_ids)) != len(step_ids):
+        raise HTTPException(status_code=400, detail="Each step may only appear once")
+
+    # Verify all steps belong to the execution's checklist with one query
+    valid_step_ids = set(await db.scalars(
+        select(ChecklistStep.step_id).where(
+            ChecklistStep.checklist_id == execution.checklist_id,
+            ChecklistStep.step_id.in_(step_ids)
+        )
+    ))
+    unknown = [step_id for step_id in step_ids if step_id not in valid_step_ids]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Steps not in this checklist: {unknown}")
+
+    # Latest existing step execution per step, updated in place
+    existing = {
+        step_execution.step_id: step_execution
+        for step_execution in await db.scalars(
+            select(StepExecution)
+            .where(StepExecution.execution_id == execution_id, StepExecution.step_id.in_(step_ids))
+            .order_by(StepExecution.exec_step_id)
+        )
+    }
+
+    changes = []
+    step_executions = []
+    for result in results:
+        db_step_execution = existing.get(result.step_id)
+        if db_step_execution is None:
+            db_step_execution = StepExecution(**result.model_dump(), execution_id=execution_id)
+            db.add(db_step_execution)
+            before = None
+        else:
+            before = step_state(db_step_execution)
+            for field, value in result.model_dump().items():
+                setattr(db_step_execution, field, value)
+        changes.append((before, step_state(db_step_execution)))
+        step_executions.append(db_step_execution)
+
+    await steps_changed(db, execution, changes)
+    await bump_version(db, EXECUTIONS_VERSION)
+    # One flush inserts the new rows in batches; one commit for the whole submission
+    await db.commit()
+
+    ids = [step_execution.exec_step_id for step_execution in step_executions]
+    result = await db.scalars(
+        select(StepExecution)
+        .where(StepExecution.exec_step_id.in_(ids))
+        .order_by(StepExecution.step_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.all()
+
+
+@router.put("/steps/{step_execution_id}", response_model=StepExecutionSchema, dependencies=RUN_EXECUTIONS)
 async def update_step_execution(
     step_execution_id: int,
     step_execution: StepExecutionCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Update a step execution"""
-    db_step_execution = db.query(StepExecution).filter(
-        StepExecution.exec_step_id == step_execution_id
-    ).first()
+    db_step_execution = await db.get(StepExecution, step_execution_id)
     if db_step_execution is None:
         raise HTTPException(status_code=404, detail="Step execution not found")
     
-    update_data = step_execution.dict(exclude_unset=True)
+    before = step_state(db_step_execution)
+    update_data = step_execution.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_step_execution, field, value)
     
-    db.commit()
-    db.refresh(db_step_execution)
+    execution = await db.get(Execution, db_step_execution.execution_id)
+    await steps_changed(db, execution, [(before, step_state(db_step_execution))])
+    await bump_version(db, EXECUTIONS_VERSION)
+    await db.commit()
+    await db.refresh(db_step_execution)
     return db_step_execution
 
+
+@router.post("/steps/{exec_step_id}/evidence", response_model=EvidenceSchema, status_code=status.HTTP_201_CREATED, dependencies=RUN_EXECUTIONS)
+async def upload_evidence(
+    exec_step_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Upload an evidence file for a step execution as multipart/form-data"""
+    if await db.get(StepExecution, exec_step_id) is None:
+        raise HTTPException(status_code=404, detail="Step execution not found")
+    # Release the pooled connection while the body streams in
+    await db.rollback()
+    
+    store = get_evidence_store()
+    try:
+        upload = await receive_upload(request, store.incoming_dir)
+    except UploadRejected as e:
+        status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE if e.too_large else status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=status_code, detail=str(e))
+    
+    try:
+        try:
+            metadata = json.loads(upload.fields.get("metadata") or "{}")
+            timestamp = datetime.fromisoformat(upload.fields["timestamp"]) if upload.fields.get("timestamp") else datetime.now(timezone.utc)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid metadata or timestamp field")
+        if not isinstance(metadata, dict):
+            metadata = {"value": metadata}
+        metadata["filename"] = upload.filename
+        
+        # Identical content is stored once; the row only holds its key
+        key = await add_reference(db, store, upload)
+        evidence = Evidence(
+            exec_step_id=exec_step_id,
+            file_path=key,
+            evidence_type=upload.fields.get("evidence_type") or EVIDENCE_TYPES.get(upload.content_type.split("/")[0], "Log"),
+            timestamp=timestamp,
+            evidence_metadata=json.dumps(metadata),
+            sha256=upload.sha256,
+            size_bytes=upload.size,
+            content_type=upload.content_type
+        )
+        db.add(evidence)
+        await db.commit()
+    finally:
+        await discard_upload(upload)
+    await db.refresh(evidence)
+    if evidence.evidence_type == "Image":
+        enqueue_thumbnails(evidence.evidence_id)
+    return evidence
+
+
+@router.delete("/evidence/{evidence_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=RUN_EXECUTIONS)
+async def delete_evidence(
+    evidence_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Delete evidence; its file is removed by garbage collection once unreferenced"""
+    evidence = await db.get(Evidence, evidence_id)
+    if evidence is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    
+    await release_reference(db, evidence.file_path)
+    await db.delete(evidence)
+    await db.commit()
+    return None
+
+
+class ReadableEvidence(NamedTuple):
+    """What the download routes need from an evidence row, as plain values"""
+    key: str
+    media_type: str
+    filename: str
+    thumbnails: dict
+
+
+async def _readable_evidence(
+    db: AsyncSession,
+    evidence_id: int,
+    current_user,
+    permissions: FrozenSet[str]
+) -> ReadableEvidence:
+    """Look up evidence the current user may see: their own execution's, or any with evidence:view"""
+    row = (await db.execute(
+        select(
+            Evidence.file_path,
+            Evidence.content_type,
+            Evidence.evidence_metadata,
+            Execution.user_id
+        )
+        .join(StepExecution, StepExecution.exec_step_id == Evidence.exec_step_id)
+        .join(Execution, Execution.execution_id == StepExecution.execution_id)
+        .where(Evidence.evidence_id == evidence_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Evidence not found")
+    if row.user_id != current_user.user_id and "evidence:view" not in permissions:
+        raise HTTPException(status_code=403, detail="Missing permission: evidence:view")
+    if not is_content_key(row.file_path):
+        # Stored by path before content addressing; scripts/collect_evidence_garbage.py imports it
+        raise HTTPException(status_code=404, detail="Evidence file not found")
+    # Release the pooled connection before a file is sent; only plain values
+    # are returned, so nothing needs the (now expired) session state
+    await db.rollback()
+
+    metadata = json.loads(row.evidence_metadata or "{}")
+    filename = metadata.get("filename") or f"evidence-{evidence_id}"
+    media_type = row.content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return ReadableEvidence(row.file_path, media_type, filename, metadata.get("thumbnails") or {})
+
+
+async def _send_stored(request: Request, key: str, media_type: str, filename: str) -> Response:
+    """Redirect to the store's own URL when it has one, else serve the local file"""
+    store = get_evidence_store()
+    url = await store.download_url(key, media_type, content_disposition(filename))
+    if url is not None:
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    
+    path = store.local_path(key)
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Evidence file not found")
+    # Keys are derived from the file's SHA-256, so they make strong validators
+    return RangeFileResponse(request, path, stat_result, f'"{key}"', media_type, filename)
+
+
+@router.api_route("/evidence/{evidence_id}/download", methods=["GET", "HEAD"])
+async def download_evidence(
+    evidence_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user),
+    permissions: FrozenSet[str] = Depends(get_current_permissions)
+):
+    """Download an evidence file; supports Range and If-Range for seeking"""
+    evidence = await _readable_evidence(db, evidence_id, current_user, permissions)
+    return await _send_stored(request, evidence.key, evidence.media_type, evidence.filename)
+
+
+@router.get("/evidence/{evidence_id}/thumbnail")
+async def get_evidence_thumbnail(
+    evidence_id: int,
+    request: Request,
+    variant: ThumbnailVariant = "thumbnail",
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user),
+    permissions: FrozenSet[str] = Depends(get_current_permissions)
+):
+    """Get the thumbnail or preview of image evidence"""
+    evidence = await _readable_evidence(db, evidence_id, current_user, permissions)
+    if variant not in evidence.thumbnails:
+        raise HTTPException(status_code=404, detail="Thumbnail not available")
+    return await _send_stored(
+        request, evidence.thumbnails[variant]["key"], "image/jpeg", f"evidence-{evidence_id}-{variant}.jpg"
+    )
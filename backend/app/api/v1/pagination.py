@@ -0,0 +1,72 @@
+import base64
+import json
+from typing import Annotated, Any, List, Literal, Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+
+# Response header carrying the opaque cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Largest page a client may request
+MAX_PAGE_SIZE = 1000
+
+# Query parameters shared by the paginated list routes
+Skip = Annotated[int, Query(ge=0)]
+Limit = Annotated[int, Query(ge=0, le=MAX_PAGE_SIZE)]
+SortOrder = Literal["asc", "desc"]
+
+
+def encode_cursor(key: Any) -> str:
+    """Encode the last key of a page as an opaque cursor"""
+    raw = json.dumps({"k": key}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a cursor produced by encode_cursor; every paginated key is an integer id"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["k"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # bool is an int subclass, but never a key
+    if not isinstance(key, int) or isinstance(key, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    key: InstrumentedAttribute,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order: SortOrder = "asc"
+) -> List[Any]:
+    """
+    Fetch one page of query ordered by key, ascending or descending.
+
+    With a cursor the page starts after the cursor's key (keyset pagination),
+    so deep pages cost the same as the first; otherwise skip/limit is used.
+    When more rows remain, the next page's cursor is set in X-Next-Cursor.
+    """
+    descending = order == "desc"
+    query = query.order_by(key.desc() if descending else key)
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        query = query.where(key < after if descending else key > after)
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether another page exists
+    limit = min(max(limit, 0), MAX_PAGE_SIZE)
+    rows = (await db.scalars(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more and rows:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(rows[-1], key.key))
+    return rows
@@ -1,21 +1,121 @@
-from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.models.report import Report
-from .dependencies import get_current_active_user
+from app.schemas.report import ExecutionSummary, Report as ReportSchema, ReportCreate
+from app.services.execution_stats import execution_summary
+from app.services.report_generator import enqueue_report, parameters_hash, report_is_current
+from .dependencies import get_current_active_user, require_permission
+from .pagination import Limit, Skip, paginate
+from .serialization import list_adapter, serialized_response
 
 router = APIRouter()
 
+# Writes require reports:generate; reads only need an authenticated user
+GENERATE_REPORTS = [Depends(require_permission("reports:generate"))]
 
-@router.get("/")
+REPORT_LIST = list_adapter(ReportSchema)
+
+
+@router.get("/", response_model=List[ReportSchema])
 async def read_reports(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_active_user)
 ):
     """Get list of reports"""
-    reports = db.query(Report).offset(skip).limit(limit).all()
-    return reports
+    reports = await paginate(db, select(Report), Report.report_id, response, skip, limit, cursor)
+    return serialized_response(REPORT_LIST, reports, response)
+
+
+
+@router.get("/execution-summary", response_model=ExecutionSummary)
+async def read_execution_summary(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get execution statistics for executions started in [start_date, end_date)"""
+    return await execution_summary(db, start_date, end_date)
+
+
+@router.post("/", response_model=ReportSchema, status_code=status.HTTP_202_ACCEPTED, dependencies=GENERATE_REPORTS)
+async def create_report(
+    report: ReportCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Request a report; identical requests reuse a pending or still current report instead of regenerating it"""
+    parameters = report.parameters.model_dump(mode="json")
+    digest = parameters_hash(report.report_type, parameters)
+
+    existing = await db.scalar(
+        select(Report)
+        .where(Report.parameters_hash == digest, Report.status != "Failed")
+        .order_by(Report.report_id.desc())
+        .limit(1)
+    )
+    if existing is not None and existing.status != "Completed":
+        return existing
+    if (
+        existing is not None
+        and report_is_current(existing)
+        and existing.file_path
+        and await asyncio.to_thread(os.path.exists, existing.file_path)
+    ):
+        return existing
+
+    db_report = Report(
+        report_type=report.report_type,
+        parameters=parameters,
+        parameters_hash=digest,
+        generated_by=current_user.user_id,
+        status="Pending"
+    )
+    db.add(db_report)
+    await db.commit()
+    await db.refresh(db_report)
+    enqueue_report(db_report.report_id)
+    return db_report
+
+
+@router.get("/{report_id}", response_model=ReportSchema)
+async def read_report(
+    report_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Get report by ID, including its generation status"""
+    report = await db.get(Report, report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
+
+
+@router.get("/{report_id}/download")
+async def download_report(
+    report_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_active_user)
+):
+    """Download a generated report file"""
+    report = await db.get(Report, report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if report.status != "Completed" or not report.file_path:
+        raise HTTPException(status_code=409, detail=f"Report is not ready (status: {report.status})")
+    if not await asyncio.to_thread(os.path.exists, report.file_path):
+        raise HTTPException(status_code=404, detail="Report file not found")
 
+    media_type = "text/html" if report.file_path.endswith(".html") else "text/csv"
+    return FileResponse(report.file_path, media_type=media_type, filename=os.path.basename(report.file_path))
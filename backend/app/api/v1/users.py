@@ -1,104 +1,139 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from app.core.database import get_db
-from app.models.user import User
+from app.core.security import get_password_hash_async
+from app.models.user import Role, User
 from app.schemas.user import User as UserSchema, UserCreate, UserUpdate
-from .dependencies import get_current_active_user
+from app.services.rbac import bump_rbac_version, invalidate_rbac
+from .dependencies import get_current_active_user, invalidate_user, require_permission
+from .pagination import Limit, Skip, paginate
+from .serialization import list_adapter, serialized_response
 
 router = APIRouter()
 
+# Writes require users:manage; reads only need an authenticated user
+MANAGE_USERS = [Depends(require_permission("users:manage"))]
+
+# UserSchema nests roles, which an async session cannot lazy load
+USER_OPTIONS = (selectinload(User.roles),)
+USER_LIST = list_adapter(UserSchema)
+
+
+async def _load_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    """Load a user with the relationships its response schema needs"""
+    return await db.get(User, user_id, options=USER_OPTIONS, populate_existing=True)
+
+
+async def _roles(db: AsyncSession, role_ids: List[int]) -> List[Role]:
+    """Load the roles with the given ids, rejecting unknown ones"""
+    roles = list(await db.scalars(select(Role).where(Role.role_id.in_(role_ids))))
+    if len(roles) != len(set(role_ids)):
+        raise HTTPException(status_code=404, detail="Role not found")
+    return roles
+
 
 @router.get("", response_model=List[UserSchema])
 async def read_users(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    response: Response,
+    skip: Skip = 0,
+    limit: Limit = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of users"""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    query = select(User).options(*USER_OPTIONS)
+    users = await paginate(db, query, User.user_id, response, skip, limit, cursor)
+    return serialized_response(USER_LIST, users, response)
 
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get user by ID"""
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await _load_user(db, user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
-@router.post("", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
+@router.post("", response_model=UserSchema, status_code=status.HTTP_201_CREATED, dependencies=MANAGE_USERS)
 async def create_user(
     user: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new user"""
     # Check if username exists
-    if db.query(User).filter(User.username == user.username).first():
+    if await db.scalar(select(User.user_id).where(User.username == user.username)):
         raise HTTPException(status_code=400, detail="Username already registered")
     
     # Check if email exists
-    if db.query(User).filter(User.email == user.email).first():
+    if await db.scalar(select(User.user_id).where(User.email == user.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    from app.core.security import get_password_hash
-    
     db_user = User(
         username=user.username,
         email=user.email,
-        password_hash=get_password_hash(user.password),
+        password_hash=await get_password_hash_async(user.password),
         first_name=user.first_name,
         last_name=user.last_name,
-        status=user.status
+        status=user.status,
+        roles=await _roles(db, user.role_ids) if user.role_ids else []
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    await db.commit()
+    return await _load_user(db, db_user.user_id)
 
 
-@router.put("/{user_id}", response_model=UserSchema)
+@router.put("/{user_id}", response_model=UserSchema, dependencies=MANAGE_USERS)
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Update user"""
-    db_user = db.query(User).filter(User.user_id == user_id).first()
+    db_user = await _load_user(db, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    update_data = user_update.dict(exclude_unset=True)
+    update_data = user_update.model_dump(exclude_unset=True)
+    role_ids = update_data.pop("role_ids", None)
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    if role_ids is not None:
+        db_user.roles = await _roles(db, role_ids)
+        # Tokens already issued to the user carry the old roles
+        await bump_rbac_version(db)
+    
+    await db.commit()
+    await invalidate_user(user_id)
+    if role_ids is not None:
+        invalidate_rbac()
+    return await _load_user(db, user_id)
 
 
-@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=MANAGE_USERS)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Delete user (soft delete by setting status to Inactive)"""
-    db_user = db.query(User).filter(User.user_id == user_id).first()
+    db_user = await db.get(User, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     db_user.status = "Inactive"
-    db.commit()
+    await db.commit()
+    await invalidate_user(user_id)
     return None
-
@@ -0,0 +1,153 @@
+"""
+Response compression middleware
+
+Compresses complete (non-streaming) responses with brotli when the client
+accepts it and the brotli package is installed, otherwise gzip. Responses
+below a size threshold, with a content type outside the allowlist, already
+encoded, streamed in several chunks (exports), other than 200, or
+advertising byte ranges (file downloads) are sent unchanged. Each
+compressed response reports its ratio and CPU cost in a Server-Timing
+entry, and running totals are kept in compression_stats.
+"""
+import gzip
+import logging
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip only
+    brotli = None
+
+logger = logging.getLogger("app.compression")
+
+
+@dataclass
+class CompressionStats:
+    responses: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+
+compression_stats = CompressionStats()
+
+
+def _accepted_encodings(accept_encoding: str) -> set:
+    """Codings the client accepts, ignoring those with q=0"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        content_types: Iterable[str] = ("application/json",),
+        gzip_level: int = 6,
+        brotli_quality: int = 4
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = frozenset(content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, scope: Scope) -> Optional[str]:
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = self._choose_encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or start_message is None:
+                await send(message)
+                return
+            if message["type"] != "http.response.body":
+                # e.g. a zero-copy file send: nothing to compress
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if (
+                message.get("more_body", False)
+                or start_message["status"] != 200
+                # Byte-range capable responses (evidence downloads): ranges and
+                # strong ETags describe the stored bytes, not an encoding of them
+                or "accept-ranges" in headers
+                or "content-range" in headers
+                or "content-encoding" in headers
+                or content_type not in self.content_types
+                or len(body) < self.minimum_size
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            started = time.thread_time()
+            compressed = self._compress(encoding, body)
+            cpu = time.thread_time() - started
+
+            compression_stats.responses += 1
+            compression_stats.bytes_in += len(body)
+            compression_stats.bytes_out += len(compressed)
+            compression_stats.cpu_seconds += cpu
+            logger.debug(
+                "%s %s: %s %d -> %d bytes in %.2f ms",
+                scope["method"], scope["path"], encoding, len(body), len(compressed), cpu * 1000
+            )
+
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            headers.append(
+                "Server-Timing", f'compress;dur={cpu * 1000:.2f};desc="{encoding} {len(body)}>{len(compressed)}"'
+            )
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
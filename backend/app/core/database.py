@@ -1,25 +1,143 @@
-from sqlalchemy import create_engine
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session, raiseload, sessionmaker
 from .config import settings
 
+# Synchronous engine, used by Alembic and the maintenance scripts
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Asynchronous engine, used by the API so queries never block the event loop
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW
+)
+
+# expire_on_commit=False keeps loaded attributes readable after commit,
+# since an async session cannot lazily reload them during serialization
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+slow_query_logger = logging.getLogger("app.sql.slow")
 
-def get_db():
-    """Dependency for getting database session"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+@dataclass
+class QueryStats:
+    """Statements executed and time spent in the database for one request"""
+    route: str
+    count: int = 0
+    duration: float = 0.0  # seconds
+
+
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_query_stats(route: str) -> QueryStats:
+    """Start accumulating query stats for the current request"""
+    stats = QueryStats(route=route)
+    _query_stats.set(stats)
+    return stats
+
+
+def _parameter_shape(parameters: Any) -> Any:
+    """Describe bound parameters by type only, so values never reach the logs"""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: one parameter set per row
+            return f"{len(parameters)} x {_parameter_shape(parameters[0])}"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold > 0 and elapsed * 1000 >= threshold:
+        slow_query_logger.warning(
+            "Slow query (%.1f ms) in %s: %s | params: %s",
+            elapsed * 1000,
+            stats.route if stats is not None else "<no request>",
+            " ".join(statement.split()),
+            _parameter_shape(parameters)
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(target: Engine):
+    """Count and time every statement on target, logging slow ones"""
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+
+def _raise_on_lazy_load(execute_state: ORMExecuteState):
+    """Make every relationship not eagerly loaded by a query raise on access"""
+    if not execute_state.is_select or execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    # Only entity queries carry relationships; skip column-only selects
+    if any(desc["expr"] is desc["entity"] for desc in execute_state.statement.column_descriptions):
+        execute_state.statement = execute_state.statement.options(raiseload("*"))
+
+
+def enable_strict_loading():
+    """
+    Turn unplanned lazy loads into errors for all sessions.
+
+    Routes must load what their response schema needs up front; with strict
+    loading on, an N+1 regression fails loudly instead of issuing one query
+    per row. Enabled by DB_RAISE_ON_LAZY_LOAD, or call it from a test setup.
+    """
+    if not event.contains(Session, "do_orm_execute", _raise_on_lazy_load):
+        event.listen(Session, "do_orm_execute", _raise_on_lazy_load)
+
+
+if settings.DB_RAISE_ON_LAZY_LOAD:
+    enable_strict_loading()
+
+
+async def get_db():
+    """Dependency for getting an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
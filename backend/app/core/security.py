@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -8,6 +10,10 @@ from .config import settings
 BCRYPT_MAX_PASSWORD_LENGTH = 72
 
 
+class PasswordHashingBusy(Exception):
+    """Raised when too many password hash jobs are already queued"""
+
+
 def _ensure_password_bytes(password: str) -> bytes:
     """Ensure password is within bcrypt's 72-byte limit and return as bytes"""
     password_bytes = password.encode('utf-8')
@@ -50,7 +56,7 @@ def get_password_hash(password: str) -> str:
         # Ensure password is within bcrypt's limit
         password_bytes = _ensure_password_bytes(password)
         # Generate salt and hash
-        salt = bcrypt.gensalt(rounds=12)
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
         hashed = bcrypt.hashpw(password_bytes, salt)
         # Return as string
         return hashed.decode('utf-8')
@@ -60,6 +66,48 @@ def get_password_hash(password: str) -> str:
         raise ValueError(f"Unexpected error hashing password: {type(e).__name__}")
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash uses a different cost than BCRYPT_ROUNDS"""
+    try:
+        # Bcrypt hashes look like $2b$<cost>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError, AttributeError):
+        return True
+
+
+# bcrypt releases the GIL, so a thread pool keeps hashing off the event loop
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_jobs = 0
+
+
+async def _run_hash_job(func, *args):
+    """Run a hashing function in the bounded pool, shedding load when it is full"""
+    global _hash_executor, _hash_jobs
+    if _hash_jobs >= settings.PASSWORD_HASH_QUEUE_LIMIT:
+        raise PasswordHashingBusy()
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash"
+        )
+
+    _hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_jobs -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password without blocking the event loop"""
+    return await _run_hash_job(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash without blocking the event loop"""
+    return await _run_hash_job(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
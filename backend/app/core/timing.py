@@ -0,0 +1,40 @@
+"""
+Per-request database timing headers
+
+Reports the number of statements and the time spent in the database as
+X-DB-Queries and Server-Timing entries on every HTTP response. Written as
+plain ASGI middleware, rather than with @app.middleware("http"), so
+response bodies pass through untouched: large file downloads are not
+re-chunked through a memory stream, and server extensions such as
+zero-copy sends keep working.
+"""
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.database import start_query_stats
+
+
+class DatabaseTimingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_query_stats(f"{scope['method']} {scope['path']}")
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.count)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", total;dur={total_ms:.1f}'
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
@@ -1,17 +1,44 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.security import PasswordHashingBusy
+from app.core.timing import DatabaseTimingMiddleware
 from app.api.v1 import auth, users, cameras, checklists, executions, reports
+from app.api.v1.pagination import NEXT_CURSOR_HEADER
+from app.services.camera_health import start_camera_health_poller, stop_camera_health_poller
+from app.services.heartbeats import start_heartbeat_flusher, stop_heartbeat_flusher
+from app.services.report_generator import start_report_workers, stop_report_workers
+from app.services.thumbnails import start_thumbnail_workers, stop_thumbnail_workers
 
 # Create database tables (in production, use migrations)
 # Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers with the application"""
+    await start_report_workers()
+    start_camera_health_poller()
+    start_heartbeat_flusher()
+    start_thumbnail_workers()
+    yield
+    await stop_thumbnail_workers()
+    await stop_heartbeat_flusher()
+    await stop_camera_health_poller()
+    await stop_report_workers()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -21,8 +48,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER, "ETag", "Last-Modified", "Server-Timing", "X-DB-Queries",
+        "Accept-Ranges", "Content-Range", "Content-Disposition"
+    ],
 )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        content_types=settings.COMPRESSION_CONTENT_TYPES,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+# Outermost, so its totals include compression
+app.add_middleware(DatabaseTimingMiddleware)
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy(request: Request, exc: PasswordHashingBusy):
+    """Shed login/registration load instead of queueing it without bound"""
+    return ORJSONResponse(
+        status_code=429,
+        content={"detail": "Too many authentication requests, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
 # Include routers
 # Each router gets its own prefix to avoid route conflicts
 app.include_router(auth.router, prefix=settings.API_V1_STR, tags=["authentication"])
@@ -1,8 +1,10 @@
 from .user import User, Role, Permission, UserRole, RolePermission
-from .camera import Camera, Site, Zone, CameraMapping
+from .camera import Camera, Site, Zone, CameraMapping, CameraStatusHistory
 from .checklist import Checklist, ChecklistTemplate, ChecklistStep
-from .execution import Execution, StepExecution, Evidence, Exception, Alert
+from .execution import Execution, StepExecution, Evidence, EvidenceBlob, Exception, Alert
 from .report import Report
+from .rollup import ExecutionRollup, StepRollup, SiteRollup
+from .cache import CacheVersion
 
 __all__ = [
     "User",
@@ -14,14 +16,20 @@ __all__ = [
     "Site",
     "Zone",
     "CameraMapping",
+    "CameraStatusHistory",
     "Checklist",
     "ChecklistTemplate",
     "ChecklistStep",
     "Execution",
     "StepExecution",
     "Evidence",
+    "EvidenceBlob",
     "Exception",
     "Alert",
     "Report",
+    "ExecutionRollup",
+    "StepRollup",
+    "SiteRollup",
+    "CacheVersion",
 ]
 
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, DateTime, BigInteger
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+
+class CacheVersion(Base):
+    """Version counters for in-memory caches, bumped by the writes that invalidate them"""
+    __tablename__ = "cache_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
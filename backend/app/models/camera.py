@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, JSON, Text, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -24,7 +24,7 @@ class Zone(Base):
 
     zone_id = Column(Integer, primary_key=True, index=True)
     zone_name = Column(String(100), nullable=False)
-    site_id = Column(Integer, ForeignKey("sites.site_id"), nullable=False)
+    site_id = Column(Integer, ForeignKey("sites.site_id"), nullable=False, index=True)
     description = Column(Text)
     status = Column(String(20), default="Active")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -37,6 +37,9 @@ class Zone(Base):
 
 class Camera(Base):
     __tablename__ = "cameras"
+    __table_args__ = (
+        Index("ix_cameras_zone_id_status", "zone_id", "status"),
+    )
 
     camera_id = Column(Integer, primary_key=True, index=True)
     camera_name = Column(String(100), nullable=False)
@@ -61,20 +64,25 @@ class Camera(Base):
     last_maintenance = Column(DateTime(timezone=True))
     firmware_version = Column(String(50))
     configuration = Column(JSON)  # JSON configuration parameters
+    # Latest reported state, written in batches by the heartbeat ingester
+    last_heartbeat = Column(DateTime(timezone=True))
+    reported_fps = Column(Float)
+    is_recording = Column(Boolean)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     zone = relationship("Zone", back_populates="cameras")
     camera_mappings = relationship("CameraMapping", back_populates="camera", cascade="all, delete-orphan")
+    status_history = relationship("CameraStatusHistory", back_populates="camera", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class CameraMapping(Base):
     __tablename__ = "camera_mappings"
 
     mapping_id = Column(Integer, primary_key=True, index=True)
-    camera_id = Column(Integer, ForeignKey("cameras.camera_id"), nullable=False)
-    step_id = Column(Integer, ForeignKey("checklist_steps.step_id"), nullable=False)
+    camera_id = Column(Integer, ForeignKey("cameras.camera_id"), nullable=False, index=True)
+    step_id = Column(Integer, ForeignKey("checklist_steps.step_id"), nullable=False, index=True)
     zone_config = Column(JSON)  # JSON configuration for monitoring zones/angles
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -83,3 +91,23 @@ class CameraMapping(Base):
     camera = relationship("Camera", back_populates="camera_mappings")
     step = relationship("ChecklistStep", back_populates="camera_mappings")
 
+
+
+class CameraStatusHistory(Base):
+    """Append-only log of camera heartbeats"""
+    __tablename__ = "camera_status_history"
+    __table_args__ = (
+        Index("ix_camera_status_history_camera_id_recorded_at", "camera_id", "recorded_at"),
+        Index("ix_camera_status_history_recorded_at_brin", "recorded_at", postgresql_using="brin"),
+    )
+
+    history_id = Column(BigInteger, primary_key=True)
+    camera_id = Column(Integer, ForeignKey("cameras.camera_id", ondelete="CASCADE"), nullable=False)
+    recorded_at = Column(DateTime(timezone=True), nullable=False)  # When the camera reported
+    status = Column(String(20))
+    fps = Column(Float)
+    recording = Column(Boolean)
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    camera = relationship("Camera", back_populates="status_history")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, String
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, String, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -25,7 +25,7 @@ class Checklist(Base):
     checklist_id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     description = Column(Text)
-    template_id = Column(Integer, ForeignKey("checklist_templates.template_id"))
+    template_id = Column(Integer, ForeignKey("checklist_templates.template_id"), index=True)
     status = Column(String(20), default="Active")  # Active, Inactive, Archived
     created_by = Column(Integer, ForeignKey("users.user_id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -39,6 +39,9 @@ class Checklist(Base):
 
 class ChecklistStep(Base):
     __tablename__ = "checklist_steps"
+    __table_args__ = (
+        Index("ix_checklist_steps_checklist_id_step_number", "checklist_id", "step_number"),
+    )
 
     step_id = Column(Integer, primary_key=True, index=True)
     checklist_id = Column(Integer, ForeignKey("checklists.checklist_id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, ForeignKey, Text, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -6,13 +6,18 @@ from ..core.database import Base
 
 class Execution(Base):
     __tablename__ = "executions"
+    __table_args__ = (
+        Index("ix_executions_checklist_id_start_time", "checklist_id", "start_time"),
+        Index("ix_executions_start_time_brin", "start_time", postgresql_using="brin"),
+    )
 
     execution_id = Column(Integer, primary_key=True, index=True)
     checklist_id = Column(Integer, ForeignKey("checklists.checklist_id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.user_id"), nullable=False, index=True)
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True))
     status = Column(String(20), default="In Progress")  # In Progress, Completed, Failed, Aborted
+    total_execution_time = Column(Float)  # Sum of step execution times, set on completion
     notes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -25,10 +30,14 @@ class Execution(Base):
 
 class StepExecution(Base):
     __tablename__ = "step_executions"
+    __table_args__ = (
+        Index("ix_step_executions_execution_id_step_id", "execution_id", "step_id"),
+        Index("ix_step_executions_created_at_brin", "created_at", postgresql_using="brin"),
+    )
 
     exec_step_id = Column(Integer, primary_key=True, index=True)
     execution_id = Column(Integer, ForeignKey("executions.execution_id"), nullable=False)
-    step_id = Column(Integer, ForeignKey("checklist_steps.step_id"), nullable=False)
+    step_id = Column(Integer, ForeignKey("checklist_steps.step_id"), nullable=False, index=True)
     status = Column(String(20), default="Pending")  # Pending, In Progress, Completed, Failed
     execution_time = Column(Float)  # Time taken to complete the step in seconds
     verification_result = Column(String(20))  # Pass, Fail, Warning
@@ -46,24 +55,41 @@ class StepExecution(Base):
 
 class Evidence(Base):
     __tablename__ = "evidence"
+    __table_args__ = (
+        Index("ix_evidence_timestamp_brin", "timestamp", postgresql_using="brin"),
+    )
 
     evidence_id = Column(Integer, primary_key=True, index=True)
-    exec_step_id = Column(Integer, ForeignKey("step_executions.exec_step_id"), nullable=False)
-    file_path = Column(String(500), nullable=False)
+    exec_step_id = Column(Integer, ForeignKey("step_executions.exec_step_id"), nullable=False, index=True)
+    file_path = Column(String(500), nullable=False, index=True)  # Content key in the evidence store
     evidence_type = Column(String(50))  # Image, Video, Log
     timestamp = Column(DateTime(timezone=True), nullable=False)
     evidence_metadata = Column(Text)  # JSON metadata as text (renamed from metadata - reserved word)
+    sha256 = Column(String(64), index=True)  # Hex digest of the file contents
+    size_bytes = Column(BigInteger)
+    content_type = Column(String(100))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationships
     step_execution = relationship("StepExecution", back_populates="evidence")
 
 
+class EvidenceBlob(Base):
+    __tablename__ = "evidence_blobs"
+
+    content_key = Column(String(64), primary_key=True)  # SHA-256 hex digest
+    size_bytes = Column(BigInteger, nullable=False)
+    content_type = Column(String(100))
+    ref_count = Column(Integer, nullable=False, default=0)  # Evidence rows using this blob
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
 class Exception(Base):
     __tablename__ = "exceptions"
 
     exception_id = Column(Integer, primary_key=True, index=True)
-    exec_step_id = Column(Integer, ForeignKey("step_executions.exec_step_id"), nullable=False)
+    exec_step_id = Column(Integer, ForeignKey("step_executions.exec_step_id"), nullable=False, index=True)
     exception_type = Column(String(50))  # Procedural, Technical, Safety
     description = Column(Text, nullable=False)
     status = Column(String(20), default="Open")  # Open, In Review, Resolved, Closed
@@ -78,9 +104,13 @@ class Exception(Base):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_status_severity", "status", "severity"),
+        Index("ix_alerts_created_at_brin", "created_at", postgresql_using="brin"),
+    )
 
     alert_id = Column(Integer, primary_key=True, index=True)
-    exec_step_id = Column(Integer, ForeignKey("step_executions.exec_step_id"), nullable=False)
+    exec_step_id = Column(Integer, ForeignKey("step_executions.exec_step_id"), nullable=False, index=True)
     alert_type = Column(String(50))  # Warning, Error, Information
     severity = Column(String(20))  # Low, Medium, High, Critical
     message = Column(Text, nullable=False)
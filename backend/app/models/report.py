@@ -12,6 +12,9 @@ class Report(Base):
     parameters = Column(JSON)  # JSON parameters used to generate the report
     generated_by = Column(Integer, ForeignKey("users.user_id"))
     file_path = Column(String(500))
+    status = Column(String(20), default="Pending", nullable=False)  # Pending, Running, Completed, Failed
+    parameters_hash = Column(String(64), index=True)  # SHA-256 of report_type + parameters, for reuse
+    error_message = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, Date, DateTime, Float, ForeignKey
+from sqlalchemy.sql import func
+from ..core.database import Base
+
+# Pre-aggregated execution statistics, maintained incrementally by the
+# execution write paths (see app/services/rollups.py). Rows are keyed by the
+# day the execution started, so a day's counters never move to another row.
+
+
+class ExecutionRollup(Base):
+    __tablename__ = "execution_rollups"
+
+    day = Column(Date, primary_key=True)
+    checklist_id = Column(Integer, ForeignKey("checklists.checklist_id", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    aborted = Column(Integer, nullable=False, default=0)
+    duration_total = Column(Float, nullable=False, default=0.0)  # Seconds, over finished executions
+    duration_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class StepRollup(Base):
+    __tablename__ = "step_rollups"
+
+    day = Column(Date, primary_key=True)
+    checklist_id = Column(Integer, ForeignKey("checklists.checklist_id", ondelete="CASCADE"), primary_key=True)
+    steps = Column(Integer, nullable=False, default=0)
+    passed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    warning = Column(Integer, nullable=False, default=0)
+    execution_time_total = Column(Float, nullable=False, default=0.0)  # Seconds
+    execution_time_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class SiteRollup(Base):
+    __tablename__ = "site_rollups"
+
+    day = Column(Date, primary_key=True)
+    site_id = Column(Integer, ForeignKey("sites.site_id", ondelete="CASCADE"), primary_key=True)
+    executions = Column(Integer, nullable=False, default=0)  # Executions whose checklist covers the site
+    steps = Column(Integer, nullable=False, default=0)
+    passed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
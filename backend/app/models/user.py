@@ -8,7 +8,7 @@ user_role = Table(
     'user_role',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.user_id'), primary_key=True),
-    Column('role_id', Integer, ForeignKey('roles.role_id'), primary_key=True)
+    Column('role_id', Integer, ForeignKey('roles.role_id'), primary_key=True, index=True)
 )
 
 role_permission = Table(
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, field_validator
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
 
 
 class SiteBase(BaseModel):
@@ -83,6 +83,9 @@ class CameraUpdate(BaseModel):
 class Camera(CameraBase):
     camera_id: int
     zone_id: int
+    last_heartbeat: Optional[datetime] = None
+    reported_fps: Optional[float] = None
+    is_recording: Optional[bool] = None
     created_at: datetime
     updated_at: datetime
     zone: Optional[Zone] = None
@@ -90,3 +93,64 @@ class Camera(CameraBase):
     class Config:
         from_attributes = True
 
+
+
+class CameraBulkError(BaseModel):
+    row: int  # 1-based position in the JSON array or CSV data rows
+    errors: List[str]
+
+
+class CameraBulkResult(BaseModel):
+    created: int
+    camera_ids: List[int] = []
+    errors: List[CameraBulkError] = []
+
+
+class CameraTreeCamera(BaseModel):
+    camera_id: int
+    camera_name: str
+    camera_code: Optional[str] = None
+    camera_type: Optional[str] = None
+    status: Optional[str] = None
+
+
+class CameraTreeZone(BaseModel):
+    zone_id: int
+    zone_name: str
+    status: Optional[str] = None
+    cameras: List[CameraTreeCamera] = []
+
+
+class CameraTreeSite(BaseModel):
+    site_id: int
+    site_name: str
+    location: Optional[str] = None
+    status: Optional[str] = None
+    zones: List[CameraTreeZone] = []
+
+
+class CameraTree(BaseModel):
+    version: int
+    sites: List[CameraTreeSite] = []
+
+
+class Heartbeat(BaseModel):
+    camera_id: int
+    timestamp: Optional[datetime] = None  # Defaults to the time it was received
+    status: str = "Online"
+    fps: Optional[float] = None
+    recording: Optional[bool] = None
+    
+    @field_validator('timestamp')
+    @classmethod
+    def to_utc(cls, v):
+        """Treat naive timestamps as UTC so they compare with server time"""
+        if v is None:
+            return v
+        if v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v.astimezone(timezone.utc)
+
+
+class HeartbeatBatchResult(BaseModel):
+    accepted: int
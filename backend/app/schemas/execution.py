@@ -14,6 +14,10 @@ class StepExecutionCreate(StepExecutionBase):
     pass
 
 
+class StepExecutionResult(StepExecutionBase):
+    execution_time: Optional[float] = None
+
+
 class StepExecution(StepExecutionBase):
     exec_step_id: int
     execution_id: int
@@ -40,6 +44,7 @@ class Execution(ExecutionBase):
     user_id: int
     start_time: datetime
     end_time: Optional[datetime] = None
+    total_execution_time: Optional[float] = None
     created_at: datetime
     updated_at: datetime
     step_executions: List[StepExecution] = []
@@ -47,3 +52,18 @@ class Execution(ExecutionBase):
     class Config:
         from_attributes = True
 
+
+
+class Evidence(BaseModel):
+    evidence_id: int
+    exec_step_id: int
+    evidence_type: Optional[str] = None
+    timestamp: datetime
+    evidence_metadata: Optional[str] = None
+    sha256: Optional[str] = None
+    size_bytes: Optional[int] = None
+    content_type: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
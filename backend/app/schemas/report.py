@@ -0,0 +1,77 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict, Any, Literal
+from datetime import date, datetime
+
+ReportType = Literal["Execution Summary", "Compliance", "Performance"]
+
+
+class StatusCounts(BaseModel):
+    total: int = 0
+    completed: int = 0
+    in_progress: int = 0
+    failed: int = 0
+    aborted: int = 0
+    success_rate: float = 0.0  # Percentage of executions that completed
+    avg_duration_seconds: Optional[float] = None  # Over finished executions
+
+
+class ChecklistBreakdown(StatusCounts):
+    checklist_id: int
+    checklist_name: str
+
+
+class DayBreakdown(StatusCounts):
+    day: date
+
+
+class SiteBreakdown(BaseModel):
+    site_id: int
+    site_name: str
+    executions: int = 0
+    steps: int = 0
+    passed: int = 0
+    failed: int = 0
+
+
+class StepSummary(BaseModel):
+    total: int = 0
+    passed: int = 0
+    failed: int = 0
+    warning: int = 0
+    avg_execution_time: Optional[float] = None
+
+
+class ExecutionSummary(StatusCounts):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    steps: StepSummary = StepSummary()
+    by_checklist: List[ChecklistBreakdown] = []
+    by_site: List[SiteBreakdown] = []
+    by_day: List[DayBreakdown] = []
+
+
+class ReportParameters(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    checklist_id: Optional[int] = None
+    format: Literal["csv", "html"] = "csv"
+
+
+class ReportCreate(BaseModel):
+    report_type: ReportType
+    parameters: ReportParameters = ReportParameters()
+
+
+class Report(BaseModel):
+    report_id: int
+    report_type: str
+    parameters: Optional[Dict[str, Any]] = None
+    generated_by: Optional[int] = None
+    file_path: Optional[str] = None
+    status: str
+    error_message: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
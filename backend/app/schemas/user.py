@@ -31,6 +31,7 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str
+    role_ids: Optional[List[int]] = None  # Roles to grant; none when omitted
 
 
 class UserUpdate(BaseModel):
@@ -38,6 +39,7 @@ class UserUpdate(BaseModel):
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     status: Optional[str] = None
+    role_ids: Optional[List[int]] = None  # Replaces the user's roles when given
     
     @field_validator('email')
     @classmethod
@@ -0,0 +1,34 @@
+"""
+Shared version counters
+
+cache_versions holds one counter per cached resource. Writes bump the
+counter in their own transaction, so readers on every worker can tell
+whether what they cached or sent is still current with a single primary
+key lookup instead of aggregating over the underlying tables.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.cache import CacheVersion
+
+# Counter bumped by every write to executions or step executions
+EXECUTIONS_VERSION = "executions"
+# Counter bumped by every change to user roles or role grants
+RBAC_VERSION = "rbac"
+
+
+def version_query(name: str):
+    """Query for a counter's version and last change (no row until the first write)"""
+    return select(CacheVersion.version, CacheVersion.updated_at).where(CacheVersion.name == name)
+
+
+async def bump_version(db: AsyncSession, name: str):
+    """Mark everything derived from the counter stale; call in the same transaction as the write"""
+    table = CacheVersion.__table__
+    stmt = pg_insert(table).values(name=name, version=1)
+    await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"version": table.c.version + 1, "updated_at": func.now()}
+        )
+    )
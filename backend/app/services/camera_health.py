@@ -0,0 +1,171 @@
+"""
+Background camera health polling
+
+Every CAMERA_HEALTH_INTERVAL_SECONDS the poller TCP-connects to each
+camera's ip_address (host or host:port, default port CAMERA_PROBE_PORT)
+with bounded concurrency and a per-probe timeout. Cameras sharing an
+address are probed once. Only cameras whose status actually changed are
+written back, in one UPDATE ... FROM (VALUES ...) statement per cycle.
+Probing happens outside any transaction; only the short write holds a
+connection, under an advisory lock so concurrent workers never write at
+the same time (a worker finding it taken skips its identical results).
+Cameras in Maintenance are never touched.
+"""
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Integer, String, column, func, select, update, values
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.camera import Camera
+from app.services.hierarchy import bump_hierarchy_version
+
+logger = logging.getLogger(__name__)
+
+# Statuses the poller manages; anything else (Maintenance) was set by a person
+POLLED_STATUSES = ("Online", "Offline", "Error")
+
+# pg advisory lock key shared by all workers ("CAMHLTH")
+ADVISORY_LOCK_KEY = 0x43414D484C5448
+
+# Rows per UPDATE statement, well under PostgreSQL's bind parameter limit
+UPDATE_CHUNK_SIZE = 10000
+
+
+def parse_address(address: str) -> Optional[Tuple[str, int]]:
+    """Split "host" or "host:port" (IPv6 as "[host]:port") into a probe target"""
+    address = address.strip()
+    if not address:
+        return None
+    if address.startswith("["):
+        host, _, rest = address[1:].partition("]")
+        port = rest.lstrip(":")
+    elif address.count(":") == 1:
+        host, _, port = address.partition(":")
+    else:
+        host, port = address, ""
+    try:
+        return host, int(port) if port else settings.CAMERA_PROBE_PORT
+    except ValueError:
+        return None
+
+
+async def probe(host: str, port: int, timeout: float) -> bool:
+    """Whether a TCP connection to host:port succeeds within timeout"""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def probe_all(targets: List[Tuple[str, int]]) -> Dict[Tuple[str, int], bool]:
+    """Probe targets concurrently, at most CAMERA_PROBE_CONCURRENCY at a time"""
+    semaphore = asyncio.Semaphore(settings.CAMERA_PROBE_CONCURRENCY)
+    timeout = settings.CAMERA_PROBE_TIMEOUT_SECONDS
+
+    async def bounded(target: Tuple[str, int]) -> bool:
+        async with semaphore:
+            return await probe(*target, timeout)
+
+    results = await asyncio.gather(*(bounded(target) for target in targets))
+    return dict(zip(targets, results))
+
+
+async def _polled_cameras() -> List[Tuple[int, str, str]]:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(
+            select(Camera.camera_id, Camera.ip_address, Camera.status)
+            .where(Camera.ip_address.isnot(None), Camera.status.in_(POLLED_STATUSES))
+        )).all()
+
+
+async def _write_statuses(changes: List[Tuple[int, str]]) -> int:
+    """Persist (camera_id, status) pairs in one short transaction; returns the rows updated"""
+    updated = 0
+    async with AsyncSessionLocal() as db:
+        # Transaction-scoped, so it is released by the commit below
+        if not await db.scalar(select(func.pg_try_advisory_xact_lock(ADVISORY_LOCK_KEY))):
+            return 0
+        for start in range(0, len(changes), UPDATE_CHUNK_SIZE):
+            probed = values(
+                column("camera_id", Integer), column("status", String), name="probed"
+            ).data(changes[start:start + UPDATE_CHUNK_SIZE])
+            # Re-checked here: a person may have set Maintenance while probing
+            result = await db.execute(
+                update(Camera)
+                .where(
+                    Camera.camera_id == probed.c.camera_id,
+                    Camera.status.in_(POLLED_STATUSES),
+                    Camera.status != probed.c.status
+                )
+                .values(status=probed.c.status)
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+        if updated:
+            await bump_hierarchy_version(db)
+        await db.commit()
+    return updated
+
+
+async def sweep() -> int:
+    """Probe every polled camera once and persist status changes; returns the number changed"""
+    started = time.perf_counter()
+    rows = await _polled_cameras()
+
+    cameras_by_target = defaultdict(list)
+    for camera_id, ip_address, status in rows:
+        target = parse_address(ip_address)
+        if target is not None:
+            cameras_by_target[target].append((camera_id, status))
+
+    # No connection or transaction is held while probing
+    reachable = await probe_all(list(cameras_by_target))
+
+    changes = []
+    for target, cameras in cameras_by_target.items():
+        new_status = "Online" if reachable[target] else "Offline"
+        changes.extend((camera_id, new_status) for camera_id, status in cameras if status != new_status)
+
+    changed = await _write_statuses(changes) if changes else 0
+
+    logger.info(
+        "Camera health sweep: %d cameras, %d addresses, %d changed in %.1fs",
+        len(rows), len(cameras_by_target), changed, time.perf_counter() - started
+    )
+    return changed
+
+
+async def _poll_forever():
+    while True:
+        try:
+            await sweep()
+        except Exception:
+            logger.exception("Camera health sweep failed")
+        await asyncio.sleep(settings.CAMERA_HEALTH_INTERVAL_SECONDS)
+
+
+_poller: Optional[asyncio.Task] = None
+
+
+def start_camera_health_poller():
+    """Start polling in the background, unless disabled by a zero interval"""
+    global _poller
+    if settings.CAMERA_HEALTH_INTERVAL_SECONDS > 0 and _poller is None:
+        _poller = asyncio.create_task(_poll_forever())
+
+
+async def stop_camera_health_poller():
+    global _poller
+    if _poller is not None:
+        _poller.cancel()
+        await asyncio.gather(_poller, return_exceptions=True)
+        _poller = None
@@ -0,0 +1,353 @@
+"""
+Streaming evidence uploads and blob reference counting
+
+Multipart bodies are parsed incrementally with python-multipart as they
+arrive, instead of being spooled by request.form(). The file part goes
+straight to a spool file while its SHA-256 and size are computed, so
+memory use per upload stays at a few chunks whatever the file size.
+
+The fsynced spool file is then handed to the content-addressed evidence
+store, where identical uploads share one blob. evidence_blobs counts the
+Evidence rows using each blob, maintained in the same transaction as the
+row. The transfer to the store happens before that transaction starts,
+so a slow store never holds a connection or a lock; a blob stored by an
+upload that then fails is an orphan until garbage collection's grace
+period has passed. A per-blob advisory lock, held from the reference
+count to the commit, orders uploads against garbage collection:
+collect_garbage() only deletes a blob after taking that lock and
+confirming no Evidence row references it, so a stale counter can delay
+collection but never lose referenced content.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.execution import Evidence, EvidenceBlob
+from app.services.evidence_store import EvidenceStore, is_content_key
+
+logger = logging.getLogger(__name__)
+
+# Form fields other than the file are small; cap their size and number to bound memory
+MAX_FIELD_SIZE = 64 * 1024
+MAX_FIELDS = 16
+
+# Multipart field that carries the file
+FILE_FIELD = "file"
+
+
+class UploadRejected(Exception):
+    """Raised when an upload is malformed or too large; nothing is left on disk"""
+
+    def __init__(self, detail: str, too_large: bool = False):
+        super().__init__(detail)
+        self.too_large = too_large
+
+
+class _UploadParser:
+    """Routes the parts of a multipart body: the file to a chunk list, other fields to strings"""
+
+    def __init__(self, boundary: bytes):
+        self.parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        })
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.file_chunks: List[bytes] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._name = ""
+        self._is_file = False
+        self._value = bytearray()
+        self._parts = 0
+        self._header_bytes = 0
+
+    def on_part_begin(self):
+        # Every part counts, so unnamed or repeated parts cannot get around the cap
+        self._parts += 1
+        if self._parts > MAX_FIELDS + 1:
+            raise ValueError(f"At most {MAX_FIELDS} form fields besides the file are allowed")
+        self._headers = {}
+        self._header_bytes = 0
+        self._name = ""
+        self._is_file = False
+        self._value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+        self._count_header_bytes(end - start)
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+        self._count_header_bytes(end - start)
+
+    def _count_header_bytes(self, size: int):
+        self._header_bytes += size
+        if self._header_bytes > MAX_FIELD_SIZE:
+            raise ValueError("Part headers are too large")
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, params = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._name = params.get(b"name", b"").decode("utf-8", "replace")
+        filename = params.get(b"filename")
+        self._is_file = self._name == FILE_FIELD and filename is not None
+        if self._is_file:
+            if self.filename is not None:
+                raise ValueError("Only one file may be uploaded per request")
+            self.filename = os.path.basename(filename.decode("utf-8", "replace"))
+            self.content_type = self._headers.get(b"content-type", b"application/octet-stream").decode("latin-1")
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._is_file:
+            # Copied: the parser reuses its buffer between writes
+            self.file_chunks.append(bytes(data[start:end]))
+            return
+        self._value += data[start:end]
+        if len(self._value) > MAX_FIELD_SIZE:
+            raise ValueError(f"Form field {self._name!r} is too large")
+
+    def on_part_end(self):
+        if not self._is_file and self._name:
+            self.fields[self._name] = self._value.decode("utf-8", "replace")
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Parse a chunk of the body and return the file data it contained"""
+        self.parser.write(chunk)
+        chunks, self.file_chunks = self.file_chunks, []
+        return chunks
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    content_type: str
+    sha256: str
+    size: int
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def receive_upload(request: Request, directory: str) -> StoredUpload:
+    """Stream a multipart upload into a spool file in directory and return its details"""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadRejected("Expected a multipart/form-data body")
+
+    limit = settings.EVIDENCE_MAX_UPLOAD_BYTES
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit + MAX_FIELD_SIZE * MAX_FIELDS:
+        raise UploadRejected(f"File exceeds the {limit} byte limit", too_large=True)
+
+    await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+    partial_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part")
+    parser = _UploadParser(boundary)
+    digest = hashlib.sha256()
+    size = 0
+
+    def write(f, chunks: List[bytes]):
+        for chunk in chunks:
+            digest.update(chunk)
+            f.write(chunk)
+
+    f = await asyncio.to_thread(open, partial_path, "wb")
+    try:
+        try:
+            async for chunk in request.stream():
+                chunks = parser.feed(chunk)
+                size += sum(len(c) for c in chunks)
+                if size > limit:
+                    raise UploadRejected(f"File exceeds the {limit} byte limit", too_large=True)
+                if chunks:
+                    await asyncio.to_thread(write, f, chunks)
+            parser.parser.finalize()
+        except ValueError as e:
+            raise UploadRejected(str(e))
+        if parser.filename is None:
+            raise UploadRejected(f"Missing '{FILE_FIELD}' file field")
+        await asyncio.to_thread(f.flush)
+        await asyncio.to_thread(os.fsync, f.fileno())
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(_remove, partial_path)
+        raise
+    await asyncio.to_thread(f.close)
+
+    return StoredUpload(
+        path=partial_path,
+        filename=parser.filename,
+        content_type=parser.content_type,
+        sha256=digest.hexdigest(),
+        size=size,
+        fields=parser.fields
+    )
+
+
+async def discard_upload(upload: StoredUpload):
+    """Remove the spool file, if the store has not already taken it"""
+    await asyncio.to_thread(_remove, upload.path)
+
+
+async def _lock_content(db: AsyncSession, key: str):
+    """Serialize work on one blob until the transaction ends"""
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(key, 0))))
+
+
+async def add_reference(db: AsyncSession, store: EvidenceStore, upload: StoredUpload) -> str:
+    """Put the upload's content in the store and count a reference to it; returns the content key
+
+    Call before the transaction that inserts the Evidence row has done other
+    work: the upload is stored first, then the blob's lock is taken and held
+    until that transaction commits, so garbage collection cannot remove the
+    blob between the check below and the row becoming visible.
+    """
+    key = upload.sha256
+    await store.put_file(key, upload.path)
+    await _lock_content(db, key)
+    # Garbage collection may have deleted the blob between the put and the lock
+    if not await store.exists(key):
+        await store.put_file(key, upload.path)
+    await db.execute(
+        pg_insert(EvidenceBlob)
+        .values(content_key=key, size_bytes=upload.size, content_type=upload.content_type, ref_count=1)
+        .on_conflict_do_update(
+            index_elements=[EvidenceBlob.content_key],
+            set_={"ref_count": EvidenceBlob.ref_count + 1, "updated_at": func.now()}
+        )
+    )
+    return key
+
+
+async def release_reference(db: AsyncSession, key: str):
+    """Count one reference fewer; call in the transaction that deletes the Evidence row"""
+    await release_references(db, [key])
+
+
+async def release_references(db: AsyncSession, keys: Iterable[str]):
+    """release_reference() for each of keys, e.g. the evidence a cascaded delete removes"""
+    counts = Counter(key for key in keys if is_content_key(key))
+    for key, count in sorted(counts.items()):
+        await db.execute(
+            update(EvidenceBlob)
+            .where(EvidenceBlob.content_key == key)
+            .values(ref_count=func.greatest(EvidenceBlob.ref_count - count, 0))
+        )
+
+
+async def rebuild_references(db: AsyncSession):
+    """Recount references from the Evidence rows, e.g. after cascaded deletes"""
+    await db.execute(
+        update(EvidenceBlob)
+        .values(
+            ref_count=select(func.count())
+            .where(Evidence.file_path == EvidenceBlob.content_key)
+            .scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _sweep_spool(directory: str, cutoff: float) -> int:
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.name.endswith(".part") and entry.stat().st_mtime < cutoff:
+            _remove(entry.path)
+            removed += 1
+    return removed
+
+
+async def _collect(db: AsyncSession, store: EvidenceStore, key: str, cutoff: datetime) -> bool:
+    """Delete one blob if it is still unreferenced once its lock is held"""
+    await _lock_content(db, key)
+    referenced = await db.scalar(select(exists().where(Evidence.file_path == key)))
+    blob = await db.get(EvidenceBlob, key, populate_existing=True)
+    if referenced:
+        # The counter drifted (rows inserted outside the API); correct it and keep the blob
+        if blob is not None and blob.ref_count <= 0:
+            blob.ref_count = await db.scalar(select(func.count()).where(Evidence.file_path == key))
+        await db.commit()
+        return False
+    if blob is not None and (blob.ref_count > 0 or blob.updated_at >= cutoff):
+        await db.commit()
+        return False
+    await store.delete(key)
+    if blob is not None:
+        await db.delete(blob)
+    await db.commit()
+    return True
+
+
+async def collect_garbage(store: EvidenceStore, grace_seconds: Optional[float] = None) -> int:
+    """Delete blobs no Evidence row references, and stale spool files; returns blobs deleted
+
+    Only blobs unreferenced for longer than grace_seconds (EVIDENCE_GC_GRACE_SECONDS
+    by default) are removed, which also covers files stored by uploads whose
+    transaction has not committed yet.
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.EVIDENCE_GC_GRACE_SECONDS
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+    deleted = 0
+
+    async with AsyncSessionLocal() as db:
+        # Blobs whose counter dropped to zero
+        candidates = list(await db.scalars(
+            select(EvidenceBlob.content_key)
+            .where(EvidenceBlob.ref_count <= 0, EvidenceBlob.updated_at < cutoff)
+        ))
+        await db.commit()
+        for key in candidates:
+            deleted += await _collect(db, store, key, cutoff)
+
+        # Stored content with no evidence_blobs row (an upload's transaction failed)
+        orphans = []
+        async for key, modified in store.keys():
+            if modified < cutoff.timestamp():
+                orphans.append(key)
+        for start in range(0, len(orphans), 1000):
+            chunk = orphans[start:start + 1000]
+            known = set(await db.scalars(select(EvidenceBlob.content_key).where(EvidenceBlob.content_key.in_(chunk))))
+            await db.commit()
+            for key in chunk:
+                if key not in known:
+                    deleted += await _collect(db, store, key, cutoff)
+
+    spooled = await asyncio.to_thread(_sweep_spool, store.incoming_dir, time.time() - grace_seconds)
+    logger.info("Evidence garbage collection: %d blobs, %d spool files removed", deleted, spooled)
+    return deleted
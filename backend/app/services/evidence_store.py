@@ -0,0 +1,263 @@
+"""
+Content-addressed evidence storage
+
+Evidence files are stored once per distinct content, under their SHA-256
+hex digest, which is also what Evidence.file_path holds. Blobs are
+sharded by the first two byte pairs of the digest (ab/cd/abcd...) so no
+directory grows past a few thousand entries.
+
+LocalEvidenceStore keeps blobs under EVIDENCE_DIR. S3EvidenceStore talks
+to any S3-compatible service through a boto3 client, so it can be run
+against a local stand-in (MinIO, moto) by setting EVIDENCE_S3_ENDPOINT_URL
+or passing a client. Which one is used is chosen by EVIDENCE_STORAGE.
+"""
+import asyncio
+import glob
+import os
+import re
+import shutil
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Tuple
+from app.core.config import settings
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # Optional: only needed for EVIDENCE_STORAGE=s3
+    boto3 = None
+    ClientError = None
+
+CONTENT_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+# Uploads are spooled here before being handed to the store
+INCOMING_DIR = ".incoming"
+
+
+def is_content_key(value: Optional[str]) -> bool:
+    """Whether value is a content key rather than a legacy file path"""
+    return value is not None and CONTENT_KEY.match(value) is not None
+
+
+def shard_path(key: str) -> str:
+    """Relative location of a blob: ab/cd/abcd..."""
+    return f"{key[0:2]}/{key[2:4]}/{key}"
+
+
+class EvidenceStore(ABC):
+    """Interface for evidence blob stores"""
+
+    @property
+    def incoming_dir(self) -> str:
+        """Local directory uploads are spooled to before put_file()"""
+        return os.path.join(settings.EVIDENCE_DIR, INCOMING_DIR)
+
+    @abstractmethod
+    async def put_file(self, key: str, path: str) -> bool:
+        """
+        Store the local file at path under key; False if the blob already existed.
+
+        An existing blob's modification time is refreshed. The file at path
+        is left for the caller to remove.
+        """
+
+    @abstractmethod
+    async def get_file(self, key: str, path: str) -> None:
+        """Copy a blob to the local file at path"""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether a blob is stored under key"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete a blob together with its renditions (<key>.<variant>.jpg)"""
+
+    @abstractmethod
+    def keys(self) -> AsyncIterator[Tuple[str, float]]:
+        """Every stored key with its last modification time (epoch seconds)"""
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the blob on this machine, when the store is local"""
+        return None
+
+    async def download_url(self, key: str, content_type: str, content_disposition: str) -> Optional[str]:
+        """Short-lived URL clients can fetch the blob from directly, when the store offers one"""
+        return None
+
+
+def _fsync_directory(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class LocalEvidenceStore(EvidenceStore):
+    """Blobs on the local filesystem under root"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def incoming_dir(self) -> str:
+        # Same filesystem as the blobs, so put_file() is a hard link
+        return os.path.join(self.root, INCOMING_DIR)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, shard_path(key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self.path(key)
+
+    def _put(self, key: str, path: str) -> bool:
+        target = self.path(key)
+        if not os.path.exists(target):
+            directory = os.path.dirname(target)
+            os.makedirs(directory, exist_ok=True)
+            try:
+                os.link(path, target)
+            except FileExistsError:
+                pass  # Stored meanwhile by a concurrent upload of the same content
+            else:
+                _fsync_directory(directory)
+                return True
+        # Refresh the mtime so garbage collection's grace period covers the new reference
+        os.utime(target)
+        return False
+
+    async def put_file(self, key: str, path: str) -> bool:
+        return await asyncio.to_thread(self._put, key, path)
+
+    async def get_file(self, key: str, path: str) -> None:
+        await asyncio.to_thread(shutil.copyfile, self.path(key), path)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.path(key))
+
+    def _delete(self, key: str):
+        for path in [self.path(key)] + glob.glob(glob.escape(self.path(key)) + ".*"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    def _scan(self):
+        keys = []
+        for directory, subdirectories, files in os.walk(self.root):
+            if directory == self.root and INCOMING_DIR in subdirectories:
+                subdirectories.remove(INCOMING_DIR)
+            for name in files:
+                if is_content_key(name):
+                    keys.append((name, os.path.getmtime(os.path.join(directory, name))))
+        return keys
+
+    async def keys(self) -> AsyncIterator[Tuple[str, float]]:
+        for entry in await asyncio.to_thread(self._scan):
+            yield entry
+
+
+class S3EvidenceStore(EvidenceStore):
+    """Blobs in an S3-compatible bucket under prefix"""
+
+    def __init__(self, bucket: str, prefix: str = "", client=None, endpoint_url: Optional[str] = None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("EVIDENCE_STORAGE=s3 requires the boto3 package")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def object_key(self, key: str) -> str:
+        return self.prefix + shard_path(key)
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def _put(self, key: str, path: str) -> bool:
+        created = not self._exists(key)
+        if created:
+            self.client.upload_file(path, self.bucket, self.object_key(key))
+        else:
+            # Rewrite in place so garbage collection's grace period covers the new reference
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=self.object_key(key),
+                CopySource={"Bucket": self.bucket, "Key": self.object_key(key)},
+                MetadataDirective="REPLACE"
+            )
+        return created
+
+    async def put_file(self, key: str, path: str) -> bool:
+        return await asyncio.to_thread(self._put, key, path)
+
+    async def get_file(self, key: str, path: str) -> None:
+        await asyncio.to_thread(self.client.download_file, self.bucket, self.object_key(key), path)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._exists, key)
+
+    def _delete(self, key: str):
+        # The blob and its renditions share the key as a prefix
+        page = self.client.list_objects_v2(Bucket=self.bucket, Prefix=self.object_key(key))
+        objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+        if objects:
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects})
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    async def download_url(self, key: str, content_type: str, content_disposition: str) -> Optional[str]:
+        # S3 serves Range requests itself, so the API only hands out the link
+        return await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self.object_key(key),
+                "ResponseContentType": content_type,
+                "ResponseContentDisposition": content_disposition,
+            },
+            ExpiresIn=settings.EVIDENCE_S3_URL_EXPIRES_SECONDS
+        )
+
+    def _list_page(self, token: Optional[str]):
+        params = {"Bucket": self.bucket, "Prefix": self.prefix}
+        if token:
+            params["ContinuationToken"] = token
+        return self.client.list_objects_v2(**params)
+
+    async def keys(self) -> AsyncIterator[Tuple[str, float]]:
+        token = None
+        while True:
+            page = await asyncio.to_thread(self._list_page, token)
+            for item in page.get("Contents", []):
+                name = item["Key"].rsplit("/", 1)[-1]
+                if is_content_key(name):
+                    yield name, item["LastModified"].timestamp()
+            if not page.get("IsTruncated"):
+                break
+            token = page["NextContinuationToken"]
+
+
+@lru_cache(maxsize=None)
+def get_evidence_store() -> EvidenceStore:
+    """The store configured by EVIDENCE_STORAGE"""
+    if settings.EVIDENCE_STORAGE == "s3":
+        return S3EvidenceStore(
+            settings.EVIDENCE_S3_BUCKET,
+            settings.EVIDENCE_S3_PREFIX,
+            endpoint_url=settings.EVIDENCE_S3_ENDPOINT_URL
+        )
+    return LocalEvidenceStore(settings.EVIDENCE_DIR)
@@ -0,0 +1,270 @@
+"""
+Execution statistics computed in the database with GROUP BY queries
+
+Day-aligned ranges are answered from the pre-aggregated rollup tables;
+ranges with a time-of-day component fall back to the raw tables.
+"""
+from datetime import datetime, time
+from typing import Optional
+from sqlalchemy import and_, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.camera import Camera, CameraMapping, Site, Zone
+from app.models.checklist import Checklist, ChecklistStep
+from app.models.execution import Execution, StepExecution
+from app.models.rollup import ExecutionRollup, SiteRollup, StepRollup
+from app.schemas.report import (
+    ChecklistBreakdown,
+    DayBreakdown,
+    ExecutionSummary,
+    SiteBreakdown,
+    StepSummary
+)
+from app.services.rollups import as_utc, utc_day, rollup_day
+
+
+def _status_columns():
+    """Aggregate columns shared by every execution breakdown"""
+    status = Execution.status
+    return (
+        func.count().label("total"),
+        func.count().filter(status == "Completed").label("completed"),
+        func.count().filter(status == "In Progress").label("in_progress"),
+        func.count().filter(status == "Failed").label("failed"),
+        func.count().filter(status == "Aborted").label("aborted"),
+        func.avg(func.extract("epoch", Execution.end_time - Execution.start_time)).label("avg_duration_seconds"),
+    )
+
+
+def _status_fields(row) -> dict:
+    """Map an aggregate row onto StatusCounts fields"""
+    total = row.total or 0
+    return {
+        "total": total,
+        "completed": row.completed or 0,
+        "in_progress": row.in_progress or 0,
+        "failed": row.failed or 0,
+        "aborted": row.aborted or 0,
+        "success_rate": round(row.completed * 100.0 / total, 1) if total else 0.0,
+        "avg_duration_seconds": float(row.avg_duration_seconds) if row.avg_duration_seconds is not None else None,
+    }
+
+
+def _in_range(query, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Restrict a query on executions to [start_date, end_date)"""
+    if start_date is not None:
+        query = query.where(Execution.start_time >= start_date)
+    if end_date is not None:
+        query = query.where(Execution.start_time < end_date)
+    return query
+
+
+def _build_summary(start_date, end_date, totals, steps_row, by_checklist, by_site, by_day) -> ExecutionSummary:
+    """Assemble the response from the aggregate rows of either source"""
+    return ExecutionSummary(
+        **_status_fields(totals),
+        start_date=start_date,
+        end_date=end_date,
+        steps=StepSummary(
+            total=steps_row.total or 0,
+            passed=steps_row.passed or 0,
+            failed=steps_row.failed or 0,
+            warning=steps_row.warning or 0,
+            avg_execution_time=steps_row.avg_execution_time,
+        ),
+        by_checklist=[
+            ChecklistBreakdown(checklist_id=row.checklist_id, checklist_name=row.name, **_status_fields(row))
+            for row in by_checklist
+        ],
+        by_site=[
+            SiteBreakdown(
+                site_id=row.site_id,
+                site_name=row.site_name,
+                executions=row.executions,
+                steps=row.steps,
+                passed=row.passed,
+                failed=row.failed,
+            )
+            for row in by_site
+        ],
+        by_day=[DayBreakdown(day=row.day, **_status_fields(row)) for row in by_day],
+    )
+
+
+def _day_aligned(value: Optional[datetime]) -> bool:
+    return value is None or as_utc(value).time() == time(0)
+
+
+async def execution_summary(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> ExecutionSummary:
+    """Compute execution counts, success rate, durations and breakdowns"""
+    if _day_aligned(start_date) and _day_aligned(end_date):
+        return await _rollup_summary(db, start_date, end_date)
+    return await _live_summary(db, start_date, end_date)
+
+
+async def _live_summary(
+    db: AsyncSession,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> ExecutionSummary:
+    """Aggregate the raw executions and step_executions tables"""
+    totals = (await db.execute(
+        _in_range(select(*_status_columns()).select_from(Execution), start_date, end_date)
+    )).one()
+
+    steps_row = (await db.execute(
+        _in_range(
+            select(
+                func.count().label("total"),
+                func.count().filter(StepExecution.verification_result == "Pass").label("passed"),
+                func.count().filter(StepExecution.verification_result == "Fail").label("failed"),
+                func.count().filter(StepExecution.verification_result == "Warning").label("warning"),
+                func.avg(StepExecution.execution_time).label("avg_execution_time"),
+            ).select_from(StepExecution).join(Execution, StepExecution.execution_id == Execution.execution_id),
+            start_date, end_date
+        )
+    )).one()
+
+    by_checklist = (await db.execute(
+        _in_range(
+            select(Execution.checklist_id, Checklist.name, *_status_columns())
+            .join(Checklist, Execution.checklist_id == Checklist.checklist_id)
+            .group_by(Execution.checklist_id, Checklist.name)
+            .order_by(Execution.checklist_id),
+            start_date, end_date
+        )
+    )).all()
+
+    day = utc_day(Execution.start_time)
+    by_day = (await db.execute(
+        _in_range(
+            select(day.label("day"), *_status_columns())
+            .select_from(Execution)
+            .group_by(day)
+            .order_by(day),
+            start_date, end_date
+        )
+    )).all()
+
+    # Same meaning as site_rollups: executions whose checklist has a step
+    # mapped to a camera at the site, and the step executions of those steps
+    by_site = (await db.execute(
+        _in_range(
+            select(
+                Site.site_id,
+                Site.site_name,
+                func.count(distinct(Execution.execution_id)).label("executions"),
+                func.count(distinct(StepExecution.exec_step_id)).label("steps"),
+                func.count(distinct(StepExecution.exec_step_id)).filter(
+                    StepExecution.verification_result == "Pass"
+                ).label("passed"),
+                func.count(distinct(StepExecution.exec_step_id)).filter(
+                    StepExecution.verification_result == "Fail"
+                ).label("failed"),
+            )
+            .select_from(Execution)
+            .join(ChecklistStep, ChecklistStep.checklist_id == Execution.checklist_id)
+            .join(CameraMapping, CameraMapping.step_id == ChecklistStep.step_id)
+            .join(Camera, Camera.camera_id == CameraMapping.camera_id)
+            .join(Zone, Zone.zone_id == Camera.zone_id)
+            .join(Site, Site.site_id == Zone.site_id)
+            .outerjoin(StepExecution, and_(
+                StepExecution.execution_id == Execution.execution_id,
+                StepExecution.step_id == ChecklistStep.step_id
+            ))
+            .group_by(Site.site_id, Site.site_name)
+            .order_by(Site.site_id),
+            start_date, end_date
+        )
+    )).all()
+
+    return _build_summary(start_date, end_date, totals, steps_row, by_checklist, by_site, by_day)
+
+
+def _rollup_status_columns():
+    """Rollup equivalent of _status_columns()"""
+    return (
+        func.coalesce(func.sum(ExecutionRollup.total), 0).label("total"),
+        func.coalesce(func.sum(ExecutionRollup.completed), 0).label("completed"),
+        func.coalesce(func.sum(ExecutionRollup.in_progress), 0).label("in_progress"),
+        func.coalesce(func.sum(ExecutionRollup.failed), 0).label("failed"),
+        func.coalesce(func.sum(ExecutionRollup.aborted), 0).label("aborted"),
+        (func.sum(ExecutionRollup.duration_total)
+         / func.nullif(func.sum(ExecutionRollup.duration_count), 0)).label("avg_duration_seconds"),
+    )
+
+
+def _in_day_range(query, day_column, start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Restrict a rollup query to the days in [start_date, end_date)"""
+    if start_date is not None:
+        query = query.where(day_column >= rollup_day(start_date))
+    if end_date is not None:
+        query = query.where(day_column < rollup_day(end_date))
+    return query
+
+
+async def _rollup_summary(
+    db: AsyncSession,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> ExecutionSummary:
+    """Sum the pre-aggregated rollup rows for whole days"""
+    totals = (await db.execute(
+        _in_day_range(select(*_rollup_status_columns()), ExecutionRollup.day, start_date, end_date)
+    )).one()
+
+    steps_row = (await db.execute(
+        _in_day_range(
+            select(
+                func.coalesce(func.sum(StepRollup.steps), 0).label("total"),
+                func.coalesce(func.sum(StepRollup.passed), 0).label("passed"),
+                func.coalesce(func.sum(StepRollup.failed), 0).label("failed"),
+                func.coalesce(func.sum(StepRollup.warning), 0).label("warning"),
+                (func.sum(StepRollup.execution_time_total)
+                 / func.nullif(func.sum(StepRollup.execution_time_count), 0)).label("avg_execution_time"),
+            ),
+            StepRollup.day, start_date, end_date
+        )
+    )).one()
+
+    by_checklist = (await db.execute(
+        _in_day_range(
+            select(ExecutionRollup.checklist_id, Checklist.name, *_rollup_status_columns())
+            .join(Checklist, ExecutionRollup.checklist_id == Checklist.checklist_id)
+            .group_by(ExecutionRollup.checklist_id, Checklist.name)
+            .order_by(ExecutionRollup.checklist_id),
+            ExecutionRollup.day, start_date, end_date
+        )
+    )).all()
+
+    by_day = (await db.execute(
+        _in_day_range(
+            select(ExecutionRollup.day, *_rollup_status_columns())
+            .group_by(ExecutionRollup.day)
+            .order_by(ExecutionRollup.day),
+            ExecutionRollup.day, start_date, end_date
+        )
+    )).all()
+
+    by_site = (await db.execute(
+        _in_day_range(
+            select(
+                Site.site_id,
+                Site.site_name,
+                func.sum(SiteRollup.executions).label("executions"),
+                func.sum(SiteRollup.steps).label("steps"),
+                func.sum(SiteRollup.passed).label("passed"),
+                func.sum(SiteRollup.failed).label("failed"),
+            )
+            .select_from(SiteRollup)
+            .join(Site, Site.site_id == SiteRollup.site_id)
+            .group_by(Site.site_id, Site.site_name)
+            .order_by(Site.site_id),
+            SiteRollup.day, start_date, end_date
+        )
+    )).all()
+
+    return _build_summary(start_date, end_date, totals, steps_row, by_checklist, by_site, by_day)
@@ -0,0 +1,121 @@
+"""
+Streaming export of execution history
+
+Rows are read through a server-side cursor (yield_per) and encoded one
+batch at a time as NDJSON or CSV, so an export of months of history uses
+the same memory as an export of a single day. Plain column tuples are
+selected instead of ORM objects to skip identity-map and schema overhead.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Literal, Optional, Sequence
+from sqlalchemy import Select, select
+from app.core.database import AsyncSessionLocal
+from app.models.execution import Execution, StepExecution
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Rows fetched from the cursor and encoded per chunk
+BATCH_SIZE = 1000
+
+EXECUTION_COLUMNS = (
+    Execution.execution_id,
+    Execution.checklist_id,
+    Execution.user_id,
+    Execution.status,
+    Execution.start_time,
+    Execution.end_time,
+    Execution.total_execution_time,
+    Execution.notes,
+    Execution.created_at,
+    Execution.updated_at,
+)
+
+STEP_EXECUTION_COLUMNS = (
+    StepExecution.exec_step_id,
+    StepExecution.execution_id,
+    StepExecution.step_id,
+    StepExecution.status,
+    StepExecution.verification_result,
+    StepExecution.execution_time,
+    StepExecution.notes,
+    StepExecution.created_at,
+    StepExecution.updated_at,
+)
+
+
+def _execution_filters(
+    query: Select,
+    checklist_id: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Select:
+    if checklist_id:
+        query = query.where(Execution.checklist_id == checklist_id)
+    if start_date is not None:
+        query = query.where(Execution.start_time >= start_date)
+    if end_date is not None:
+        query = query.where(Execution.start_time < end_date)
+    return query
+
+
+def executions_query(
+    checklist_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Select:
+    """Executions started in [start_date, end_date)"""
+    return _execution_filters(
+        select(*EXECUTION_COLUMNS).order_by(Execution.execution_id),
+        checklist_id, start_date, end_date
+    )
+
+
+def step_executions_query(
+    checklist_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Select:
+    """Step executions of the executions started in [start_date, end_date)"""
+    return _execution_filters(
+        select(*STEP_EXECUTION_COLUMNS)
+        .join(Execution, Execution.execution_id == StepExecution.execution_id)
+        .order_by(StepExecution.exec_step_id),
+        checklist_id, start_date, end_date
+    )
+
+
+def _value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    return "".join(
+        json.dumps(dict(zip(columns, map(_value, row))), separators=(",", ":")) + "\n"
+        for row in rows
+    )
+
+
+def _csv(rows: Sequence[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([[_value(value) for value in row] for row in rows])
+    return buffer.getvalue()
+
+
+async def stream_export(query: Select, format: ExportFormat) -> AsyncIterator[str]:
+    """Yield the encoded rows of query, one batch at a time"""
+    columns = [column.key for column in query.selected_columns]
+    if format == "csv":
+        yield _csv([columns])
+
+    # The export outlives the request's session, so it streams from its own
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=BATCH_SIZE))
+        async for batch in result.partitions(BATCH_SIZE):
+            yield _ndjson(columns, batch) if format == "ndjson" else _csv(batch)
@@ -0,0 +1,168 @@
+"""
+Buffered camera heartbeat ingestion
+
+POST /cameras/heartbeats only appends to an in-memory buffer. A background
+task flushes it every HEARTBEAT_FLUSH_INTERVAL_SECONDS, or as soon as
+HEARTBEAT_FLUSH_SIZE heartbeats are waiting, with a few set-based
+statements per flush:
+
+- every heartbeat is appended to camera_status_history,
+- the newest heartbeat per camera updates the latest-state columns
+  (last_heartbeat, reported_fps, is_recording) and the status on cameras.
+
+The buffer is capped at HEARTBEAT_BUFFER_LIMIT; when it is full the
+endpoint rejects batches with 503 so clients back off instead of the
+worker's memory growing.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, column, insert, or_, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.camera import Camera, CameraStatusHistory
+from app.schemas.camera import Heartbeat
+from app.services.camera_health import POLLED_STATUSES
+from app.services.hierarchy import bump_hierarchy_version
+
+logger = logging.getLogger(__name__)
+
+# Heartbeats per statement: 5 bind parameters each, under PostgreSQL's limit
+CHUNK_SIZE = 6000
+
+HEARTBEAT_COLUMNS = (
+    column("camera_id", Integer),
+    column("recorded_at", DateTime(timezone=True)),
+    column("status", String),
+    column("fps", Float),
+    column("recording", Boolean),
+)
+
+
+class HeartbeatBufferFull(Exception):
+    """Raised when accepting a batch would exceed HEARTBEAT_BUFFER_LIMIT"""
+
+
+_buffer: List[tuple] = []
+_flush_requested: Optional[asyncio.Event] = None
+_flusher: Optional[asyncio.Task] = None
+
+
+def accept_heartbeats(heartbeats: List[Heartbeat]) -> int:
+    """Queue heartbeats for the next flush"""
+    if len(_buffer) + len(heartbeats) > settings.HEARTBEAT_BUFFER_LIMIT:
+        raise HeartbeatBufferFull()
+
+    received_at = datetime.now(timezone.utc)
+    # A camera clock running ahead would otherwise pin last_heartbeat in the future
+    latest_allowed = received_at + timedelta(seconds=settings.HEARTBEAT_MAX_CLOCK_SKEW_SECONDS)
+    _buffer.extend(
+        (
+            heartbeat.camera_id,
+            min(heartbeat.timestamp, latest_allowed) if heartbeat.timestamp else received_at,
+            heartbeat.status,
+            heartbeat.fps,
+            heartbeat.recording
+        )
+        for heartbeat in heartbeats
+    )
+    if _flush_requested is not None and len(_buffer) >= settings.HEARTBEAT_FLUSH_SIZE:
+        _flush_requested.set()
+    return len(heartbeats)
+
+
+async def _write_chunk(db: AsyncSession, rows: List[tuple]) -> bool:
+    """Write one chunk of heartbeats; returns whether any camera status changed"""
+    batch = values(*HEARTBEAT_COLUMNS, name="heartbeats").data(rows)
+    # Joining cameras drops heartbeats for unknown cameras instead of failing the flush
+    await db.execute(
+        insert(CameraStatusHistory).from_select(
+            ["camera_id", "recorded_at", "status", "fps", "recording"],
+            select(batch.c.camera_id, batch.c.recorded_at, batch.c.status, batch.c.fps, batch.c.recording)
+            .join(Camera, Camera.camera_id == batch.c.camera_id)
+        )
+    )
+
+    # Latest heartbeat per camera
+    newest = {}
+    for row in rows:
+        if row[0] not in newest or row[1] >= newest[row[0]][1]:
+            newest[row[0]] = row
+    latest = values(*HEARTBEAT_COLUMNS, name="latest").data(list(newest.values()))
+    is_newer = or_(Camera.last_heartbeat.is_(None), Camera.last_heartbeat < latest.c.recorded_at)
+
+    changed = (await db.execute(
+        update(Camera)
+        .where(
+            Camera.camera_id == latest.c.camera_id,
+            is_newer,
+            Camera.status.in_(POLLED_STATUSES),
+            latest.c.status.in_(POLLED_STATUSES),
+            Camera.status != latest.c.status
+        )
+        .values(status=latest.c.status)
+        .returning(Camera.camera_id)
+        .execution_options(synchronize_session=False)
+    )).first() is not None
+    await db.execute(
+        update(Camera)
+        .where(Camera.camera_id == latest.c.camera_id, is_newer)
+        .values(
+            last_heartbeat=latest.c.recorded_at,
+            reported_fps=latest.c.fps,
+            is_recording=latest.c.recording
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return changed
+
+
+async def flush_heartbeats() -> int:
+    """Write all buffered heartbeats in one transaction; returns how many were written"""
+    global _buffer
+    if not _buffer:
+        return 0
+    rows, _buffer = _buffer, []
+
+    try:
+        async with AsyncSessionLocal() as db:
+            changed = False
+            for start in range(0, len(rows), CHUNK_SIZE):
+                changed |= await _write_chunk(db, rows[start:start + CHUNK_SIZE])
+            if changed:
+                await bump_hierarchy_version(db)
+            await db.commit()
+    except Exception:
+        # Dropped rather than re-buffered, so a failing database cannot grow memory
+        logger.exception("Dropped %d heartbeats after a failed flush", len(rows))
+        return 0
+    return len(rows)
+
+
+async def _flush_forever():
+    while True:
+        try:
+            await asyncio.wait_for(_flush_requested.wait(), settings.HEARTBEAT_FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _flush_requested.clear()
+        await flush_heartbeats()
+
+
+def start_heartbeat_flusher():
+    """Start the background flush task"""
+    global _flush_requested, _flusher
+    _flush_requested = asyncio.Event()
+    _flusher = asyncio.create_task(_flush_forever())
+
+
+async def stop_heartbeat_flusher():
+    """Stop the flush task and write whatever is still buffered"""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        await asyncio.gather(_flusher, return_exceptions=True)
+        _flusher = None
+    await flush_heartbeats()
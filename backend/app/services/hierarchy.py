@@ -0,0 +1,95 @@
+"""
+In-memory cache of the site -> zone -> camera hierarchy
+
+The hierarchy changes a few times a day but is read on most pages. Each
+worker keeps the assembled tree in memory together with the version it
+was built from. Every write in the cameras router bumps a shared counter
+in cache_versions within its own transaction, so a read costs one primary
+key lookup while the tree is current, and three queries to rebuild it
+once any worker has changed it.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.cache import CacheVersion
+from app.models.camera import Camera, Site, Zone
+from app.schemas.camera import CameraTree, CameraTreeCamera, CameraTreeSite, CameraTreeZone
+from app.services.cache_versions import bump_version
+
+HIERARCHY_CACHE = "camera_hierarchy"
+
+
+@dataclass
+class _CachedTree:
+    version: int
+    tree: CameraTree
+
+
+_cached: Optional[_CachedTree] = None
+
+
+def hierarchy_version_query():
+    """Query for the current hierarchy version (no row until the first write)"""
+    return select(CacheVersion.version).where(CacheVersion.name == HIERARCHY_CACHE)
+
+
+async def bump_hierarchy_version(db: AsyncSession):
+    """Mark cached hierarchies stale; call in the same transaction as the write"""
+    await bump_version(db, HIERARCHY_CACHE)
+
+
+async def _build_tree(db: AsyncSession, version: int) -> CameraTree:
+    sites = (await db.execute(
+        select(Site.site_id, Site.site_name, Site.location, Site.status).order_by(Site.site_id)
+    )).all()
+    zones = (await db.execute(
+        select(Zone.zone_id, Zone.site_id, Zone.zone_name, Zone.status).order_by(Zone.zone_id)
+    )).all()
+    cameras = (await db.execute(
+        select(
+            Camera.camera_id, Camera.zone_id, Camera.camera_name, Camera.camera_code,
+            Camera.camera_type, Camera.status
+        ).order_by(Camera.camera_id)
+    )).all()
+
+    cameras_by_zone = defaultdict(list)
+    for camera in cameras:
+        cameras_by_zone[camera.zone_id].append(CameraTreeCamera(
+            camera_id=camera.camera_id,
+            camera_name=camera.camera_name,
+            camera_code=camera.camera_code,
+            camera_type=camera.camera_type,
+            status=camera.status
+        ))
+    zones_by_site = defaultdict(list)
+    for zone in zones:
+        zones_by_site[zone.site_id].append(CameraTreeZone(
+            zone_id=zone.zone_id,
+            zone_name=zone.zone_name,
+            status=zone.status,
+            cameras=cameras_by_zone[zone.zone_id]
+        ))
+    return CameraTree(
+        version=version,
+        sites=[
+            CameraTreeSite(
+                site_id=site.site_id,
+                site_name=site.site_name,
+                location=site.location,
+                status=site.status,
+                zones=zones_by_site[site.site_id]
+            )
+            for site in sites
+        ]
+    )
+
+
+async def get_hierarchy(db: AsyncSession) -> CameraTree:
+    """The current hierarchy, rebuilt only when another write has bumped its version"""
+    global _cached
+    version = await db.scalar(hierarchy_version_query()) or 0
+    if _cached is None or _cached.version != version:
+        _cached = _CachedTree(version, await _build_tree(db, version))
+    return _cached.tree
@@ -0,0 +1,107 @@
+"""
+Role-based access control
+
+The role -> permission map is small and changes rarely, so it is loaded
+with one query and kept in memory. Access tokens carry the user's role
+ids and effective permissions together with the version of the map they
+were computed from; while that version is current, authorization is an
+in-memory set lookup with no database work. The version is derived from
+the map's contents and the shared "rbac" counter in cache_versions, which
+role assignments bump, so every worker agrees on it without coordination
+and tokens issued before a change stop being trusted once the map is
+reloaded; their permissions are then recomputed from the user's roles.
+"""
+import hashlib
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.user import Permission, role_permission
+from app.services.cache_versions import RBAC_VERSION, bump_version, version_query
+
+# Permissions checked by the API, with the description seeded by init_db
+PERMISSIONS = {
+    "cameras:manage": "Create, update and delete sites, zones and cameras",
+    "cameras:report": "Report camera heartbeats",
+    "checklists:manage": "Create, update and delete checklists and their steps",
+    "evidence:view": "Download evidence from other users' executions",
+    "executions:run": "Start, record and complete checklist executions",
+    "reports:generate": "Request report generation",
+    "users:manage": "Create, update and deactivate users",
+}
+
+# Default grants for the roles created by init_db
+ROLE_PERMISSIONS = {
+    "Administrator": list(PERMISSIONS),
+    "Operator": ["cameras:manage", "cameras:report", "evidence:view", "executions:run", "reports:generate"],
+    "Viewer": ["evidence:view"],
+}
+
+
+@dataclass
+class RbacMap:
+    role_permissions: Dict[int, FrozenSet[str]] = field(default_factory=dict)
+    version: str = ""
+    loaded_at: float = 0.0
+
+    def permissions_for(self, role_ids: Iterable[int]) -> FrozenSet[str]:
+        """Effective permissions of a user holding the given roles"""
+        permissions = frozenset()
+        for role_id in role_ids:
+            permissions |= self.role_permissions.get(role_id, frozenset())
+        return permissions
+
+
+_rbac: Optional[RbacMap] = None
+
+
+def _version(role_permissions: Dict[int, FrozenSet[str]], counter: int) -> str:
+    canonical = ";".join(
+        f"{role_id}:{','.join(sorted(permissions))}" for role_id, permissions in sorted(role_permissions.items())
+    )
+    return f"{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]}.{counter}"
+
+
+async def load_rbac(db: AsyncSession) -> RbacMap:
+    """Reload the role -> permission map from the database"""
+    global _rbac
+    rows = await db.execute(
+        select(role_permission.c.role_id, Permission.permission_name)
+        .join(Permission, Permission.permission_id == role_permission.c.permission_id)
+    )
+    grants = defaultdict(set)
+    for role_id, permission_name in rows:
+        grants[role_id].add(permission_name)
+    role_permissions = {role_id: frozenset(names) for role_id, names in grants.items()}
+    counter = (await db.execute(version_query(RBAC_VERSION))).first()
+    _rbac = RbacMap(
+        role_permissions, _version(role_permissions, counter.version if counter else 0), time.monotonic()
+    )
+    return _rbac
+
+
+async def get_rbac(db: AsyncSession) -> RbacMap:
+    """The cached map, reloaded when invalidated or older than RBAC_REFRESH_SECONDS"""
+    if _rbac is None or time.monotonic() - _rbac.loaded_at > settings.RBAC_REFRESH_SECONDS:
+        return await load_rbac(db)
+    return _rbac
+
+
+async def bump_rbac_version(db: AsyncSession):
+    """
+    Record a change to user roles or role grants; call in the same
+    transaction as the write and invalidate_rbac() after committing.
+
+    This process reloads the map on next use. Other workers pick up the
+    new version when their copy is older than RBAC_REFRESH_SECONDS.
+    """
+    await bump_version(db, RBAC_VERSION)
+
+
+def invalidate_rbac():
+    """Force a reload on next use (this process only)"""
+    global _rbac
+    _rbac = None
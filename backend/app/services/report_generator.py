@@ -0,0 +1,319 @@
+"""
+Background generation of report files
+
+POST /reports stores a Pending Report row and enqueues its id; worker tasks
+claim it, stream the report query through a server-side cursor and write
+the rows to a CSV or HTML file in batches, so memory use does not grow with
+the size of the report. The file is written under a temporary name and
+renamed into place once complete.
+"""
+import asyncio
+import csv
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence
+from sqlalchemy import Select, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.checklist import Checklist, ChecklistStep
+from app.models.execution import Execution, StepExecution
+from app.models.report import Report
+from app.models.rollup import ExecutionRollup, StepRollup
+from app.models.user import User
+from app.schemas.report import ReportParameters
+from app.services.rollups import as_utc, rollup_day
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the cursor and written to disk per batch
+BATCH_SIZE = 1000
+
+# A Running report untouched for this long was orphaned by a restart and may be reclaimed
+STALE_AFTER = timedelta(hours=1)
+
+
+@dataclass
+class ReportSpec:
+    title: str
+    columns: List[str]
+    query: Callable[[ReportParameters], Select]
+
+
+def _execution_filters(query: Select, params: ReportParameters) -> Select:
+    if params.start_date is not None:
+        query = query.where(Execution.start_time >= params.start_date)
+    if params.end_date is not None:
+        query = query.where(Execution.start_time < params.end_date)
+    if params.checklist_id is not None:
+        query = query.where(Execution.checklist_id == params.checklist_id)
+    return query
+
+
+def _execution_summary_query(params: ReportParameters) -> Select:
+    return _execution_filters(
+        select(
+            Execution.execution_id,
+            Checklist.name,
+            User.username,
+            Execution.status,
+            Execution.start_time,
+            Execution.end_time,
+            func.extract("epoch", Execution.end_time - Execution.start_time),
+        )
+        .join(Checklist, Checklist.checklist_id == Execution.checklist_id)
+        .join(User, User.user_id == Execution.user_id)
+        .order_by(Execution.execution_id),
+        params
+    )
+
+
+def _compliance_query(params: ReportParameters) -> Select:
+    return _execution_filters(
+        select(
+            Execution.execution_id,
+            Checklist.name,
+            ChecklistStep.step_number,
+            ChecklistStep.description,
+            StepExecution.status,
+            StepExecution.verification_result,
+            StepExecution.execution_time,
+            StepExecution.notes,
+        )
+        .select_from(StepExecution)
+        .join(Execution, Execution.execution_id == StepExecution.execution_id)
+        .join(Checklist, Checklist.checklist_id == Execution.checklist_id)
+        .join(ChecklistStep, ChecklistStep.step_id == StepExecution.step_id)
+        .order_by(Execution.execution_id, ChecklistStep.step_number),
+        params
+    )
+
+
+def _performance_query(params: ReportParameters) -> Select:
+    # Per checklist and day, read from the pre-aggregated rollups
+    query = (
+        select(
+            ExecutionRollup.day,
+            Checklist.name,
+            ExecutionRollup.total,
+            ExecutionRollup.completed,
+            ExecutionRollup.failed,
+            ExecutionRollup.duration_total / func.nullif(ExecutionRollup.duration_count, 0),
+            StepRollup.steps,
+            StepRollup.passed,
+            StepRollup.failed,
+            StepRollup.execution_time_total / func.nullif(StepRollup.execution_time_count, 0),
+        )
+        .join(Checklist, Checklist.checklist_id == ExecutionRollup.checklist_id)
+        .outerjoin(
+            StepRollup,
+            (StepRollup.day == ExecutionRollup.day) & (StepRollup.checklist_id == ExecutionRollup.checklist_id)
+        )
+        .order_by(ExecutionRollup.day, ExecutionRollup.checklist_id)
+    )
+    if params.start_date is not None:
+        query = query.where(ExecutionRollup.day >= rollup_day(params.start_date))
+    if params.end_date is not None:
+        query = query.where(ExecutionRollup.day < rollup_day(params.end_date))
+    if params.checklist_id is not None:
+        query = query.where(ExecutionRollup.checklist_id == params.checklist_id)
+    return query
+
+
+REPORT_SPECS = {
+    "Execution Summary": ReportSpec(
+        "Execution Summary",
+        ["Execution ID", "Checklist", "User", "Status", "Start Time", "End Time", "Duration (s)"],
+        _execution_summary_query,
+    ),
+    "Compliance": ReportSpec(
+        "Compliance",
+        ["Execution ID", "Checklist", "Step", "Description", "Status", "Verification", "Execution Time (s)", "Notes"],
+        _compliance_query,
+    ),
+    "Performance": ReportSpec(
+        "Performance",
+        ["Day", "Checklist", "Executions", "Completed", "Failed", "Avg Duration (s)",
+         "Steps", "Steps Passed", "Steps Failed", "Avg Step Time (s)"],
+        _performance_query,
+    ),
+}
+
+
+def parameters_hash(report_type: str, parameters: dict) -> str:
+    """Stable hash identifying a report, used to reuse identical ones"""
+    canonical = json.dumps({"type": report_type, "parameters": parameters}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (float, Decimal)):
+        return f"{float(value):.3f}"
+    return str(value)
+
+
+class _CsvWriter:
+    def header(self, spec: ReportSpec) -> str:
+        return self.rows([spec.columns])
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([[_cell(value) for value in row] for row in rows])
+        return buffer.getvalue()
+
+    def footer(self) -> str:
+        return ""
+
+
+class _HtmlWriter:
+    def header(self, spec: ReportSpec) -> str:
+        cells = "".join(f"<th>{html.escape(column)}</th>" for column in spec.columns)
+        title = html.escape(spec.title)
+        return (
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title></head>\n"
+            f"<body><h1>{title}</h1>\n<table border=\"1\">\n<thead><tr>{cells}</tr></thead>\n<tbody>\n"
+        )
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> str:
+        return "".join(
+            "<tr>" + "".join(f"<td>{html.escape(_cell(value))}</td>" for value in row) + "</tr>\n"
+            for row in rows
+        )
+
+    def footer(self) -> str:
+        return "</tbody>\n</table>\n</body></html>\n"
+
+
+WRITERS = {"csv": _CsvWriter, "html": _HtmlWriter}
+
+
+async def _write_report(db: AsyncSession, report: Report) -> str:
+    """Stream the report's rows to disk and return the final file path"""
+    spec = REPORT_SPECS[report.report_type]
+    params = ReportParameters(**(report.parameters or {}))
+    writer = WRITERS[params.format]()
+
+    await asyncio.to_thread(os.makedirs, settings.REPORTS_DIR, exist_ok=True)
+    path = os.path.join(settings.REPORTS_DIR, f"report_{report.report_id}.{params.format}")
+    partial_path = f"{path}.part"
+
+    result = await db.stream(spec.query(params).execution_options(yield_per=BATCH_SIZE))
+    f = await asyncio.to_thread(open, partial_path, "w", encoding="utf-8", newline="")
+    try:
+        await asyncio.to_thread(f.write, writer.header(spec))
+        async for batch in result.partitions(BATCH_SIZE):
+            await asyncio.to_thread(f.write, writer.rows(batch))
+        await asyncio.to_thread(f.write, writer.footer())
+        await asyncio.to_thread(f.flush)
+        await asyncio.to_thread(os.fsync, f.fileno())
+    finally:
+        await asyncio.to_thread(f.close)
+    await asyncio.to_thread(os.replace, partial_path, path)
+    return path
+
+
+def report_is_current(report: Report) -> bool:
+    """
+    Whether a Completed report can still stand in for a new identical request.
+
+    A range that had already ended when the report was generated is reused
+    indefinitely; anything else (no end date, or an end in the future)
+    keeps receiving executions, so it is only reused for REPORT_REUSE_SECONDS.
+    """
+    end_date = ReportParameters(**(report.parameters or {})).end_date
+    if end_date is not None and as_utc(end_date) <= report.created_at:
+        return True
+    age = datetime.now(report.created_at.tzinfo) - report.created_at
+    return age.total_seconds() < settings.REPORT_REUSE_SECONDS
+
+
+def _claimable():
+    """Reports waiting for a worker: Pending, or Running but orphaned"""
+    return or_(
+        Report.status == "Pending",
+        (Report.status == "Running") & (Report.updated_at < func.now() - STALE_AFTER)
+    )
+
+
+async def generate_report(report_id: int):
+    """Claim a waiting report and generate its file"""
+    async with AsyncSessionLocal() as db:
+        # Claim atomically so a report is generated once even with several workers
+        claimed = await db.scalar(
+            update(Report)
+            .where(Report.report_id == report_id, _claimable())
+            .values(status="Running", updated_at=func.now())
+            .returning(Report.report_id)
+        )
+        await db.commit()
+        if claimed is None:
+            return
+
+        report = await db.get(Report, report_id)
+        try:
+            report.file_path = await _write_report(db, report)
+            report.status = "Completed"
+            report.error_message = None
+        except Exception as e:
+            logger.exception("Report %s generation failed", report_id)
+            await db.rollback()
+            report = await db.get(Report, report_id)
+            report.status = "Failed"
+            report.error_message = f"{type(e).__name__}: {e}"
+        await db.commit()
+
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+
+def enqueue_report(report_id: int):
+    """Schedule a report for generation by the background workers"""
+    if _queue is None:
+        raise RuntimeError("Report workers are not running")
+    _queue.put_nowait(report_id)
+
+
+async def _worker():
+    while True:
+        report_id = await _queue.get()
+        try:
+            await generate_report(report_id)
+        except Exception:
+            logger.exception("Report worker failed on report %s", report_id)
+        finally:
+            _queue.task_done()
+
+
+async def start_report_workers():
+    """Start the worker tasks and pick up reports left waiting by a restart"""
+    global _queue
+    _queue = asyncio.Queue()
+    for _ in range(settings.REPORT_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+    async with AsyncSessionLocal() as db:
+        pending = await db.scalars(
+            select(Report.report_id).where(_claimable()).order_by(Report.report_id)
+        )
+        for report_id in pending:
+            enqueue_report(report_id)
+
+
+async def stop_report_workers():
+    """Cancel the worker tasks; interrupted reports are reclaimed once stale"""
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,324 @@
+"""
+Incremental maintenance of the execution rollup tables
+
+Every execution write path reports what changed, and the matching counters
+are adjusted with INSERT ... ON CONFLICT DO UPDATE in the same transaction
+as the write, so reports read a handful of pre-aggregated rows instead of
+scanning raw history. Deletes and hierarchy moves, which can take whole
+executions or the camera mappings that tie steps to sites out of a
+rollup, recount the affected checklist or sites instead with
+rebuild_checklist_rollups() and rebuild_site_rollups(). rebuild_rollups()
+recomputes everything from scratch for backfills or after bulk changes
+made outside the API.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, NamedTuple, Optional
+from sqlalchemy import Date, cast, delete, distinct, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.camera import Camera, CameraMapping, Zone
+from app.models.checklist import ChecklistStep
+from app.models.execution import Execution, StepExecution
+from app.models.rollup import ExecutionRollup, SiteRollup, StepRollup
+
+# Counter column for each execution status / step verification result
+STATUS_COLUMNS = {
+    "Completed": "completed",
+    "In Progress": "in_progress",
+    "Failed": "failed",
+    "Aborted": "aborted",
+}
+RESULT_COLUMNS = {
+    "Pass": "passed",
+    "Fail": "failed",
+    "Warning": "warning",
+}
+# Site rollups only track pass/fail
+SITE_RESULT_COLUMNS = {"Pass": "passed", "Fail": "failed"}
+
+
+class ExecutionState(NamedTuple):
+    status: Optional[str]
+    end_time: Optional[datetime]
+
+
+class StepState(NamedTuple):
+    step_id: int
+    verification_result: Optional[str]
+    execution_time: Optional[float]
+
+
+def execution_state(execution: Execution) -> ExecutionState:
+    """Snapshot the rollup-relevant fields of an execution"""
+    return ExecutionState(execution.status, execution.end_time)
+
+
+def step_state(step_execution: StepExecution) -> StepState:
+    """Snapshot the rollup-relevant fields of a step execution"""
+    return StepState(
+        step_execution.step_id,
+        step_execution.verification_result,
+        step_execution.execution_time
+    )
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC (the API stores utcnow())"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def rollup_day(start_time: datetime) -> date:
+    """The rollup row an execution belongs to: its UTC start date"""
+    return as_utc(start_time).date()
+
+
+def utc_day(column):
+    """SQL equivalent of rollup_day()"""
+    return cast(func.timezone("UTC", column), Date)
+
+
+def _duration(start_time: datetime, end_time: datetime) -> float:
+    return (as_utc(end_time) - as_utc(start_time)).total_seconds()
+
+
+def _add(deltas: Dict[str, float], column: Optional[str], amount: float):
+    if column is not None:
+        deltas[column] = deltas.get(column, 0) + amount
+
+
+async def _bump(db: AsyncSession, model, key: dict, deltas: Dict[str, float]):
+    """Add deltas to the counters of the row identified by key, creating it if needed"""
+    deltas = {column: amount for column, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    table = model.__table__
+    stmt = pg_insert(table).values(**key, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={
+            **{column: table.c[column] + stmt.excluded[column] for column in deltas},
+            "updated_at": func.now(),
+        }
+    )
+    await db.execute(stmt)
+
+
+async def sites_for_steps(db: AsyncSession, step_ids: Iterable[int]) -> Dict[int, set]:
+    """Map each step to the sites of the cameras mapped to it"""
+    step_ids = set(step_ids)
+    if not step_ids:
+        return {}
+    rows = await db.execute(
+        select(CameraMapping.step_id, Zone.site_id)
+        .join(Camera, Camera.camera_id == CameraMapping.camera_id)
+        .join(Zone, Zone.zone_id == Camera.zone_id)
+        .where(CameraMapping.step_id.in_(step_ids))
+        .distinct()
+    )
+    sites = defaultdict(set)
+    for step_id, site_id in rows:
+        sites[step_id].add(site_id)
+    return sites
+
+
+async def sites_for_checklist(db: AsyncSession, checklist_id: int) -> set:
+    rows = await db.scalars(
+        select(distinct(Zone.site_id))
+        .select_from(CameraMapping)
+        .join(ChecklistStep, ChecklistStep.step_id == CameraMapping.step_id)
+        .join(Camera, Camera.camera_id == CameraMapping.camera_id)
+        .join(Zone, Zone.zone_id == Camera.zone_id)
+        .where(ChecklistStep.checklist_id == checklist_id)
+    )
+    return set(rows)
+
+
+async def execution_changed(
+    db: AsyncSession,
+    execution: Execution,
+    before: Optional[ExecutionState]
+):
+    """Apply an execution insert (before=None) or status/end_time change to the rollups"""
+    day = rollup_day(execution.start_time)
+    deltas: Dict[str, float] = {}
+
+    if before is None:
+        deltas["total"] = 1
+        # Sorted so concurrent writers lock rollup rows in the same order
+        for site_id in sorted(await sites_for_checklist(db, execution.checklist_id)):
+            await _bump(db, SiteRollup, {"day": day, "site_id": site_id}, {"executions": 1})
+    else:
+        _add(deltas, STATUS_COLUMNS.get(before.status), -1)
+        if before.end_time is not None:
+            _add(deltas, "duration_total", -_duration(execution.start_time, before.end_time))
+            _add(deltas, "duration_count", -1)
+
+    _add(deltas, STATUS_COLUMNS.get(execution.status), 1)
+    if execution.end_time is not None:
+        _add(deltas, "duration_total", _duration(execution.start_time, execution.end_time))
+        _add(deltas, "duration_count", 1)
+
+    await _bump(db, ExecutionRollup, {"day": day, "checklist_id": execution.checklist_id}, deltas)
+
+
+async def steps_changed(
+    db: AsyncSession,
+    execution: Execution,
+    changes: Iterable[tuple]
+):
+    """
+    Apply step execution changes to the rollups.
+
+    changes holds (before, after) StepState pairs; before is None for an
+    insert and after is None for a delete.
+    """
+    changes = list(changes)
+    step_deltas: Dict[str, float] = {}
+    site_deltas: Dict[int, Dict[str, float]] = defaultdict(dict)
+    sites = await sites_for_steps(
+        db, [state.step_id for pair in changes for state in pair if state is not None]
+    )
+
+    for before, after in changes:
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            _add(step_deltas, "steps", sign)
+            _add(step_deltas, RESULT_COLUMNS.get(state.verification_result), sign)
+            if state.execution_time is not None:
+                _add(step_deltas, "execution_time_total", sign * state.execution_time)
+                _add(step_deltas, "execution_time_count", sign)
+            for site_id in sites.get(state.step_id, ()):
+                _add(site_deltas[site_id], "steps", sign)
+                _add(site_deltas[site_id], SITE_RESULT_COLUMNS.get(state.verification_result), sign)
+
+    day = rollup_day(execution.start_time)
+    await _bump(db, StepRollup, {"day": day, "checklist_id": execution.checklist_id}, step_deltas)
+    for site_id, deltas in sorted(site_deltas.items()):
+        await _bump(db, SiteRollup, {"day": day, "site_id": site_id}, deltas)
+
+
+async def _rebuild_checklist_tables(db: AsyncSession, *criteria):
+    """Recompute execution and step rollups for the checklists matching criteria on Execution"""
+    day = utc_day(Execution.start_time)
+    status = Execution.status
+    await db.execute(
+        insert(ExecutionRollup.__table__).from_select(
+            ["day", "checklist_id", "total", "completed", "in_progress", "failed", "aborted",
+             "duration_total", "duration_count"],
+            select(
+                day,
+                Execution.checklist_id,
+                func.count(),
+                *(func.count().filter(status == value) for value in STATUS_COLUMNS),
+                func.coalesce(func.sum(func.extract("epoch", Execution.end_time - Execution.start_time)), 0),
+                func.count(Execution.end_time),
+            )
+            .where(*criteria)
+            .group_by(day, Execution.checklist_id)
+        )
+    )
+
+    result = StepExecution.verification_result
+    await db.execute(
+        insert(StepRollup.__table__).from_select(
+            ["day", "checklist_id", "steps", "passed", "failed", "warning",
+             "execution_time_total", "execution_time_count"],
+            select(
+                day,
+                Execution.checklist_id,
+                func.count(),
+                *(func.count().filter(result == value) for value in RESULT_COLUMNS),
+                func.coalesce(func.sum(StepExecution.execution_time), 0),
+                func.count(StepExecution.execution_time),
+            )
+            .select_from(StepExecution)
+            .join(Execution, Execution.execution_id == StepExecution.execution_id)
+            .where(*criteria)
+            .group_by(day, Execution.checklist_id)
+        )
+    )
+
+
+async def _rebuild_site_table(db: AsyncSession, *criteria):
+    """Recompute site rollups for the sites matching criteria on Zone"""
+    day = utc_day(Execution.start_time)
+    await db.execute(
+        insert(SiteRollup.__table__).from_select(
+            ["day", "site_id", "executions"],
+            select(day, Zone.site_id, func.count(distinct(Execution.execution_id)))
+            .select_from(Execution)
+            .join(ChecklistStep, ChecklistStep.checklist_id == Execution.checklist_id)
+            .join(CameraMapping, CameraMapping.step_id == ChecklistStep.step_id)
+            .join(Camera, Camera.camera_id == CameraMapping.camera_id)
+            .join(Zone, Zone.zone_id == Camera.zone_id)
+            .where(*criteria)
+            .group_by(day, Zone.site_id)
+        )
+    )
+
+    result = StepExecution.verification_result
+    site_steps = pg_insert(SiteRollup.__table__).from_select(
+        ["day", "site_id", "steps", "passed", "failed"],
+        select(
+            day,
+            Zone.site_id,
+            func.count(distinct(StepExecution.exec_step_id)),
+            *(func.count(distinct(StepExecution.exec_step_id)).filter(result == value)
+              for value in SITE_RESULT_COLUMNS),
+        )
+        .select_from(StepExecution)
+        .join(Execution, Execution.execution_id == StepExecution.execution_id)
+        .join(CameraMapping, CameraMapping.step_id == StepExecution.step_id)
+        .join(Camera, Camera.camera_id == CameraMapping.camera_id)
+        .join(Zone, Zone.zone_id == Camera.zone_id)
+        .where(*criteria)
+        .group_by(day, Zone.site_id)
+    )
+    await db.execute(
+        site_steps.on_conflict_do_update(
+            index_elements=["day", "site_id"],
+            set_={
+                "steps": site_steps.excluded.steps,
+                "passed": site_steps.excluded.passed,
+                "failed": site_steps.excluded.failed,
+            }
+        )
+    )
+
+
+async def rebuild_rollups(db: AsyncSession):
+    """Recompute all rollup tables from executions and step_executions"""
+    await db.execute(delete(ExecutionRollup.__table__))
+    await db.execute(delete(StepRollup.__table__))
+    await db.execute(delete(SiteRollup.__table__))
+    await _rebuild_checklist_tables(db)
+    await _rebuild_site_table(db)
+
+
+async def rebuild_checklist_rollups(db: AsyncSession, checklist_id: int):
+    """Recompute the execution and step rollups of one checklist, e.g. after deleting one of its steps"""
+    await db.flush()
+    await db.execute(delete(ExecutionRollup.__table__).where(ExecutionRollup.checklist_id == checklist_id))
+    await db.execute(delete(StepRollup.__table__).where(StepRollup.checklist_id == checklist_id))
+    await _rebuild_checklist_tables(db, Execution.checklist_id == checklist_id)
+
+
+async def rebuild_site_rollups(db: AsyncSession, site_ids: Iterable[int]):
+    """
+    Recompute the rollups of the given sites.
+
+    Call after deletes or moves that change which cameras, and so which
+    steps, a site covers; pending ORM changes are flushed first so the
+    recount sees them.
+    """
+    site_ids = sorted(set(site_ids))
+    if not site_ids:
+        return
+    await db.flush()
+    await db.execute(delete(SiteRollup.__table__).where(SiteRollup.site_id.in_(site_ids)))
+    await _rebuild_site_table(db, Zone.site_id.in_(site_ids))
+
@@ -0,0 +1,193 @@
+"""
+Thumbnails and previews for image evidence
+
+When an Image upload commits, its evidence id is queued; worker tasks hand
+the decoding and downscaling to a process pool, so CPU-heavy image work
+never competes with request handling in the API process. JPEGs are
+decoded at reduced scale (draft mode) when only a small rendition is
+needed.
+
+Each rendition is stored next to the original blob as <key>.<variant>.jpg
+and recorded under "thumbnails" in evidence_metadata. Renditions depend
+only on the content, so evidence sharing a blob reuses them, and they are
+deleted together with the blob. scripts/backfill_thumbnails.py renders
+them for evidence uploaded earlier.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Literal, Optional, Tuple
+from PIL import Image, ImageOps
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.execution import Evidence
+from app.services.evidence_store import EvidenceStore, get_evidence_store, is_content_key
+
+logger = logging.getLogger(__name__)
+
+ThumbnailVariant = Literal["thumbnail", "preview"]
+THUMBNAIL_VARIANTS = ("thumbnail", "preview")
+
+
+def variant_sizes() -> Dict[str, int]:
+    """Longest side in pixels of each rendition"""
+    return {"thumbnail": settings.THUMBNAIL_SIZE, "preview": settings.PREVIEW_SIZE}
+
+
+def rendition_key(key: str, variant: str) -> str:
+    """Store key of a rendition; shares the blob's shard directory"""
+    return f"{key}.{variant}.jpg"
+
+
+def _render(source: str, targets: List[Tuple[str, int]], quality: int) -> Dict[str, Tuple[int, int]]:
+    """Write source scaled to fit each (path, longest side) as JPEG; runs in a worker process"""
+    sizes = {}
+    with Image.open(source) as original:
+        largest = max(side for _, side in targets)
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        # Largest first, so each rendition is scaled down from the previous one
+        for path, side in sorted(targets, key=lambda target: -target[1]):
+            image.thumbnail((side, side), Image.Resampling.LANCZOS)
+            image.save(path, "JPEG", quality=quality, optimize=True)
+            sizes[path] = image.size
+    return sizes
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def _existing_renditions(key: str) -> Optional[dict]:
+    """Renditions already recorded for another evidence row with the same content"""
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(
+            select(Evidence.evidence_metadata)
+            .where(Evidence.file_path == key, Evidence.evidence_metadata.contains('"thumbnails"'))
+            .limit(5)
+        )
+        for raw in rows:
+            renditions = json.loads(raw).get("thumbnails")
+            if isinstance(renditions, dict) and set(renditions) >= set(THUMBNAIL_VARIANTS):
+                return renditions
+    return None
+
+
+async def _render_renditions(store: EvidenceStore, key: str) -> dict:
+    """Render every variant of a blob in the process pool and store them"""
+    await asyncio.to_thread(os.makedirs, store.incoming_dir, exist_ok=True)
+    source = store.local_path(key)
+    downloaded = None
+    if source is None:
+        downloaded = os.path.join(store.incoming_dir, f".thumb-source-{uuid.uuid4().hex}.part")
+        await store.get_file(key, downloaded)
+        source = downloaded
+
+    targets = {
+        variant: (os.path.join(store.incoming_dir, f".thumb-{uuid.uuid4().hex}.part"), side)
+        for variant, side in variant_sizes().items()
+    }
+    try:
+        sizes = await asyncio.get_running_loop().run_in_executor(
+            _pool, _render, source, list(targets.values()), settings.THUMBNAIL_QUALITY
+        )
+        renditions = {}
+        for variant, (path, _) in targets.items():
+            await store.put_file(rendition_key(key, variant), path)
+            width, height = sizes[path]
+            renditions[variant] = {"key": rendition_key(key, variant), "width": width, "height": height}
+        return renditions
+    finally:
+        for path, _ in targets.values():
+            await asyncio.to_thread(_remove, path)
+        if downloaded is not None:
+            await asyncio.to_thread(_remove, downloaded)
+
+
+async def generate_thumbnails(evidence_id: int) -> bool:
+    """Create the renditions of an Image evidence and record them; returns whether it did"""
+    store = get_evidence_store()
+    async with AsyncSessionLocal() as db:
+        evidence = await db.get(Evidence, evidence_id)
+        if evidence is None or evidence.evidence_type != "Image" or not is_content_key(evidence.file_path):
+            return False
+        key = evidence.file_path
+
+    renditions = await _existing_renditions(key)
+    if renditions is None or not all(
+        [await store.exists(rendition_key(key, variant)) for variant in THUMBNAIL_VARIANTS]
+    ):
+        renditions = await _render_renditions(store, key)
+
+    async with AsyncSessionLocal() as db:
+        evidence = await db.get(Evidence, evidence_id)
+        if evidence is None:
+            return False
+        metadata = json.loads(evidence.evidence_metadata or "{}")
+        metadata["thumbnails"] = renditions
+        evidence.evidence_metadata = json.dumps(metadata)
+        await db.commit()
+    return True
+
+
+_queue: Optional[asyncio.Queue] = None
+_workers: List[asyncio.Task] = []
+
+
+def enqueue_thumbnails(evidence_id: int):
+    """Schedule rendition generation; skipped when the workers are not running"""
+    if _queue is not None:
+        _queue.put_nowait(evidence_id)
+
+
+async def _worker():
+    while True:
+        evidence_id = await _queue.get()
+        try:
+            await generate_thumbnails(evidence_id)
+        except Exception:
+            logger.exception("Thumbnail generation failed for evidence %s", evidence_id)
+        finally:
+            _queue.task_done()
+
+
+def start_thumbnail_workers():
+    """Start the process pool and the tasks feeding it"""
+    global _pool, _queue
+    # spawn: forking a process with a running event loop and threads is unsafe
+    _pool = ProcessPoolExecutor(settings.THUMBNAIL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    _queue = asyncio.Queue()
+    for _ in range(settings.THUMBNAIL_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def wait_for_thumbnails():
+    """Wait until everything queued so far has been processed"""
+    if _queue is not None:
+        await _queue.join()
+
+
+async def stop_thumbnail_workers():
+    """Cancel the worker tasks and shut the pool down; the backfill script catches up on missed evidence"""
+    global _pool, _queue
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+    if _pool is not None:
+        await asyncio.to_thread(_pool.shutdown, True, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Generate thumbnails and previews for existing image evidence
+Renders evidence that has none yet using the same process pool as the
+API; --force also rechecks evidence that has them and re-renders missing files
+"""
+import argparse
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import or_, select
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.execution import Evidence
+from app.services.thumbnails import (
+    enqueue_thumbnails,
+    start_thumbnail_workers,
+    stop_thumbnail_workers,
+    wait_for_thumbnails
+)
+
+
+async def main():
+    """Queue every image evidence missing renditions and wait for the workers"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="Also recheck evidence that already has thumbnails")
+    args = parser.parse_args()
+
+    query = select(Evidence.evidence_id).where(Evidence.evidence_type == "Image").order_by(Evidence.evidence_id)
+    if not args.force:
+        query = query.where(or_(
+            Evidence.evidence_metadata.is_(None),
+            ~Evidence.evidence_metadata.contains('"thumbnails"')
+        ))
+
+    start_thumbnail_workers()
+    try:
+        async with AsyncSessionLocal() as db:
+            evidence_ids = list(await db.scalars(query))
+        for evidence_id in evidence_ids:
+            enqueue_thumbnails(evidence_id)
+        await wait_for_thumbnails()
+        print(f"✓ Processed {len(evidence_ids)} image evidence")
+    except Exception as e:
+        print(f"✗ Error generating thumbnails: {e}")
+        raise
+    finally:
+        await stop_thumbnail_workers()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Measure response compression on list endpoints
+
+Requests each path uncompressed and with every supported encoding, and
+reports wire size, bytes saved and the compression CPU time the server
+reports in its Server-Timing header:
+
+    python scripts/benchmark_compression.py --url http://localhost:8000 \\
+        --path /api/v1/cameras?limit=1000 /api/v1/executions?limit=1000
+"""
+import argparse
+import asyncio
+import re
+
+import httpx
+
+COMPRESS_TIMING = re.compile(r'compress;dur=([\d.]+)')
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """Get an access token for the benchmark user"""
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def measure(client: httpx.AsyncClient, path: str, encoding: str) -> tuple:
+    """Wire size and server-side compression time for one request"""
+    async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        response.raise_for_status()
+        wire = b"".join([chunk async for chunk in response.aiter_raw()])
+        match = COMPRESS_TIMING.search(", ".join(response.headers.get_list("server-timing")))
+        return response.headers.get("content-encoding", "identity"), len(wire), float(match.group(1)) if match else 0.0
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0) as client:
+        token = await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        print(f"{'path':<40} {'encoding':>9} {'bytes':>10} {'saved':>8} {'cpu ms':>8}")
+        for path in args.path:
+            _, identity_size, _ = await measure(client, path, "identity")
+            print(f"{path:<40} {'identity':>9} {identity_size:>10} {'':>8} {'':>8}")
+            for encoding in ("gzip", "br"):
+                used, size, cpu_ms = await measure(client, path, encoding)
+                if used != encoding:
+                    print(f"{'':<40} {encoding:>9} {'not applied':>10}")
+                    continue
+                saved = 1 - size / identity_size if identity_size else 0.0
+                print(f"{'':<40} {encoding:>9} {size:>10} {saved:>7.0%} {cpu_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API")
+    parser.add_argument("--path", nargs="+", default=["/api/v1/cameras?limit=1000", "/api/v1/executions?limit=1000"])
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Measure API throughput under concurrent load
+
+Logs in once, then keeps N clients hammering a read endpoint for a fixed
+duration and reports requests/sec and latency percentiles. Run it against
+the server before and after a change to compare, e.g.:
+
+    python scripts/benchmark_concurrency.py --url http://localhost:8000 \\
+        --path /api/v1/cameras --concurrency 50 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    """Get an access token for the benchmark user"""
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": username, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def worker(client: httpx.AsyncClient, path: str, deadline: float, latencies: list, errors: list):
+    """Issue requests back to back until the deadline"""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_level(url: str, path: str, token: str, concurrency: int, duration: float) -> dict:
+    """Run one concurrency level and summarise the results"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: list = []
+    errors: list = []
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            worker(client, path, deadline, latencies, errors) for _ in range(concurrency)
+        ))
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+async def main(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=30.0) as client:
+        token = await login(client, args.username, args.password)
+
+    print(f"Benchmarking GET {args.path} for {args.duration:.0f}s per level")
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in args.concurrency:
+        result = await run_level(args.url, args.path, token, concurrency, args.duration)
+        print(
+            f"{result['concurrency']:>8} {result['requests']:>9} {result['errors']:>7} "
+            f"{result['rps']:>9.1f} {result['mean_ms']:>9.1f} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API")
+    parser.add_argument("--path", default="/api/v1/cameras", help="Endpoint to request")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 500], help="Concurrent clients per level")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Measure how a login storm affects unrelated endpoints
+
+Keeps a few clients polling a cheap endpoint while N clients log in
+concurrently, and reports latency percentiles of the polled endpoint with
+and without the storm, plus how many logins succeeded or were shed (429):
+
+    python scripts/benchmark_login_storm.py --url http://localhost:8000 --logins 100
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+def percentile(latencies: list, p: float) -> float:
+    if not latencies:
+        return 0.0
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+
+async def poll(client: httpx.AsyncClient, path: str, stop: asyncio.Event, latencies: list):
+    """Request the probe endpoint back to back until stopped"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str, statuses: list):
+    response = await client.post(
+        "/api/v1/auth/login",
+        data={"username": username, "password": password}
+    )
+    statuses.append(response.status_code)
+
+
+async def measure(args, logins: int) -> dict:
+    """Poll the probe endpoint while `logins` concurrent logins run"""
+    latencies: list = []
+    statuses: list = []
+    stop = asyncio.Event()
+    limits = httpx.Limits(max_connections=logins + args.pollers)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60.0) as client:
+        pollers = [asyncio.create_task(poll(client, args.path, stop, latencies)) for _ in range(args.pollers)]
+        if logins:
+            await asyncio.gather(*(login(client, args.username, args.password, statuses) for _ in range(logins)))
+        else:
+            await asyncio.sleep(args.baseline)
+        stop.set()
+        await asyncio.gather(*pollers)
+
+    return {
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "logins_ok": statuses.count(200),
+        "logins_shed": statuses.count(429),
+    }
+
+
+async def main(args):
+    print(f"Probe GET {args.path} with {args.pollers} pollers")
+    print(f"{'scenario':>16} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'login ok':>9} {'shed':>6}")
+    for name, logins in (("baseline", 0), (f"{args.logins} logins", args.logins)):
+        result = await measure(args, logins)
+        print(
+            f"{name:>16} {result['requests']:>9} {result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+            f"{result['max_ms']:>9.1f} {result['logins_ok']:>9} {result['logins_shed']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API")
+    parser.add_argument("--path", default="/health", help="Unrelated endpoint to probe")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--logins", type=int, default=100, help="Concurrent logins in the storm")
+    parser.add_argument("--pollers", type=int, default=4, help="Clients polling the probe endpoint")
+    parser.add_argument("--baseline", type=float, default=5.0, help="Seconds to probe without logins")
+    asyncio.run(main(parser.parse_args()))
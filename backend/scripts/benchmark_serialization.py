@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Compare response serialization paths on large list payloads
+
+Builds 1,000 cameras (with zone and site) and 1,000 executions (with step
+executions) as in-memory ORM objects, then times:
+
+- fastapi:  validate, dump to JSON-safe dicts, encode with json (the old default)
+- orjson:   the same dicts encoded with orjson (ORJSONResponse)
+- adapter:  prebuilt TypeAdapter validate + dump_json (serialized_response)
+
+No database is needed:
+
+    python scripts/benchmark_serialization.py --rounds 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import orjson
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.api.v1.serialization import list_adapter
+from app.models.camera import Camera, Site, Zone
+from app.models.execution import Execution, StepExecution
+from app.schemas.camera import Camera as CameraSchema
+from app.schemas.execution import Execution as ExecutionSchema
+
+
+def build_cameras(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    site = Site(site_id=1, site_name="Plant", location="North", status="Active", created_at=now, updated_at=now)
+    zones = [
+        Zone(zone_id=z, zone_name=f"Zone {z}", site_id=1, status="Active", site=site, created_at=now, updated_at=now)
+        for z in range(1, 21)
+    ]
+    return [
+        Camera(
+            camera_id=i,
+            camera_name=f"Camera {i}",
+            camera_code=f"CAM-{i:05d}",
+            zone_id=zones[i % 20].zone_id,
+            zone=zones[i % 20],
+            camera_type="Dome",
+            ip_address=f"10.0.{i // 256}.{i % 256}",
+            status="Online",
+            configuration={"resolution": "1920x1080", "fps": 25},
+            created_at=now,
+            updated_at=now
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def build_executions(count: int, steps: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        Execution(
+            execution_id=i,
+            checklist_id=1,
+            user_id=1,
+            start_time=now - timedelta(minutes=30),
+            end_time=now,
+            status="Completed",
+            total_execution_time=1200.0,
+            notes="Routine shift check",
+            created_at=now,
+            updated_at=now,
+            step_executions=[
+                StepExecution(
+                    exec_step_id=i * steps + s,
+                    execution_id=i,
+                    step_id=s,
+                    status="Completed",
+                    verification_result="Pass",
+                    execution_time=120.0,
+                    created_at=now,
+                    updated_at=now
+                )
+                for s in range(1, steps + 1)
+            ]
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def timed(func, rounds: int) -> float:
+    """Best-of-rounds wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def compare(name: str, schema, objects: list, rounds: int):
+    adapter = list_adapter(schema)
+
+    def fastapi_default():
+        return json.dumps(
+            adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+        ).encode("utf-8")
+
+    def orjson_response():
+        return orjson.dumps(adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json"))
+
+    def prebuilt_adapter():
+        return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+    size = len(prebuilt_adapter())
+    print(f"{name} ({size / 1024:.0f} KiB)")
+    baseline = None
+    for label, func in (("fastapi", fastapi_default), ("orjson", orjson_response), ("adapter", prebuilt_adapter)):
+        elapsed = timed(func, rounds)
+        baseline = baseline or elapsed
+        print(f"  {label:>8}: {elapsed:8.2f} ms  ({baseline / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000, help="Objects per payload")
+    parser.add_argument("--steps", type=int, default=10, help="Step executions per execution")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    compare(f"{args.count} cameras", CameraSchema, build_cameras(args.count), args.rounds)
+    compare(f"{args.count} executions x {args.steps} steps", ExecutionSchema,
+            build_executions(args.count, args.steps), args.rounds)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Garbage-collect the evidence store
+Moves evidence stored under plain file paths into the content-addressed
+store, recounts blob references from the Evidence rows, then deletes
+blobs that have been unreferenced for longer than EVIDENCE_GC_GRACE_SECONDS
+"""
+import argparse
+import asyncio
+import hashlib
+import mimetypes
+import os
+import sys
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.execution import Evidence
+from app.services.evidence import StoredUpload, add_reference, collect_garbage, rebuild_references
+from app.services.evidence_store import get_evidence_store, is_content_key
+
+
+def _spool_copy(source: str, directory: str) -> StoredUpload:
+    """Copy a legacy file into the spool, hashing it on the way"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    with open(source, "rb") as src, open(path, "wb") as dst:
+        while chunk := src.read(1024 * 1024):
+            digest.update(chunk)
+            dst.write(chunk)
+            size += len(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    content_type = mimetypes.guess_type(source)[0] or "application/octet-stream"
+    return StoredUpload(path, os.path.basename(source), content_type, digest.hexdigest(), size)
+
+
+async def import_legacy_files() -> int:
+    """Store evidence still referenced by file path under its content key"""
+    store = get_evidence_store()
+    imported = 0
+    async with AsyncSessionLocal() as db:
+        legacy = [e for e in await db.scalars(select(Evidence)) if not is_content_key(e.file_path)]
+        for evidence in legacy:
+            if not os.path.isfile(evidence.file_path):
+                print(f"  ! Evidence {evidence.evidence_id}: {evidence.file_path} not found, skipped")
+                continue
+            upload = await asyncio.to_thread(_spool_copy, evidence.file_path, store.incoming_dir)
+            try:
+                evidence.file_path = await add_reference(db, store, upload)
+                evidence.sha256 = upload.sha256
+                evidence.size_bytes = upload.size
+                evidence.content_type = evidence.content_type or upload.content_type
+                await db.commit()
+            finally:
+                if os.path.exists(upload.path):
+                    os.remove(upload.path)
+            imported += 1
+    return imported
+
+
+async def main():
+    """Import legacy files, recount references and collect garbage"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--grace-seconds", type=float, default=None, help="Override EVIDENCE_GC_GRACE_SECONDS")
+    parser.add_argument("--skip-import", action="store_true", help="Do not import evidence stored by file path")
+    args = parser.parse_args()
+
+    try:
+        if not args.skip_import:
+            print(f"✓ Imported {await import_legacy_files()} legacy evidence files")
+        async with AsyncSessionLocal() as db:
+            await rebuild_references(db)
+            await db.commit()
+        print("✓ Blob references recounted")
+        deleted = await collect_garbage(get_evidence_store(), args.grace_seconds)
+        print(f"✓ Deleted {deleted} unreferenced blobs")
+    except Exception as e:
+        print(f"✗ Error collecting evidence garbage: {e}")
+        raise
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
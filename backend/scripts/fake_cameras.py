@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Run a local fleet of fake cameras for exercising the health poller
+
+Opens a TCP listener on 127.0.0.1 for each reachable fake camera; a share
+of the cameras is left without a listener so they read as Offline. With
+--register, the cameras are created in a zone through POST /cameras/bulk
+with ip_address set to 127.0.0.1:<port>:
+
+    python scripts/fake_cameras.py --count 2000 --offline 0.1 --register --zone-id 1
+"""
+import argparse
+import asyncio
+import random
+
+import httpx
+
+
+async def accept(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Accept the connection and hang up, like a camera answering a port check"""
+    writer.close()
+
+
+async def register(args, ports: list):
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0) as client:
+        response = await client.post(
+            "/api/v1/auth/login",
+            data={"username": args.username, "password": args.password}
+        )
+        response.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        response = await client.post("/api/v1/cameras/bulk", json=[
+            {
+                "camera_name": f"Fake camera {port}",
+                "camera_code": f"FAKE-{port}",
+                "zone_id": args.zone_id,
+                "ip_address": f"127.0.0.1:{port}",
+                "status": "Offline",
+            }
+            for port in ports
+        ])
+        response.raise_for_status()
+        print(f"✓ Registered {response.json()['created']} cameras in zone {args.zone_id}")
+
+
+async def main(args):
+    ports = list(range(args.base_port, args.base_port + args.count))
+    offline = set(random.sample(ports, int(len(ports) * args.offline)))
+    servers = [
+        await asyncio.start_server(accept, "127.0.0.1", port)
+        for port in ports if port not in offline
+    ]
+    print(f"✓ {len(servers)} fake cameras listening, {len(offline)} offline "
+          f"(ports {ports[0]}-{ports[-1]})")
+
+    if args.register:
+        await register(args, ports)
+
+    print("Press Ctrl+C to stop")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for server in servers:
+            server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000, help="Number of fake cameras")
+    parser.add_argument("--base-port", type=int, default=20000)
+    parser.add_argument("--offline", type=float, default=0.1, help="Share of cameras without a listener")
+    parser.add_argument("--register", action="store_true", help="Create the cameras through the API")
+    parser.add_argument("--zone-id", type=int, default=1)
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the API")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
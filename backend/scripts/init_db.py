@@ -13,6 +13,7 @@ from app.core.database import SessionLocal
 from app.core.security import get_password_hash
 from app.models.user import User, Role, Permission
 from app.models.camera import Site, Zone
+from app.services.rbac import PERMISSIONS, ROLE_PERMISSIONS
 
 
 def init_db():
@@ -54,6 +55,22 @@ def init_db():
             db.refresh(viewer_role)
             print("✓ Created Viewer role")
         
+        # Create permissions and grant the defaults to each role
+        permissions = {}
+        for permission_name, description in PERMISSIONS.items():
+            permission = db.query(Permission).filter(Permission.permission_name == permission_name).first()
+            if not permission:
+                permission = Permission(permission_name=permission_name, description=description)
+                db.add(permission)
+                print(f"✓ Created {permission_name} permission")
+            permissions[permission_name] = permission
+        
+        for role in (admin_role, operator_role, viewer_role):
+            for permission_name in ROLE_PERMISSIONS[role.role_name]:
+                if permissions[permission_name] not in role.permissions:
+                    role.permissions.append(permissions[permission_name])
+        db.commit()
+        
         # Create default admin user if it doesn't exist
         admin_user = db.query(User).filter(User.username == "admin").first()
         if not admin_user:
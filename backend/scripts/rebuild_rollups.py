@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Rebuild the execution rollup tables from raw history
+The rollup migration backfills them once; run this after bulk changes
+made outside the API
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.services.rollups import rebuild_rollups
+
+
+async def main():
+    """Recompute all rollups in a single transaction"""
+    try:
+        async with AsyncSessionLocal() as db:
+            try:
+                await rebuild_rollups(db)
+                await db.commit()
+                print("✓ Execution rollups rebuilt")
+            except Exception as e:
+                print(f"✗ Error rebuilding rollups: {e}")
+                await db.rollback()
+                raise
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
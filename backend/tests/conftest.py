@@ -0,0 +1,83 @@
+import os
+import httpx
+import pytest
+
+# Database tests run against a throwaway PostgreSQL database; its tables are
+# created and dropped by the tests. Point the app at it before
+# app.core.database builds its engines.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+requires_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def database():
+    """Fresh tables in the test database, dropped again afterwards"""
+    from app.core.database import Base, async_engine
+
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield
+    finally:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await async_engine.dispose()
+
+
+@pytest.fixture
+async def user(database):
+    """An active user for the API client to act as"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.user import User
+
+    async with AsyncSessionLocal() as db:
+        user = User(
+            username="tester",
+            password_hash="-",
+            email="tester@example.com",
+            first_name="Test",
+            last_name="User"
+        )
+        db.add(user)
+        await db.commit()
+    return user
+
+
+@pytest.fixture
+async def client(user):
+    """API client authenticated as user, holding every permission"""
+    from app.api.v1.dependencies import get_current_active_user, get_current_permissions
+    from app.main import app
+    from app.services.rbac import PERMISSIONS
+
+    # Authentication has its own cache and queries; tests of it build real tokens
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    app.dependency_overrides[get_current_permissions] = lambda: frozenset(PERMISSIONS)
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def evidence_store(tmp_path, monkeypatch):
+    """A LocalEvidenceStore under a temporary EVIDENCE_DIR"""
+    from app.core.config import settings
+    from app.services.evidence_store import get_evidence_store
+
+    monkeypatch.setattr(settings, "EVIDENCE_STORAGE", "local")
+    monkeypatch.setattr(settings, "EVIDENCE_DIR", str(tmp_path / "evidence"))
+    get_evidence_store.cache_clear()
+    yield get_evidence_store()
+    get_evidence_store.cache_clear()
@@ -0,0 +1,158 @@
+"""
+Camera health probing against in-process fake cameras
+
+Each fake camera is an asyncio TCP server on 127.0.0.1 that accepts and
+hangs up, like a camera answering a port check. A refused address is a
+port whose server has been closed again.
+"""
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.camera import Camera, Site, Zone
+from app.services import camera_health
+from app.services.camera_health import parse_address, probe_all, sweep
+from .conftest import requires_database
+
+pytestmark = pytest.mark.anyio
+
+
+async def _hang_up(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    writer.close()
+
+
+@pytest.fixture
+async def reachable_port():
+    server = await asyncio.start_server(_hang_up, "127.0.0.1", 0)
+    try:
+        yield server.sockets[0].getsockname()[1]
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.fixture
+async def refused_port():
+    server = await asyncio.start_server(_hang_up, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    server.close()
+    await server.wait_closed()
+    return port
+
+
+def test_parse_address(monkeypatch):
+    monkeypatch.setattr(settings, "CAMERA_PROBE_PORT", 554)
+    assert parse_address("10.0.0.5") == ("10.0.0.5", 554)
+    assert parse_address("10.0.0.5:8080") == ("10.0.0.5", 8080)
+    assert parse_address("[::1]:8080") == ("::1", 8080)
+    assert parse_address("fe80::1") == ("fe80::1", 554)
+    assert parse_address("10.0.0.5:http") is None
+    assert parse_address("  ") is None
+
+
+async def test_probe_all_reachable_and_refused(reachable_port, refused_port):
+    results = await probe_all([("127.0.0.1", reachable_port), ("127.0.0.1", refused_port)])
+
+    assert results == {("127.0.0.1", reachable_port): True, ("127.0.0.1", refused_port): False}
+
+
+async def test_probe_all_times_out(monkeypatch, reachable_port):
+    async def never_connects(host, port):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(settings, "CAMERA_PROBE_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(camera_health.asyncio, "open_connection", never_connects)
+
+    started = asyncio.get_running_loop().time()
+    results = await probe_all([("127.0.0.1", reachable_port)])
+
+    assert results == {("127.0.0.1", reachable_port): False}
+    assert asyncio.get_running_loop().time() - started < 5
+
+
+async def test_probe_all_bounds_concurrency(monkeypatch):
+    active = peak = 0
+
+    async def slow_connect(host, port):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        raise ConnectionRefusedError
+
+    monkeypatch.setattr(settings, "CAMERA_PROBE_CONCURRENCY", 3)
+    monkeypatch.setattr(camera_health.asyncio, "open_connection", slow_connect)
+
+    results = await probe_all([("127.0.0.1", port) for port in range(1, 21)])
+
+    assert not any(results.values())
+    assert peak == 3
+
+
+async def _add_cameras(cameras: dict) -> dict:
+    """Create cameras from {name: (ip_address, status)}; returns {name: camera_id}"""
+    async with AsyncSessionLocal() as db:
+        zone = Zone(zone_name="Zone", site=Site(site_name="Site"))
+        rows = {
+            name: Camera(camera_name=name, zone=zone, ip_address=ip_address, status=status)
+            for name, (ip_address, status) in cameras.items()
+        }
+        db.add_all(rows.values())
+        await db.commit()
+        return {name: camera.camera_id for name, camera in rows.items()}
+
+
+async def _statuses(ids: dict) -> dict:
+    async with AsyncSessionLocal() as db:
+        rows = await db.execute(select(Camera.camera_id, Camera.status))
+        status_by_id = dict(rows.all())
+    return {name: status_by_id[camera_id] for name, camera_id in ids.items()}
+
+
+@requires_database
+async def test_sweep_transitions(database, reachable_port, refused_port):
+    up, down = f"127.0.0.1:{reachable_port}", f"127.0.0.1:{refused_port}"
+    ids = await _add_cameras({
+        "comes online": (up, "Offline"),
+        "shares the address": (up, "Error"),
+        "stays online": (up, "Online"),
+        "goes offline": (down, "Online"),
+        "stays offline": (down, "Offline"),
+        "in maintenance": (down, "Maintenance"),
+        "bad address": ("127.0.0.1:http", "Online"),
+    })
+
+    assert await sweep() == 3
+    assert await _statuses(ids) == {
+        "comes online": "Online",
+        "shares the address": "Online",
+        "stays online": "Online",
+        "goes offline": "Offline",
+        "stays offline": "Offline",
+        "in maintenance": "Maintenance",
+        "bad address": "Online",
+    }
+
+    # Nothing changed since, so nothing is written
+    assert await sweep() == 0
+
+
+@requires_database
+async def test_sweep_keeps_maintenance_set_while_probing(monkeypatch, database, refused_port):
+    ids = await _add_cameras({"camera": (f"127.0.0.1:{refused_port}", "Online")})
+    original_probe_all = camera_health.probe_all
+
+    async def probe_all_then_maintenance(targets):
+        results = await original_probe_all(targets)
+        async with AsyncSessionLocal() as db:
+            camera = await db.get(Camera, ids["camera"])
+            camera.status = "Maintenance"
+            await db.commit()
+        return results
+
+    monkeypatch.setattr(camera_health, "probe_all", probe_all_then_maintenance)
+
+    assert await sweep() == 0
+    assert await _statuses(ids) == {"camera": "Maintenance"}
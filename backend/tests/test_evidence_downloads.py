@@ -0,0 +1,116 @@
+"""
+Evidence downloads through the API
+
+Uploads a file into a LocalEvidenceStore under a temporary directory and
+fetches it back whole, by byte range and conditionally.
+"""
+from datetime import datetime, timezone
+import hashlib
+import pytest
+from app.core.database import AsyncSessionLocal
+from app.models.checklist import Checklist, ChecklistStep
+from app.models.execution import Execution, StepExecution
+from .conftest import requires_database
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+CONTENT = bytes(range(256)) * 4
+
+
+async def add_step_execution(user) -> int:
+    """An execution of a one-step checklist; returns the step execution's id"""
+    async with AsyncSessionLocal() as db:
+        step_execution = StepExecution(step=ChecklistStep(
+            step_number=1, description="Step", checklist=Checklist(name="Checklist")
+        ))
+        db.add(Execution(
+            checklist=step_execution.step.checklist,
+            user_id=user.user_id,
+            start_time=datetime.now(timezone.utc),
+            step_executions=[step_execution]
+        ))
+        await db.commit()
+        return step_execution.exec_step_id
+
+
+async def upload(client, exec_step_id: int, filename: str, content: bytes, content_type: str) -> dict:
+    response = await client.post(
+        f"/api/v1/executions/steps/{exec_step_id}/evidence",
+        files={"file": (filename, content, content_type)}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+@pytest.fixture
+async def evidence_url(client, user, evidence_store):
+    evidence = await upload(client, await add_step_execution(user), "capture.bin", CONTENT, "application/octet-stream")
+    return f"/api/v1/executions/evidence/{evidence['evidence_id']}/download"
+
+
+async def test_download_whole_file(client, evidence_url):
+    response = await client.get(evidence_url)
+
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["etag"] == f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+    assert response.headers["content-type"] == "application/octet-stream"
+    assert 'filename="capture.bin"' in response.headers["content-disposition"]
+
+
+async def test_head_sends_headers_only(client, evidence_url):
+    response = await client.head(evidence_url)
+
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+
+async def test_download_range(client, evidence_url):
+    response = await client.get(evidence_url, headers={"Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+
+
+async def test_download_suffix_range(client, evidence_url):
+    response = await client.get(evidence_url, headers={"Range": "bytes=-100"})
+
+    assert response.status_code == 206
+    assert response.content == CONTENT[-100:]
+
+
+async def test_unsatisfiable_range(client, evidence_url):
+    response = await client.get(evidence_url, headers={"Range": f"bytes={len(CONTENT)}-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+    assert response.content == b""
+
+
+async def test_if_range(client, evidence_url):
+    etag = (await client.head(evidence_url)).headers["etag"]
+
+    current = await client.get(evidence_url, headers={"Range": "bytes=0-9", "If-Range": etag})
+    stale = await client.get(evidence_url, headers={"Range": "bytes=0-9", "If-Range": '"outdated"'})
+
+    assert current.status_code == 206
+    assert current.content == CONTENT[:10]
+    assert stale.status_code == 200
+    assert stale.content == CONTENT
+
+
+async def test_if_none_match(client, evidence_url):
+    etag = (await client.head(evidence_url)).headers["etag"]
+
+    response = await client.get(evidence_url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+
+
+async def test_missing_evidence(client, evidence_store):
+    response = await client.get("/api/v1/executions/evidence/999/download")
+
+    assert response.status_code == 404
@@ -0,0 +1,117 @@
+"""
+Blob deduplication, reference counting and garbage collection
+
+Uploads go through the API into a LocalEvidenceStore under a temporary
+directory; collect_garbage() runs with no grace period unless a test
+says otherwise.
+"""
+import os
+import pytest
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.models.execution import Evidence, EvidenceBlob, Execution, StepExecution
+from app.services.evidence import collect_garbage
+from .conftest import requires_database
+from .test_evidence_downloads import add_step_execution, upload
+from .test_evidence_store import spool
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+CONTENT = b"evidence " * 512
+
+
+async def content_key(evidence: dict) -> str:
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(Evidence.file_path).where(Evidence.evidence_id == evidence["evidence_id"]))
+
+
+async def ref_count(key: str):
+    async with AsyncSessionLocal() as db:
+        blob = await db.get(EvidenceBlob, key)
+        return None if blob is None else blob.ref_count
+
+
+async def step_of(exec_step_id: int) -> tuple:
+    """The checklist and step a step execution belongs to"""
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(Execution.checklist_id, StepExecution.step_id)
+            .join(Execution, Execution.execution_id == StepExecution.execution_id)
+            .where(StepExecution.exec_step_id == exec_step_id)
+        )).one()
+        return tuple(row)
+
+
+@pytest.fixture
+async def uploaded(client, user, evidence_store):
+    """Two uploads of the same content to different step executions"""
+    first = await upload(client, await add_step_execution(user), "a.txt", CONTENT, "text/plain")
+    second = await upload(client, await add_step_execution(user), "b.txt", CONTENT, "text/plain")
+    return first, second
+
+
+async def test_identical_uploads_share_a_blob(uploaded, evidence_store):
+    async with AsyncSessionLocal() as db:
+        keys = set(await db.scalars(select(Evidence.file_path)))
+
+    assert len(keys) == 1
+    key = keys.pop()
+    assert await ref_count(key) == 2
+    assert [stored async for stored, _ in evidence_store.keys()] == [key]
+    assert os.listdir(evidence_store.incoming_dir) == []
+
+
+async def test_referenced_blobs_are_kept(uploaded, evidence_store):
+    key = await content_key(uploaded[0])
+
+    assert await collect_garbage(evidence_store, grace_seconds=0) == 0
+    assert await evidence_store.exists(key)
+
+
+async def test_deleting_evidence_releases_the_blob(client, uploaded, evidence_store):
+    key = await content_key(uploaded[0])
+
+    for evidence in uploaded:
+        response = await client.delete(f"/api/v1/executions/evidence/{evidence['evidence_id']}")
+        assert response.status_code == 204
+    assert await ref_count(key) == 0
+
+    assert await collect_garbage(evidence_store, grace_seconds=3600) == 0
+    assert await evidence_store.exists(key)
+    assert await collect_garbage(evidence_store, grace_seconds=0) == 1
+    assert not await evidence_store.exists(key)
+    assert await ref_count(key) is None
+
+
+async def test_deleting_a_checklist_releases_its_evidence(client, uploaded, evidence_store):
+    key = await content_key(uploaded[0])
+    checklist_id, _ = await step_of(uploaded[0]["exec_step_id"])
+
+    response = await client.delete(f"/api/v1/checklists/{checklist_id}")
+
+    assert response.status_code == 204
+    assert await ref_count(key) == 1
+    assert await collect_garbage(evidence_store, grace_seconds=0) == 0
+
+
+async def test_deleting_a_step_releases_its_evidence(client, uploaded, evidence_store):
+    key = await content_key(uploaded[0])
+    for evidence in uploaded:
+        checklist_id, step_id = await step_of(evidence["exec_step_id"])
+        response = await client.delete(f"/api/v1/checklists/{checklist_id}/steps/{step_id}")
+        assert response.status_code == 204
+
+    assert await ref_count(key) == 0
+    assert await collect_garbage(evidence_store, grace_seconds=0) == 1
+    assert not await evidence_store.exists(key)
+
+
+async def test_orphaned_blobs_are_collected_after_the_grace_period(database, evidence_store):
+    key = "ef" * 32
+    await evidence_store.put_file(key, spool(evidence_store.incoming_dir))
+
+    assert await collect_garbage(evidence_store, grace_seconds=3600) == 0
+    assert await evidence_store.exists(key)
+    assert await collect_garbage(evidence_store, grace_seconds=0) == 1
+    assert not await evidence_store.exists(key)
+
@@ -0,0 +1,210 @@
+"""
+Evidence blob stores
+
+LocalEvidenceStore runs against a temporary directory. S3EvidenceStore
+runs against an in-memory stand-in for the handful of boto3 client
+calls it makes.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.services.evidence_store import EvidenceStore, LocalEvidenceStore, S3EvidenceStore, shard_path
+
+pytestmark = pytest.mark.anyio
+
+KEY = "ab" * 32
+OTHER_KEY = "cd" * 32
+
+
+def spool(directory, content: bytes = b"content") -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"upload-{uuid.uuid4().hex}.part")
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+
+async def collect_keys(store: EvidenceStore) -> list:
+    return sorted([key async for key, _ in store.keys()])
+
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        EvidenceStore()
+
+
+class TestLocalEvidenceStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return LocalEvidenceStore(str(tmp_path / "evidence"))
+
+    async def test_put_shards_and_keeps_the_spool_file(self, store):
+        path = spool(store.incoming_dir)
+
+        assert await store.put_file(KEY, path) is True
+
+        assert os.path.exists(path)
+        with open(os.path.join(store.root, shard_path(KEY)), "rb") as f:
+            assert f.read() == b"content"
+        assert await store.exists(KEY)
+        assert not await store.exists(OTHER_KEY)
+
+    async def test_same_content_is_stored_once(self, store):
+        await store.put_file(KEY, spool(store.incoming_dir))
+        os.utime(store.path(KEY), (0, 0))
+
+        assert await store.put_file(KEY, spool(store.incoming_dir)) is False
+
+        assert os.path.getmtime(store.path(KEY)) > 0
+        assert await collect_keys(store) == [KEY]
+
+    async def test_get_file(self, store, tmp_path):
+        await store.put_file(KEY, spool(store.incoming_dir, b"payload"))
+
+        await store.get_file(KEY, str(tmp_path / "copy"))
+
+        assert (tmp_path / "copy").read_bytes() == b"payload"
+
+    async def test_keys_skip_renditions_and_spool(self, store):
+        await store.put_file(KEY, spool(store.incoming_dir))
+        await store.put_file(f"{KEY}.thumbnail.jpg", spool(store.incoming_dir))
+        await store.put_file(OTHER_KEY, spool(store.incoming_dir))
+
+        assert await collect_keys(store) == [KEY, OTHER_KEY]
+
+    async def test_delete_removes_renditions(self, store):
+        await store.put_file(KEY, spool(store.incoming_dir))
+        await store.put_file(f"{KEY}.thumbnail.jpg", spool(store.incoming_dir))
+        await store.put_file(OTHER_KEY, spool(store.incoming_dir))
+
+        await store.delete(KEY)
+        await store.delete(KEY)
+
+        assert not await store.exists(KEY)
+        assert not await store.exists(f"{KEY}.thumbnail.jpg")
+        assert await collect_keys(store) == [OTHER_KEY]
+
+
+class FakeS3Client:
+    """The subset of the boto3 S3 client S3EvidenceStore uses, in memory"""
+
+    def __init__(self, page_size: int = 1000):
+        self.objects = {}
+        self.page_size = page_size
+        self.copies = 0
+
+    def _missing(self, operation: str):
+        from botocore.exceptions import ClientError
+        return ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self._missing("HeadObject")
+        return {}
+
+    def upload_file(self, Filename, Bucket, Key):
+        with open(Filename, "rb") as f:
+            self.objects[Bucket, Key] = (f.read(), datetime.now(timezone.utc))
+
+    def copy_object(self, Bucket, Key, CopySource, MetadataDirective):
+        body, _ = self.objects[CopySource["Bucket"], CopySource["Key"]]
+        self.objects[Bucket, Key] = (body, datetime.now(timezone.utc))
+        self.copies += 1
+
+    def download_file(self, Bucket, Key, Filename):
+        if (Bucket, Key) not in self.objects:
+            raise self._missing("GetObject")
+        with open(Filename, "wb") as f:
+            f.write(self.objects[Bucket, Key][0])
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + self.page_size]
+        response = {
+            "Contents": [{"Key": key, "LastModified": self.objects[Bucket, key][1]} for key in page],
+            "IsTruncated": start + self.page_size < len(keys),
+        }
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start + self.page_size)
+        return response
+
+    def delete_objects(self, Bucket, Delete):
+        for item in Delete["Objects"]:
+            self.objects.pop((Bucket, item["Key"]), None)
+
+    def generate_presigned_url(self, ClientMethod, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?method={ClientMethod}&expires={ExpiresIn}"
+
+
+class TestS3EvidenceStore:
+    @pytest.fixture
+    def client(self):
+        pytest.importorskip("botocore")
+        return FakeS3Client(page_size=2)
+
+    @pytest.fixture
+    def store(self, client):
+        return S3EvidenceStore("evidence", "/blobs/", client=client)
+
+    async def test_put_under_prefix(self, store, client, tmp_path):
+        path = spool(tmp_path)
+
+        assert await store.put_file(KEY, path) is True
+
+        assert os.path.exists(path)
+        assert client.objects["evidence", f"blobs/{shard_path(KEY)}"][0] == b"content"
+        assert await store.exists(KEY)
+        assert not await store.exists(OTHER_KEY)
+
+    async def test_same_content_is_refreshed_not_uploaded(self, store, client, tmp_path):
+        await store.put_file(KEY, spool(tmp_path))
+        object_key = f"blobs/{shard_path(KEY)}"
+        client.objects["evidence", object_key] = (b"content", datetime.now(timezone.utc) - timedelta(days=1))
+
+        assert await store.put_file(KEY, spool(tmp_path, b"ignored")) is False
+
+        body, modified = client.objects["evidence", object_key]
+        assert client.copies == 1
+        assert body == b"content"
+        assert modified > datetime.now(timezone.utc) - timedelta(minutes=1)
+
+    async def test_get_file(self, store, tmp_path):
+        await store.put_file(KEY, spool(tmp_path, b"payload"))
+
+        await store.get_file(KEY, str(tmp_path / "copy"))
+
+        assert (tmp_path / "copy").read_bytes() == b"payload"
+
+    async def test_keys_follow_pages(self, store, tmp_path):
+        keys = sorted(f"{index:02x}" * 32 for index in range(5))
+        for key in keys:
+            await store.put_file(key, spool(tmp_path))
+        await store.put_file(f"{keys[0]}.thumbnail.jpg", spool(tmp_path))
+
+        assert await collect_keys(store) == keys
+
+    async def test_delete_removes_renditions(self, store, client, tmp_path):
+        await store.put_file(KEY, spool(tmp_path))
+        await store.put_file(f"{KEY}.thumbnail.jpg", spool(tmp_path))
+        await store.put_file(OTHER_KEY, spool(tmp_path))
+
+        await store.delete(KEY)
+
+        assert [key for _, key in client.objects] == [f"blobs/{shard_path(OTHER_KEY)}"]
+
+    async def test_download_url(self, store):
+        url = await store.download_url(KEY, "image/jpeg", 'attachment; filename="a.jpg"')
+
+        assert url.startswith(f"https://s3.test/evidence/blobs/{shard_path(KEY)}?method=get_object")
+
+    async def test_other_errors_propagate(self, store, client):
+        from botocore.exceptions import ClientError
+
+        def denied(Bucket, Key):
+            raise ClientError({"Error": {"Code": "403", "Message": "Forbidden"}}, "HeadObject")
+        client.head_object = denied
+
+        with pytest.raises(ClientError):
+            await store.exists(KEY)
@@ -0,0 +1,93 @@
+"""
+Execution lifecycle through the API: start, record steps, complete
+"""
+import pytest
+from app.core.database import AsyncSessionLocal
+from app.models.checklist import Checklist, ChecklistStep
+from .conftest import requires_database
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+
+async def add_checklist(steps: int = 2) -> dict:
+    """A checklist with the given number of steps; returns its id and step ids"""
+    async with AsyncSessionLocal() as db:
+        checklist = Checklist(name="Checklist", steps=[
+            ChecklistStep(step_number=number, description=f"Step {number}") for number in range(1, steps + 1)
+        ])
+        db.add(checklist)
+        await db.commit()
+        return {"checklist_id": checklist.checklist_id, "step_ids": [step.step_id for step in checklist.steps]}
+
+
+async def start_execution(client, checklist: dict) -> int:
+    response = await client.post("/api/v1/executions", json={"checklist_id": checklist["checklist_id"]})
+    assert response.status_code == 201, response.text
+    return response.json()["execution_id"]
+
+
+async def record_steps(client, execution_id: int, results: list):
+    response = await client.put(f"/api/v1/executions/{execution_id}/steps", json=results)
+    assert response.status_code == 200, response.text
+
+
+async def summary(client) -> dict:
+    response = await client.get("/api/v1/reports/execution-summary")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_complete_updates_summary(client):
+    checklist = await add_checklist()
+    execution_id = await start_execution(client, checklist)
+    before = await summary(client)
+    assert (before["total"], before["in_progress"], before["completed"]) == (1, 1, 0)
+
+    await record_steps(client, execution_id, [
+        {"step_id": step_id, "status": "Completed", "verification_result": "Pass", "execution_time": 2.5}
+        for step_id in checklist["step_ids"]
+    ])
+    response = await client.put(f"/api/v1/executions/{execution_id}/complete")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "Completed"
+    assert response.json()["total_execution_time"] == 5.0
+    after = await summary(client)
+    assert (after["total"], after["in_progress"], after["completed"]) == (1, 0, 1)
+    assert after["success_rate"] == 100.0
+    assert after["avg_duration_seconds"] is not None
+    assert after["steps"]["passed"] == 2
+
+
+async def test_failed_step_fails_execution(client):
+    checklist = await add_checklist()
+    execution_id = await start_execution(client, checklist)
+    await record_steps(client, execution_id, [
+        {"step_id": checklist["step_ids"][0], "status": "Failed", "verification_result": "Fail"}
+    ])
+
+    response = await client.put(f"/api/v1/executions/{execution_id}/complete")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "Failed"
+    after = await summary(client)
+    assert (after["in_progress"], after["failed"], after["completed"]) == (0, 1, 0)
+
+
+async def test_complete_with_pending_steps_is_refused(client):
+    checklist = await add_checklist()
+    execution_id = await start_execution(client, checklist)
+    await record_steps(client, execution_id, [
+        {"step_id": checklist["step_ids"][0], "status": "Completed", "verification_result": "Pass"}
+    ])
+
+    response = await client.put(f"/api/v1/executions/{execution_id}/complete")
+
+    assert response.status_code == 409
+    assert (await summary(client))["in_progress"] == 1
+
+
+async def test_complete_missing_execution(client):
+    response = await client.put("/api/v1/executions/999/complete")
+
+    assert response.status_code == 404
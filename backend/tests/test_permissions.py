@@ -0,0 +1,141 @@
+"""
+Authorization with real access tokens
+
+require_permission() trusts the permissions embedded in a token while the
+token's RBAC version is current and otherwise recomputes them from the
+user's roles in the database.
+"""
+import httpx
+import pytest
+from sqlalchemy import insert
+from app.core.database import AsyncSessionLocal
+from app.core.security import create_access_token
+from app.models.user import Permission, Role, user_role
+from app.services.rbac import PERMISSIONS, ROLE_PERMISSIONS, get_rbac, invalidate_rbac
+from .conftest import requires_database
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+# Needs checklists:manage; answers 404 once authorized
+PROTECTED = "/api/v1/checklists/999"
+
+
+@pytest.fixture
+async def roles(database):
+    """The default roles and grants, by role name"""
+    async with AsyncSessionLocal() as db:
+        permissions = {name: Permission(permission_name=name) for name in PERMISSIONS}
+        roles = {
+            name: Role(role_name=name, permissions=[permissions[permission] for permission in granted])
+            for name, granted in ROLE_PERMISSIONS.items()
+        }
+        db.add_all(roles.values())
+        await db.commit()
+        role_ids = {name: role.role_id for name, role in roles.items()}
+    invalidate_rbac()
+    yield role_ids
+    invalidate_rbac()
+
+
+@pytest.fixture
+async def api(user):
+    from app.api.v1.dependencies import invalidate_user
+    from app.main import app
+
+    await invalidate_user(user.user_id)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    await invalidate_user(user.user_id)
+
+
+async def grant(user, role_id: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(user_role).values(user_id=user.user_id, role_id=role_id))
+        await db.commit()
+
+
+def bearer(username: str, user_id: int, **claims) -> dict:
+    """Authorization header for a token with the given RBAC claims"""
+    access_token = create_access_token({"sub": username, "user_id": user_id, **claims})
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+async def current_version() -> str:
+    async with AsyncSessionLocal() as db:
+        return (await get_rbac(db)).version
+
+
+async def test_embedded_permissions_are_trusted(api, user, roles):
+    # The user holds no role: only the token grants the permission
+    version = await current_version()
+    headers = bearer(user.username, user.user_id, roles=[], perms=["checklists:manage"], rbac=version)
+
+    response = await api.delete(PROTECTED, headers=headers)
+
+    assert response.status_code == 404
+
+
+async def test_missing_permission(api, user, roles):
+    version = await current_version()
+    headers = bearer(user.username, user.user_id, roles=[], perms=["executions:run"], rbac=version)
+
+    response = await api.delete(PROTECTED, headers=headers)
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Missing permission: checklists:manage"
+
+
+async def test_stale_version_uses_current_roles(api, user, roles):
+    await grant(user, roles["Viewer"])
+    stale = bearer(
+        user.username, user.user_id, roles=[roles["Administrator"]], perms=["checklists:manage"], rbac="outdated"
+    )
+
+    response = await api.delete(PROTECTED, headers=stale)
+
+    assert response.status_code == 403
+
+
+async def test_legacy_token_uses_current_roles(api, user, roles):
+    await grant(user, roles["Administrator"])
+
+    response = await api.delete(PROTECTED, headers=bearer(user.username, user.user_id))
+
+    assert response.status_code == 404
+
+
+async def test_role_change_outdates_issued_tokens(api, user, roles):
+    await grant(user, roles["Administrator"])
+    version = await current_version()
+    admin = bearer(user.username, user.user_id, perms=sorted(PERMISSIONS), rbac=version)
+    created = await api.post("/api/v1/users", headers=admin, json={
+        "username": "operator",
+        "email": "operator@example.com",
+        "first_name": "Op",
+        "last_name": "Erator",
+        "password": "secret",
+        "role_ids": [roles["Viewer"]],
+    })
+    assert created.status_code == 201, created.text
+    operator = created.json()
+    assert [role["role_name"] for role in operator["roles"]] == ["Viewer"]
+    issued = bearer("operator", operator["user_id"], perms=["evidence:view"], rbac=version)
+    assert (await api.delete(PROTECTED, headers=issued)).status_code == 403
+
+    response = await api.put(
+        f"/api/v1/users/{operator['user_id']}", headers=admin, json={"role_ids": [roles["Administrator"]]}
+    )
+
+    assert response.status_code == 200, response.text
+    assert [role["role_name"] for role in response.json()["roles"]] == ["Administrator"]
+    assert await current_version() != version
+    assert (await api.delete(PROTECTED, headers=issued)).status_code == 404
+
+
+async def test_unknown_role(api, user, roles):
+    await grant(user, roles["Administrator"])
+    admin = bearer(user.username, user.user_id, perms=sorted(PERMISSIONS), rbac=await current_version())
+
+    response = await api.put(f"/api/v1/users/{user.user_id}", headers=admin, json={"role_ids": [999]})
+
+    assert response.status_code == 404
@@ -0,0 +1,75 @@
+"""
+Statement counts of the list routes
+
+Runs with strict loading on, so any relationship a route forgot to load up
+front raises instead of lazy loading, and checks through the per-request
+query stats (X-DB-Queries) that the number of statements does not grow
+with the number of rows returned.
+"""
+from datetime import datetime, timezone
+import httpx
+import pytest
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, enable_strict_loading
+from app.models.camera import Camera, Site, Zone
+from app.models.checklist import Checklist, ChecklistStep
+from app.models.execution import Execution, StepExecution
+from app.models.user import User
+from .conftest import requires_database
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+
+@pytest.fixture(autouse=True)
+def strict_loading():
+    enable_strict_loading()
+
+
+async def _seed(rows: int):
+    """Add rows cameras, checklists and executions, each with nested rows to load"""
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(select(User.user_id))
+        site = Site(site_name="Site")
+        zone = Zone(zone_name="Zone", site=site)
+        db.add_all([Camera(camera_name=f"Camera {i}", zone=zone) for i in range(rows)])
+        for i in range(rows):
+            checklist = Checklist(name=f"Checklist {i}")
+            step = ChecklistStep(step_number=1, description="Step", checklist=checklist)
+            execution = Execution(
+                checklist=checklist,
+                user_id=user_id,
+                start_time=datetime.now(timezone.utc),
+                step_executions=[StepExecution(step=step)]
+            )
+            db.add(execution)
+        await db.commit()
+
+
+async def _query_count(client: httpx.AsyncClient, url: str) -> int:
+    response = await client.get(url)
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-DB-Queries"])
+
+
+@pytest.mark.parametrize("url", ["/api/v1/cameras", "/api/v1/checklists", "/api/v1/executions"])
+async def test_list_queries_do_not_grow_with_rows(client, url):
+    await _seed(3)
+    few = await _query_count(client, url)
+
+    await _seed(30)
+    many = await _query_count(client, url)
+
+    assert many == few
+    # Validator, page query and at most one selectinload per collection
+    assert few <= 4
+
+
+async def test_not_modified_list_is_one_query(client):
+    await _seed(10)
+    response = await client.get("/api/v1/cameras")
+    etag = response.headers["ETag"]
+
+    response = await client.get("/api/v1/cameras", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["X-DB-Queries"] == "1"
@@ -0,0 +1,164 @@
+"""
+Incrementally maintained rollups against a recount from raw history
+
+After each write through the API the rollup rows must equal what
+rebuild_rollups() derives with its GROUP BY queries over executions and
+step_executions; the recount runs in a transaction that is rolled back.
+"""
+import pytest
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.models.camera import Camera, CameraMapping, Site, Zone
+from app.models.rollup import ExecutionRollup, SiteRollup, StepRollup
+from app.services.rollups import rebuild_rollups
+from .conftest import requires_database
+from .test_executions import add_checklist, record_steps, start_execution
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+ROLLUPS = (ExecutionRollup, StepRollup, SiteRollup)
+
+
+async def add_zone(name: str) -> int:
+    """A zone in a site of its own; returns the zone's id"""
+    async with AsyncSessionLocal() as db:
+        zone = Zone(zone_name=name, site=Site(site_name=name))
+        db.add(zone)
+        await db.commit()
+        return zone.zone_id
+
+
+async def add_camera(zone_id: int, step_ids: list) -> int:
+    """A camera in the zone mapped to the given steps; returns its id"""
+    async with AsyncSessionLocal() as db:
+        camera = Camera(camera_name="Camera", zone_id=zone_id, camera_mappings=[
+            CameraMapping(step_id=step_id) for step_id in step_ids
+        ])
+        db.add(camera)
+        await db.commit()
+        return camera.camera_id
+
+
+async def rollup_rows(db) -> dict:
+    """Non-empty rows of each rollup table, without their timestamps"""
+    rows = {}
+    for model in ROLLUPS:
+        columns = [column for column in model.__table__.c if column.name != "updated_at"]
+        result = await db.execute(select(*columns))
+        rows[model.__tablename__] = sorted(
+            tuple(round(value, 3) if isinstance(value, float) else value for value in row)
+            for row in result
+            if any(row[2:])
+        )
+    return rows
+
+
+async def assert_rollups_match():
+    async with AsyncSessionLocal() as db:
+        incremental = await rollup_rows(db)
+        await rebuild_rollups(db)
+        recounted = await rollup_rows(db)
+        await db.rollback()
+    assert incremental == recounted
+
+
+@pytest.fixture
+async def mapped_checklist(user):
+    """A three-step checklist; steps 1-2 are watched in one site, step 3 in another"""
+    checklist = await add_checklist(steps=3)
+    first, second, third = checklist["step_ids"]
+    checklist["cameras"] = [
+        await add_camera(await add_zone("North"), [first, second]),
+        await add_camera(await add_zone("South"), [third]),
+    ]
+    return checklist
+
+
+async def run(client, checklist: dict, results: list) -> int:
+    """Start an execution, record one result per step and complete it"""
+    execution_id = await start_execution(client, checklist)
+    await record_steps(client, execution_id, [
+        {"step_id": step_id, "status": "Completed", "verification_result": result, "execution_time": 1.5}
+        for step_id, result in zip(checklist["step_ids"], results)
+    ])
+    response = await client.put(f"/api/v1/executions/{execution_id}/complete")
+    assert response.status_code == 200, response.text
+    return execution_id
+
+
+async def test_execution_lifecycle(client, mapped_checklist):
+    execution_id = await start_execution(client, mapped_checklist)
+    await assert_rollups_match()
+
+    await record_steps(client, execution_id, [
+        {"step_id": mapped_checklist["step_ids"][0], "status": "Completed", "verification_result": "Pass"},
+        {"step_id": mapped_checklist["step_ids"][2], "status": "Failed", "verification_result": "Fail",
+         "execution_time": 4.0},
+    ])
+    await assert_rollups_match()
+
+    await record_steps(client, execution_id, [
+        {"step_id": mapped_checklist["step_ids"][1], "status": "Completed", "verification_result": "Warning",
+         "execution_time": 2.25},
+    ])
+    response = await client.put(f"/api/v1/executions/{execution_id}/complete")
+    assert response.status_code == 200, response.text
+    await assert_rollups_match()
+
+    async with AsyncSessionLocal() as db:
+        assert len((await rollup_rows(db))["site_rollups"]) == 2
+
+
+async def test_delete_step(client, mapped_checklist):
+    await run(client, mapped_checklist, ["Pass", "Fail", "Fail"])
+    third = mapped_checklist["step_ids"][2]
+
+    response = await client.delete(f"/api/v1/checklists/{mapped_checklist['checklist_id']}/steps/{third}")
+
+    assert response.status_code == 204
+    await assert_rollups_match()
+
+
+async def test_delete_checklist(client, mapped_checklist):
+    await run(client, mapped_checklist, ["Pass", "Pass", "Pass"])
+    other = await add_checklist(steps=1)
+    await add_camera(await add_zone("East"), other["step_ids"])
+    await run(client, other, ["Fail"])
+
+    response = await client.delete(f"/api/v1/checklists/{mapped_checklist['checklist_id']}")
+
+    assert response.status_code == 204
+    await assert_rollups_match()
+    async with AsyncSessionLocal() as db:
+        remaining = await rollup_rows(db)
+    assert {row[1] for row in remaining["execution_rollups"]} == {other["checklist_id"]}
+
+
+async def test_delete_camera(client, mapped_checklist):
+    await run(client, mapped_checklist, ["Pass", "Fail", "Pass"])
+
+    response = await client.delete(f"/api/v1/cameras/{mapped_checklist['cameras'][1]}")
+
+    assert response.status_code == 204
+    await assert_rollups_match()
+
+
+async def test_delete_zone(client, mapped_checklist):
+    await run(client, mapped_checklist, ["Pass", "Fail", "Pass"])
+    async with AsyncSessionLocal() as db:
+        zone_id = (await db.get(Camera, mapped_checklist["cameras"][0])).zone_id
+
+    response = await client.delete(f"/api/v1/cameras/zones/{zone_id}")
+
+    assert response.status_code == 204
+    await assert_rollups_match()
+
+
+async def test_move_camera(client, mapped_checklist):
+    await run(client, mapped_checklist, ["Pass", "Fail", "Pass"])
+    zone_id = await add_zone("West")
+
+    response = await client.put(f"/api/v1/cameras/{mapped_checklist['cameras'][0]}", json={"zone_id": zone_id})
+
+    assert response.status_code == 200, response.text
+    await assert_rollups_match()
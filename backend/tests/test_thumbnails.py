@@ -0,0 +1,64 @@
+"""
+Thumbnail and preview renditions of image evidence
+
+generate_thumbnails() is called directly: without the worker pool it
+renders on the default executor, which is enough to exercise the
+storage and the API route.
+"""
+import io
+import pytest
+from PIL import Image
+from app.core.config import settings
+from app.services.thumbnails import generate_thumbnails
+from .conftest import requires_database
+from .test_evidence_downloads import add_step_execution, upload
+
+pytestmark = [pytest.mark.anyio, requires_database]
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+async def image_evidence(client, user, evidence_store, monkeypatch):
+    monkeypatch.setattr(settings, "THUMBNAIL_SIZE", 64)
+    monkeypatch.setattr(settings, "PREVIEW_SIZE", 256)
+    evidence = await upload(client, await add_step_execution(user), "photo.jpg", _jpeg(1200, 800), "image/jpeg")
+    assert evidence["evidence_type"] == "Image"
+    return evidence["evidence_id"]
+
+
+async def test_thumbnail_missing_until_generated(client, image_evidence):
+    response = await client.get(f"/api/v1/executions/evidence/{image_evidence}/thumbnail")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("variant, longest_side", [("thumbnail", 64), ("preview", 256)])
+async def test_fetch_variant(client, image_evidence, variant, longest_side):
+    assert await generate_thumbnails(image_evidence)
+
+    response = await client.get(
+        f"/api/v1/executions/evidence/{image_evidence}/thumbnail", params={"variant": variant}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    with Image.open(io.BytesIO(response.content)) as image:
+        assert max(image.size) == longest_side
+        assert image.size[0] > image.size[1]
+
+
+async def test_renditions_reused_for_same_content(client, user, image_evidence, evidence_store):
+    assert await generate_thumbnails(image_evidence)
+    again = await upload(client, await add_step_execution(user), "copy.jpg", _jpeg(1200, 800), "image/jpeg")
+
+    assert await generate_thumbnails(again["evidence_id"])
+    first = await client.get(f"/api/v1/executions/evidence/{image_evidence}/thumbnail")
+    second = await client.get(f"/api/v1/executions/evidence/{again['evidence_id']}/thumbnail")
+
+    assert first.status_code == second.status_code == 200
+    assert first.headers["etag"] == second.headers["etag"]
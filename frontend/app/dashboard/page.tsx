@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from 'react'
 import { useRouter } from 'next/navigation'
-import { apiClient, User, Camera, Checklist, Execution } from '@/lib/api'
+import { apiClient, User, Camera, Checklist } from '@/lib/api'
 import Layout from '@/components/Layout'
 
 export default function DashboardPage() {
@@ -22,17 +22,17 @@ export default function DashboardPage() {
         const currentUser = await apiClient.getCurrentUser()
         setUser(currentUser)
 
-        const [cameras, checklists, executions] = await Promise.all([
+        const [cameras, checklists, summary] = await Promise.all([
           apiClient.getCameras(0, 1000),
           apiClient.getChecklists(0, 1000),
-          apiClient.getExecutions(0, 1000),
+          apiClient.getExecutionSummary(),
         ])
 
         setStats({
           cameras: cameras.length,
           checklists: checklists.length,
-          executions: executions.length,
-          activeExecutions: executions.filter((e) => e.status === 'In Progress').length,
+          executions: summary.total,
+          activeExecutions: summary.in_progress,
         })
       } catch (error) {
         console.error('Failed to load data:', error)
@@ -2,19 +2,25 @@
 
 import { useEffect, useState } from 'react'
 import { useRouter } from 'next/navigation'
-import { apiClient, Execution } from '@/lib/api'
+import { apiClient, Execution, ExecutionSummary } from '@/lib/api'
 import Layout from '@/components/Layout'
 
 export default function ReportsPage() {
   const router = useRouter()
   const [executions, setExecutions] = useState<Execution[]>([])
+  const [summary, setSummary] = useState<ExecutionSummary | null>(null)
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
     const loadExecutions = async () => {
       try {
-        const data = await apiClient.getExecutions()
-        setExecutions(data)
+        // Counts come pre-aggregated from the server; only the recent list is fetched
+        const [summaryData, recent] = await Promise.all([
+          apiClient.getExecutionSummary(),
+          apiClient.getExecutions(0, 5, 'desc'),
+        ])
+        setSummary(summaryData)
+        setExecutions(recent)
       } catch (error) {
         console.error('Failed to load executions:', error)
         router.push('/login')
@@ -35,11 +41,11 @@ export default function ReportsPage() {
     )
   }
 
-  const completed = executions.filter((e) => e.status === 'Completed').length
-  const inProgress = executions.filter((e) => e.status === 'In Progress').length
-  const failed = executions.filter((e) => e.status === 'Failed').length
-  const total = executions.length
-  const successRate = total > 0 ? ((completed / total) * 100).toFixed(1) : '0'
+  const completed = summary?.completed ?? 0
+  const inProgress = summary?.in_progress ?? 0
+  const failed = summary?.failed ?? 0
+  const total = summary?.total ?? 0
+  const successRate = (summary?.success_rate ?? 0).toFixed(1)
 
   const stats = [
     {
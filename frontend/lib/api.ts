@@ -100,6 +100,40 @@ export interface Execution {
 	notes?: string;
 }
 
+export interface ExecutionStatusCounts {
+	total: number;
+	completed: number;
+	in_progress: number;
+	failed: number;
+	aborted: number;
+	success_rate: number;
+	avg_duration_seconds?: number | null;
+}
+
+export interface ExecutionSummary extends ExecutionStatusCounts {
+	start_date?: string | null;
+	end_date?: string | null;
+	steps: {
+		total: number;
+		passed: number;
+		failed: number;
+		warning: number;
+		avg_execution_time?: number | null;
+	};
+	by_checklist: Array<
+		ExecutionStatusCounts & { checklist_id: number; checklist_name: string }
+	>;
+	by_site: Array<{
+		site_id: number;
+		site_name: string;
+		executions: number;
+		steps: number;
+		passed: number;
+		failed: number;
+	}>;
+	by_day: Array<ExecutionStatusCounts & { day: string }>;
+}
+
 class APIClient {
 	private baseUrl: string;
 	private token: string | null = null;
@@ -236,9 +270,26 @@ class APIClient {
 		);
 	}
 
-	async getExecutions(skip = 0, limit = 100): Promise<Execution[]> {
+	async getExecutions(
+		skip = 0,
+		limit = 100,
+		order: "asc" | "desc" = "asc"
+	): Promise<Execution[]> {
 		return this.request<Execution[]>(
-			`/api/v1/executions?skip=${skip}&limit=${limit}`
+			`/api/v1/executions?skip=${skip}&limit=${limit}&order=${order}`
+		);
+	}
+
+	async getExecutionSummary(
+		startDate?: string,
+		endDate?: string
+	): Promise<ExecutionSummary> {
+		const params = new URLSearchParams();
+		if (startDate) params.set("start_date", startDate);
+		if (endDate) params.set("end_date", endDate);
+		const query = params.toString();
+		return this.request<ExecutionSummary>(
+			`/api/v1/reports/execution-summary${query ? `?${query}` : ""}`
 		);
 	}
 